@@ -0,0 +1,14 @@
+"""
+CBRAIN command line client; :class:`CbrainClient` is its Python API.
+"""
+
+__all__ = ["CbrainClient"]
+
+
+def __getattr__(name):
+    # Imported on first use: the CLI itself does not need the client.
+    if name == "CbrainClient":
+        from cbrain_cli.client import CbrainClient
+
+        return CbrainClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,419 @@
+"""
+asyncio request engine for operations fanning out to many GET requests.
+
+The synchronous transport (``api_get`` over :mod:`cbrain_cli.transport`)
+needs one thread per concurrent request, which is fine for a handful of
+them. This engine speaks HTTP/1.1 over ``asyncio`` streams instead: thousands
+of requests can be in flight from one thread, each costing a coroutine rather
+than a thread stack.
+
+Two limits apply: a global semaphore bounds the requests in flight, and a
+per-host limit bounds the connections opened to any one server (the other
+requests wait for a connection to come back). Connections are kept alive
+and reused, responses may be chunked or gzip/deflate compressed, and
+overloaded-server answers and dropped connections are retried with the
+CLI's retry policy. Errors are raised as ``urllib.error.HTTPError`` /
+``URLError``, the same as with the synchronous transport, so ``handle_errors``
+and :func:`~cbrain_cli.cli_utils.error_message` treat them alike. Ctrl-C
+cancels every pending request and closes the connections.
+"""
+
+import asyncio
+import collections
+import contextlib
+import http.client
+import io
+import itertools
+import time
+import urllib.error
+import urllib.parse
+
+from cbrain_cli import cli_utils, tracing
+from cbrain_cli.config import (
+    ASYNC_HOST_CONNECTIONS_ENV_VAR,
+    DEFAULT_ASYNC_HOST_CONNECTIONS,
+    auth_headers,
+    env_int,
+)
+from cbrain_cli.transport import ACCEPT_ENCODING, ContentDecoder
+
+# Requests in flight at once, by default.
+DEFAULT_CONCURRENCY = 64
+
+# Statuses whose responses have no body.
+BODILESS_STATUSES = (204, 304)
+
+# Errors of a kept-alive connection the server closed while it was idle.
+STALE_CONNECTION_ERRORS = (
+    ConnectionResetError,
+    BrokenPipeError,
+    asyncio.IncompleteReadError,
+)
+
+
+class Response:
+    """
+    Status, headers and (decoded) body of a response.
+    """
+
+    def __init__(self, status, reason, headers, body, will_close):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.will_close = will_close
+
+
+class _Connection:
+    """
+    One HTTP/1.1 connection to a host.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncEngine:
+    """
+    Send GET requests concurrently over pooled keep-alive connections.
+
+    Create and use an engine inside one event loop, and ``await close()``
+    when done.
+
+    Parameters
+    ----------
+    concurrency : int
+        Requests in flight at once
+    host_connections : int, optional
+        Connections open to any one host (default: ``CBRAIN_HOST_CONNECTIONS``
+        or 32)
+    timeout : float, optional
+        Seconds to wait for a connection or a response; None waits forever
+    policy : cli_utils.RetryPolicy, optional
+        Retries of failed requests (default: the running command's retry policy)
+    """
+
+    def __init__(
+        self, concurrency=DEFAULT_CONCURRENCY, host_connections=None, timeout=None, policy=None
+    ):
+        if host_connections is None:
+            host_connections = env_int(
+                ASYNC_HOST_CONNECTIONS_ENV_VAR, DEFAULT_ASYNC_HOST_CONNECTIONS
+            )
+        self.concurrency = concurrency
+        self.host_connections = host_connections
+        self.timeout = timeout
+        self.policy = policy
+        # Created on first use, inside the loop they belong to.
+        self._requests = None
+        self._hosts = {}
+        self._idle = collections.defaultdict(list)
+        self._ssl_context = None
+
+    async def close(self):
+        """
+        Close the idle connections.
+        """
+        idle, self._idle = self._idle, collections.defaultdict(list)
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    # MARK: Requests
+    async def get(self, url, headers=None):
+        """
+        GET ``url`` and return its :class:`Response`, retrying like ``api_get``.
+
+        Raises
+        ------
+        urllib.error.HTTPError
+            For a 4xx or 5xx answer
+        urllib.error.URLError
+            When the server cannot be reached or drops the connection
+        """
+        if self._requests is None:
+            self._requests = asyncio.Semaphore(self.concurrency)
+        policy = self.policy or cli_utils.current_retry_policy()
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise urllib.error.URLError(f"unsupported URL: {url}")
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        attempt = 0
+        while True:
+            try:
+                async with self._requests:
+                    response = await self._exchange(parts, target, headers or {})
+                if response.status >= 400:
+                    raise urllib.error.HTTPError(
+                        url,
+                        response.status,
+                        response.reason,
+                        response.headers,
+                        io.BytesIO(response.body),
+                    )
+                return response
+            except urllib.error.URLError as error:
+                delay = policy.delay_for(error, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                tracing.record_retry("GET", target, attempt, error, delay)
+                await asyncio.sleep(delay)
+
+    async def get_json(self, url, token):
+        """
+        Authenticated GET of ``url``, returning its parsed JSON like ``api_get``.
+        """
+        response = await self.get(url, auth_headers(token))
+        data = cli_utils.decode_json(response.body.decode())
+        for observer in cli_utils.response_observers:
+            observer(url, data)
+        return data
+
+    async def _exchange(self, parts, target, headers):
+        """
+        Send one request over a pooled connection, within the host's connection limit.
+        """
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        if key not in self._hosts:
+            self._hosts[key] = asyncio.Semaphore(self.host_connections)
+
+        trace = None
+        if tracing.is_enabled():
+            started = time.perf_counter()
+            trace = tracing.start_request("GET", parts.hostname, target, 0, started)
+
+        async with self._hosts[key]:
+            idle = self._idle[key]
+            conn = idle.pop() if idle else None
+            reused = conn is not None
+            try:
+                try:
+                    if conn is None:
+                        conn = await self._connect(key, trace)
+                    response = await self._send(conn, parts.netloc, target, headers, reused, trace)
+                except STALE_CONNECTION_ERRORS:
+                    if conn is not None:
+                        conn.close()
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection; retry once on a fresh one.
+                    conn = await self._connect(key, trace)
+                    response = await self._send(conn, parts.netloc, target, headers, False, trace)
+            except BaseException as err:
+                if conn is not None:
+                    conn.close()
+                if trace is not None:
+                    tracing.finish_request(trace, started, error=err)
+                converted = _as_url_error(err)
+                if converted is err:
+                    raise
+                raise converted from err
+            if response.will_close:
+                conn.close()
+            else:
+                idle.append(conn)
+
+        if trace is not None:
+            tracing.finish_request(trace, started)
+        return response
+
+    async def _connect(self, key, trace=None):
+        scheme, host, port = key
+        ssl = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                import ssl as ssl_module
+
+                self._ssl_context = ssl_module.create_default_context()
+            ssl = self._ssl_context
+        connecting = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl), self.timeout
+        )
+        if trace is not None:
+            trace["connect_ms"] = round((time.perf_counter() - connecting) * 1000, 3)
+        return _Connection(reader, writer)
+
+    async def _send(self, conn, netloc, target, headers, reused, trace=None):
+        lines = [
+            f"GET {target} HTTP/1.1",
+            f"Host: {netloc}",
+            f"Accept-Encoding: {ACCEPT_ENCODING}",
+            "Connection: keep-alive",
+            *(f"{name}: {value}" for name, value in headers.items()),
+        ]
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        sent = time.perf_counter()
+        await conn.writer.drain()
+        return await asyncio.wait_for(
+            self._read_response(conn.reader, sent, reused, trace), self.timeout
+        )
+
+    async def _read_response(self, reader, sent, reused, trace=None):
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, _, header_block = head.partition(b"\r\n")
+        version, status, reason = (status_line.decode("latin-1").split(" ", 2) + [""])[:3]
+        status = int(status)
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        if trace is not None:
+            trace.update(
+                reused=reused, status=status, ttfb_ms=round((time.perf_counter() - sent) * 1000, 3)
+            )
+            receiving = time.perf_counter()
+
+        will_close = version == "HTTP/1.0" or headers.get("Connection", "").lower() == "close"
+        if status in BODILESS_STATUSES or 100 <= status < 200:
+            body = b""
+        elif headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = await _read_chunked(reader)
+        elif headers.get("Content-Length") is not None:
+            body = await reader.readexactly(int(headers["Content-Length"]))
+        else:
+            body = await reader.read()
+            will_close = True
+
+        encoding = headers.get("Content-Encoding", "").strip().lower()
+        raw_size = len(body)
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            decoder = ContentDecoder(encoding)
+            body = decoder.decompress(body) + decoder.flush()
+        if trace is not None:
+            trace.update(
+                bytes_in=raw_size,
+                bytes_decoded=len(body),
+                encoding=encoding or None,
+                transfer_ms=round((time.perf_counter() - receiving) * 1000, 3),
+            )
+        return Response(status, reason.strip(), headers, body, will_close)
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size_line = await reader.readuntil(b"\r\n")
+        size = int(size_line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # Skip trailers, up to the empty line ending the body.
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+def _as_url_error(error):
+    """
+    Report a failed exchange the way urllib does, so it is retried and printed alike.
+    """
+    if isinstance(error, (urllib.error.URLError, asyncio.CancelledError)) or not isinstance(
+        error, Exception
+    ):
+        return error
+    if isinstance(error, asyncio.TimeoutError):
+        return urllib.error.URLError(TimeoutError("timed out"))
+    if isinstance(error, asyncio.IncompleteReadError):
+        return urllib.error.URLError(ConnectionResetError("connection closed by the server"))
+    if isinstance(error, (OSError, ValueError, asyncio.LimitOverrunError)):
+        return urllib.error.URLError(error)
+    return error
+
+
+# MARK: Synchronous entry points
+def fetch_json(urls, token, concurrency=DEFAULT_CONCURRENCY, host_connections=None):
+    """
+    GET many URLs on an event loop of their own, yielding results in input order.
+
+    Up to ``concurrency`` requests are in flight; URLs are read lazily, a
+    bounded window ahead of the result being yielded, so a long input does not
+    hold every response in memory. Stopping the iteration early or Ctrl-C
+    cancels the pending requests.
+
+    Parameters
+    ----------
+    urls : iterable of str
+        URLs to GET
+    token : str
+        API token
+    concurrency : int
+        Requests in flight at once
+    host_connections : int, optional
+        Connections open to any one host
+
+    Yields
+    ------
+    tuple
+        ``(url, data, error)``; an exception raised for one URL is yielded as
+        its error instead of aborting the others
+    """
+    loop = asyncio.new_event_loop()
+    engine = AsyncEngine(concurrency, host_connections)
+
+    async def fetch(url):
+        try:
+            return url, await engine.get_json(url, token), None
+        except Exception as e:
+            return url, None, e
+
+    urls = iter(urls)
+    pending = collections.deque(
+        loop.create_task(fetch(url)) for url in itertools.islice(urls, 2 * concurrency)
+    )
+    try:
+        while pending:
+            # The head stays pending until done, so that Ctrl-C cancels it too.
+            result = loop.run_until_complete(pending[0])
+            pending.popleft()
+            for url in itertools.islice(urls, 1):
+                pending.append(loop.create_task(fetch(url)))
+            yield result
+    finally:
+        try:
+            cleanup = loop.create_task(_shutdown(pending, engine))
+            while not cleanup.done():
+                # An interrupt raised inside a task leaves a stop of the loop
+                # queued, which ends the first run early.
+                with contextlib.suppress(RuntimeError):
+                    loop.run_until_complete(cleanup)
+        finally:
+            loop.close()
+
+
+async def _shutdown(tasks, engine):
+    """
+    Cancel and await the tasks left pending, then close the engine's connections.
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await engine.close()
+
+
+def fetch_records(path, ids, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Fetch records of the session's server by ID, like ``fetch_many`` but on the engine.
+
+    Parameters
+    ----------
+    path : str
+        API path of the records (``tasks``)
+    ids : list
+        Record IDs
+    concurrency : int
+        Requests in flight at once
+
+    Yields
+    ------
+    tuple
+        ``(id, record, error)`` in input order
+    """
+    urls = (f"{cli_utils.cbrain_url}/{path}/{record_id}" for record_id in ids)
+    for record_id, (_url, data, error) in zip(
+        ids, fetch_json(urls, cli_utils.api_token, concurrency)
+    ):
+        yield record_id, data, error
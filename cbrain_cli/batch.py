@@ -0,0 +1,248 @@
+"""
+Run many CLI command lines in one process (``cbrain batch``).
+
+A batch file holds one command per line, in the grammar of the ``cbrain``
+command line, optionally starting with the word ``cbrain``. Blank lines and
+lines starting with ``#`` are skipped, and words are split like a POSIX shell
+does. Every command of a batch shares one credential load, connection pool
+and set of in-memory caches, so a command costs its HTTP round trips only.
+
+The whole file is parsed, every line by the CLI parser, before the first
+command runs, so a typo on line 40 does not leave a runbook half applied.
+Commands run in file order, or up to ``--parallel`` at a time for independent
+commands; their output is captured per command and reported in file order
+either way. Like in ``cbrain shell``, each command starts from the default
+retry settings and its own trace, reported with its output when tracing is on.
+"""
+
+import contextlib
+import io
+import shlex
+import sys
+import threading
+import time
+
+from cbrain_cli.cli_utils import CliValidationError, in_command_context
+
+# Commands that cannot run inside a batch: they prompt, change the session, or nest.
+EXCLUDED_COMMANDS = ("login", "logout", "batch", "shell", "daemon")
+
+DEFAULT_BATCH_PARALLEL = 1
+MAX_BATCH_PARALLEL = 8
+
+
+def parse_lines(lines):
+    """
+    Parse the lines of a batch file into command lines.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines of the batch file
+
+    Returns
+    -------
+    list of tuple
+        ``(line_number, argv)`` of every command, ``argv`` without the program name
+    """
+    from cbrain_cli.main import requested_command
+
+    commands = []
+    for number, line in enumerate(lines, 1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise CliValidationError(f"line {number}: {e}", field="batch") from None
+        if argv[:1] == ["cbrain"]:
+            argv = argv[1:]
+        if not argv:
+            continue
+        command = requested_command(argv)
+        if command in EXCLUDED_COMMANDS:
+            raise CliValidationError(
+                f"line {number}: '{command}' cannot run in a batch", field="batch"
+            )
+        commands.append((number, argv))
+    return commands
+
+
+def check_commands(commands):
+    """
+    Parse every command line with the CLI parser, so that none runs if any is invalid.
+
+    Raises
+    ------
+    CliValidationError
+        Listing the usage error of every invalid line
+    """
+    from cbrain_cli.main import build_parser, requested_command
+
+    parsers = {}
+    errors = []
+    for number, argv in commands:
+        command = requested_command(argv)
+        if command not in parsers:
+            parsers[command] = build_parser(command)[0]
+        usage = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(usage):
+                parsers[command].parse_args(argv)
+        except SystemExit as e:
+            if e.code:
+                message = usage.getvalue().strip().splitlines()[-1]
+                errors.append(f"line {number}: {message.split(': error: ', 1)[-1]}")
+    if errors:
+        details = "".join(f"\n  {error}" for error in errors)
+        raise CliValidationError(f"{len(errors)} invalid line(s), nothing was run:{details}")
+
+
+def read_commands(path):
+    """
+    Read, parse and check a batch file, or standard input when ``path`` is "-".
+    """
+    if path == "-":
+        commands = parse_lines(sys.stdin.read().splitlines())
+    else:
+        try:
+            with open(path) as f:
+                commands = parse_lines(f.read().splitlines())
+        except OSError as e:
+            raise CliValidationError(f"cannot read {path}: {e.strerror}", field="batch") from None
+    check_commands(commands)
+    return commands
+
+
+class _CapturedOutput(io.TextIOBase):
+    """
+    Text stream writing to the buffer of the command running in the current thread.
+
+    Threads that run no batch command write through to the original stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def release(self):
+        self._local.buffer = None
+
+    def _target(self):
+        return getattr(self._local, "buffer", None) or self._stream
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self._target().isatty()
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+
+def _run_command(number, argv, stdout, stderr, trace=None):
+    """
+    Run one command line with its output captured; return its result record.
+
+    Call it in a context of its own (:func:`cli_utils.in_command_context`):
+    the command gets its own tracer and retry policy there, so that its
+    ``--retries`` or ``--trace`` never affect the commands running alongside.
+    ``trace`` is the trace file (or True for stderr) of a batch run with tracing on.
+    """
+    from cbrain_cli import cli_utils, tracing
+    from cbrain_cli.main import execute
+
+    out, err = stdout.capture(), stderr.capture()
+    tracing.use_tracer(tracing.Tracer())
+    if trace:
+        tracing.enable(trace if isinstance(trace, str) else None)
+    cli_utils.use_retry_policy(cli_utils.default_retry_policy())
+    started = time.monotonic()
+    try:
+        try:
+            code = execute(argv)
+        except SystemExit as e:
+            # argparse exits after printing usage or help.
+            code = e.code if isinstance(e.code, int) or e.code is None else 1
+        except Exception as e:
+            print(f"Operation failed: {e}", file=sys.stderr)
+            code = 1
+    finally:
+        stdout.release()
+        stderr.release()
+    return {
+        "line": number,
+        "command": shlex.join(argv),
+        "exit_code": code or 0,
+        "seconds": round(time.monotonic() - started, 3),
+        "stdout": out.getvalue(),
+        "stderr": err.getvalue(),
+    }
+
+
+def run_commands(commands, parallel=DEFAULT_BATCH_PARALLEL, stop_on_error=False):
+    """
+    Run parsed command lines, yielding their results in file order.
+
+    Parameters
+    ----------
+    commands : list of tuple
+        ``(line_number, argv)`` as returned by :func:`parse_lines`
+    parallel : int
+        Commands run at once; above 1 they must not depend on each other
+    stop_on_error : bool
+        Start no further command once one has failed
+
+    Yields
+    ------
+    dict
+        One record per command that ran (line, command, exit_code, seconds,
+        stdout, stderr), in file order as each command finishes
+    """
+    if parallel < 1 or parallel > MAX_BATCH_PARALLEL:
+        raise CliValidationError(
+            f"parallel must be between 1 and {MAX_BATCH_PARALLEL}", field="--parallel"
+        )
+    from cbrain_cli import tracing
+
+    # Tracing the batch (cbrain --trace batch ...) traces each of its commands.
+    trace = tracing.is_enabled() and (tracing.current().trace_file or True)
+    run_command = in_command_context(_run_command)
+    stdout, stderr = _CapturedOutput(sys.stdout), _CapturedOutput(sys.stderr)
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        if parallel == 1:
+            for number, argv in commands:
+                result = run_command(number, argv, stdout, stderr, trace)
+                yield result
+                if stop_on_error and result["exit_code"]:
+                    return
+            return
+
+        import concurrent.futures
+
+        from cbrain_cli import transport
+
+        transport.ensure_pool_size(parallel)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [
+                executor.submit(run_command, number, argv, stdout, stderr, trace)
+                for number, argv in commands
+            ]
+            failed = False
+            for future in futures:
+                if failed and future.cancel():
+                    continue
+                result = future.result()
+                yield result
+                if stop_on_error and result["exit_code"]:
+                    failed = True
+    finally:
+        sys.stdout, sys.stderr = saved
@@ -1,19 +1,67 @@
+import collections
+import contextvars
 import functools
+import importlib.util
+import itertools
 import json
+import random
 import re
+import socket
+import sys
+import threading
+import time
+import types
 import urllib.error
 import urllib.parse
-import urllib.request
 
 # import importlib.metadata
-from cbrain_cli.config import DEFAULT_HEADERS, auth_headers, load_credentials
-
-credentials = load_credentials() or {}
+from cbrain_cli import tracing
+from cbrain_cli.config import (
+    DEFAULT_HEADERS,
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_MAX_DELAY,
+    RETRIES_ENV_VAR,
+    RETRY_MAX_DELAY_ENV_VAR,
+    auth_headers,
+    env_int,
+    load_credentials,
+)
+
+with tracing.phase("load_credentials"):
+    credentials = load_credentials() or {}
 cbrain_url = credentials.get("cbrain_url")
 api_token = credentials.get("api_token")
 user_id = credentials.get("user_id")
 cbrain_timestamp = credentials.get("timestamp")
 
+# Upper bound for --prefetch (pages fetched in parallel while walking a listing).
+MAX_PREFETCH = 16
+
+# Concurrent requests of a `show` command given several IDs (--parallel).
+DEFAULT_SHOW_PARALLEL = 4
+MAX_SHOW_PARALLEL = 16
+
+# Above MAX_SHOW_PARALLEL, `show` sends its requests from the asyncio engine
+# (cbrain_cli.aio) instead of one thread per request, up to this many at once.
+MAX_ASYNC_PARALLEL = 1024
+
+# Seconds between poll cycles of the `watch` commands: the shortest, used while
+# states change, and the longest it backs off to while nothing changes.
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_MAX_POLL_INTERVAL = 60.0
+
+# Rows used to size table columns when records are streamed rather than listed.
+STREAM_SAMPLE_ROWS = 1000
+
+# Table lines written to stdout at once, and the longest a line waits in the
+# buffer before being written.
+TABLE_WRITE_LINES = 512
+TABLE_FLUSH_SECONDS = 0.1
+
+# Statuses worth retrying: rate limiting and an overloaded or restarting portal.
+RETRY_STATUSES = {429, 502, 503, 504}
+
 PAGINATABLE_ACTIONS = {
     ("file", "list"),
     ("dataprovider", "list"),
@@ -255,15 +303,290 @@ def version_info(args):
     #     return 1
 
 
-def api_get(url, token, params=None):
+# Held while a lazily imported module runs its code.
+_lazy_import_lock = threading.RLock()
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Module whose code runs when one of its attributes is first used.
+
+    Unlike ``importlib.util.LazyLoader`` (before Python 3.12), other threads
+    using the module meanwhile wait for its code to finish instead of seeing it
+    half executed, as the commands of ``cbrain batch --parallel`` would.
+    """
+
+    def __getattribute__(self, attr):
+        if attr.startswith("__") and attr.endswith("__"):
+            return object.__getattribute__(self, attr)
+        with _lazy_import_lock:
+            if type(self) is _LazyModule:
+                object.__getattribute__(self, "__spec__").loader.exec_module(self)
+                self.__class__ = types.ModuleType
+        return getattr(self, attr)
+
+
+def lazy_import(name):
+    """
+    Import a module whose code only runs when one of its attributes is first used.
+
+    Parameters
+    ----------
+    name : str
+        Absolute module name
+
+    Returns
+    -------
+    module
+        The module, already loaded if it had been imported before
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    module = importlib.util.module_from_spec(spec)
+    module.__class__ = _LazyModule
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def _urllib_request():
+    """
+    Return ``urllib.request`` with the pooled opener installed.
+
+    The HTTP stack is the most expensive import of the CLI, so it is loaded
+    on the first request rather than at startup.
+    """
+    import urllib.request
+
+    from cbrain_cli import transport  # noqa: F401  (installs the pooled opener)
+
+    return urllib.request
+
+
+def parse_retry_after(value):
+    """
+    Convert a Retry-After header (seconds or an HTTP date) to seconds from now.
+
+    Returns None when the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    import email.utils
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter for idempotent requests.
+
+    Parameters
+    ----------
+    retries : int
+        Retries after the first attempt; 0 disables retrying
+    base_delay : float
+        Upper bound of the first backoff, in seconds; doubled on every retry
+    max_delay : float
+        Longest wait between attempts, in seconds. A Retry-After asking for
+        more than this ends the retries instead of being shortened.
+    """
+
+    def __init__(
+        self,
+        retries=DEFAULT_RETRIES,
+        base_delay=DEFAULT_RETRY_BASE_DELAY,
+        max_delay=DEFAULT_RETRY_MAX_DELAY,
+    ):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay_for(self, error, attempt):
+        """
+        Seconds to wait before retrying after ``error``, or None to give up.
+
+        Parameters
+        ----------
+        error : urllib.error.URLError
+            Error raised by the attempt
+        attempt : int
+            Number of retries already made
+        """
+        if attempt >= self.retries:
+            return None
+        if isinstance(error, urllib.error.HTTPError):
+            if error.code not in RETRY_STATUSES:
+                return None
+            retry_after = parse_retry_after(error.headers and error.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_delay else None
+        elif not isinstance(error.reason, (ConnectionError, TimeoutError, socket.timeout)):
+            return None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def default_retry_policy():
+    """
+    Retry policy configured by the environment (``CBRAIN_RETRIES``, ...).
+    """
+    return RetryPolicy(
+        retries=env_int(RETRIES_ENV_VAR, DEFAULT_RETRIES, minimum=0),
+        max_delay=env_int(RETRY_MAX_DELAY_ENV_VAR, DEFAULT_RETRY_MAX_DELAY, minimum=0),
+    )
+
+
+retry_policy = default_retry_policy()
+
+# Retry policy of the command running in the current context, when it has one
+# of its own (every command of `cbrain batch`); `retry_policy` otherwise.
+_command_retry_policy = contextvars.ContextVar("command_retry_policy", default=None)
+
+
+def current_retry_policy():
+    """
+    Return the retry policy of the running command.
+    """
+    return _command_retry_policy.get() or retry_policy
+
+
+def use_retry_policy(policy):
+    """
+    Give the command running in the current context its own retry policy.
+    """
+    _command_retry_policy.set(policy)
+
+
+def in_command_context(func):
+    """
+    Wrap ``func`` to run in a copy of the caller's context.
+
+    Worker threads then use the retry policy and tracer of the command that
+    started them rather than the process-wide ones.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(func, *args)
+
+
+# Callables notified of every parsed GET response as ``observer(url, data)``;
+# `cbrain shell` uses this to complete the IDs of records seen recently.
+response_observers = []
+
+
+def configure_retries(retries=None, max_delay=None):
+    """
+    Override the retry limits from the command line.
+    """
+    if retries is not None:
+        if retries < 0:
+            raise CliValidationError("retries must be 0 or greater", field="--retries")
+        current_retry_policy().retries = retries
+    if max_delay is not None:
+        if max_delay < 0:
+            raise CliValidationError(
+                "retry max delay must be 0 or greater", field="--retry-max-delay"
+            )
+        current_retry_policy().max_delay = max_delay
+
+
+def _urlopen(req, idempotent=False, opener=None, policy=None, timeout=None):
+    """
+    Open ``req``, retrying idempotent requests according to the command's retry policy.
+
+    A :class:`~cbrain_cli.client.CbrainClient` passes its own ``opener``,
+    retry ``policy`` and ``timeout`` in seconds instead of the process-wide ones.
+    """
+    request = _urllib_request()
+    policy = policy or current_retry_policy()
+    options = {} if timeout is None else {"timeout": timeout}
+    attempt = 0
+    while True:
+        try:
+            if opener is not None:
+                return opener.open(req, **options)
+            return request.urlopen(req, **options)
+        except urllib.error.URLError as error:
+            delay = policy.delay_for(error, attempt) if idempotent else None
+            if delay is None:
+                raise
+            if isinstance(error, urllib.error.HTTPError):
+                error.close()
+            attempt += 1
+            tracing.record_retry(req.get_method(), req.selector, attempt, error, delay)
+            time.sleep(delay)
+
+
+@tracing.timed("json_decode")
+def decode_json(text):
+    """
+    Parse a JSON response body.
+    """
+    return json.loads(text)
+
+
+def api_get(url, token, params=None, cache=False):
     """
     Execute an authenticated GET request and return parsed JSON.
+
+    Overloaded-server responses and dropped connections are retried. With
+    ``cache=True`` (reference data that rarely changes), responses with an
+    ETag or Last-Modified header are kept in the on-disk HTTP cache and
+    revalidated on the next request; a 304 Not Modified is served from it.
     """
     if params:
         url = f"{url}?{urllib.parse.urlencode(params)}"
-    req = urllib.request.Request(url, headers=auth_headers(token), method="GET")
-    with urllib.request.urlopen(req) as r:
-        return json.loads(r.read().decode())
+    request = _urllib_request()
+    req = request.Request(url, headers=auth_headers(token), method="GET")
+    if not cache:
+        with _urlopen(req, idempotent=True) as r:
+            body = r.read()
+        return _decoded(url, body)
+
+    from cbrain_cli import http_cache
+
+    cached = http_cache.lookup(user_id, url)
+    if cached:
+        for name, value in http_cache.conditional_headers(cached).items():
+            req.add_header(name, value)
+    try:
+        with _urlopen(req, idempotent=True) as r:
+            body = r.read()
+            http_cache.store(user_id, url, r.headers, body)
+    except urllib.error.HTTPError as error:
+        if error.code != 304 or not cached:
+            raise
+        error.close()
+        body = cached[2]
+        http_cache.revalidated(user_id, url)
+    return _decoded(url, body)
+
+
+def _decoded(url, body):
+    """
+    Parse the JSON body of a GET of ``url`` and notify the response observers.
+    """
+    data = decode_json(body.decode())
+    for observer in response_observers:
+        observer(url, data)
+    return data
+
+
+def invalidate_cached(url):
+    """
+    Forget cached GET responses of the collection a mutating request to ``url`` touches.
+    """
+    from cbrain_cli import http_cache
+
+    http_cache.invalidate(user_id, http_cache.collection_url(url))
 
 
 def api_post_form(url, form_data, headers=None):
@@ -272,26 +595,307 @@ def api_post_form(url, form_data, headers=None):
     """
     headers = headers or DEFAULT_HEADERS
     body = urllib.parse.urlencode(form_data).encode()
-    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
-    with urllib.request.urlopen(req) as r:
-        return json.loads(r.read().decode())
+    request = _urllib_request()
+    req = request.Request(url, data=body, headers=headers, method="POST")
+    with request.urlopen(req) as r:
+        raw = r.read().decode()
+    return decode_json(raw)
 
 
-def api_send(url, token, method="POST", payload=None):
+def api_send(url, token, method="POST", payload=None, idempotent=False):
     """
     Execute an authenticated POST/PUT/DELETE request and return (data, status).
+
+    Pass ``idempotent=True`` for requests that are safe to repeat, so they
+    are retried like GETs. Cached GET responses of the collection the request
+    changes (``/tags`` for ``PUT /tags/5``) are invalidated.
     """
     headers = auth_headers(token)
     body = None
     if payload is not None:
         headers["Content-Type"] = "application/json"
         body = json.dumps(payload).encode()
-    req = urllib.request.Request(url, data=body, headers=headers, method=method)
-    with urllib.request.urlopen(req) as r:
-        raw = r.read().decode()
-        return (json.loads(raw) if raw.strip() else {}), r.status
+    request = _urllib_request()
+    req = request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with _urlopen(req, idempotent=idempotent) as r:
+            raw = r.read().decode()
+            return (decode_json(raw) if raw.strip() else {}), r.status
+    finally:
+        invalidate_cached(url)
+
+
+# End of a page of a RecordStream (records may be None).
+_NO_RECORD = object()
+
+
+class RecordStream:
+    """
+    Lazy iterator over the records of consecutive API pages.
+
+    Only the page currently being consumed is held in memory. Truthiness peeks
+    at the first record, so ``if not records:`` behaves as it does for a list,
+    and ``count`` tells how many records have been consumed so far.
+
+    Parameters
+    ----------
+    pages : iterable of list
+        Pages of records, typically from :func:`paginate`.
+    """
+
+    def __init__(self, pages):
+        self._pages = iter(pages)
+        self._page = iter(())
+        self._peeked = []
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def _next_record(self):
+        record = next(self._page, _NO_RECORD)
+        while record is _NO_RECORD:
+            # Page requests are not part of the phase consuming the records.
+            with tracing.paused():
+                page = next(self._pages, None)
+            if page is None:
+                raise StopIteration
+            self._page = iter(page)
+            record = next(self._page, _NO_RECORD)
+        return record
+
+    def __next__(self):
+        record = self._peeked.pop() if self._peeked else self._next_record()
+        self.count += 1
+        return record
+
+    def __bool__(self):
+        if not self._peeked:
+            try:
+                self._peeked.append(self._next_record())
+            except StopIteration:
+                return False
+        return True
+
+
+def page_ids(records):
+    """
+    Return the IDs of a page of records, to tell whether a page repeats the previous one.
+
+    Endpoints that are not paginated (``/groups``, ``/bourreaux``, ...) may
+    ignore ``page`` and return the same full page for every page number.
+    """
+    return [record.get("id") if isinstance(record, dict) else record for record in records]
+
 
+def paginate(url, token, params, prefetch=1):
+    """
+    Yield successive pages of a list endpoint, starting at ``params["page"]``.
+
+    Iteration stops after an empty page, a short page (fewer records than
+    ``per_page``) or a page repeating the previous one. With ``prefetch``
+    greater than 1, that many pages are kept in flight on a thread pool and
+    yielded in page order.
+    """
+    page = int(params.get("page", 1))
+    per_page = int(params.get("per_page", 25))
+    if prefetch > 1:
+        yield from _prefetch_pages(url, token, params, page, per_page, prefetch)
+        return
+    previous = None
+    while True:
+        records = api_get(url, token, {**params, "page": str(page)})
+        if not records or page_ids(records) == previous:
+            return
+        yield records
+        if len(records) < per_page:
+            return
+        previous = page_ids(records)
+        page += 1
+
+
+def _prefetch_pages(url, token, params, page, per_page, prefetch):
+    """
+    Keep ``prefetch`` page requests running and yield their results in order.
+
+    Pages requested past the end of the listing are cancelled or discarded once
+    a short or repeated page has been seen.
+    """
+
+    @in_command_context
+    def fetch(page_number):
+        return api_get(url, token, {**params, "page": str(page_number)})
+
+    import concurrent.futures
+
+    from cbrain_cli import transport
+
+    # Keep one pooled connection per in-flight request.
+    transport.ensure_pool_size(prefetch)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pending = collections.deque(executor.submit(fetch, page + i) for i in range(prefetch))
+        next_page = page + prefetch
+        previous = None
+        try:
+            while pending:
+                records = pending.popleft().result()
+                if not records or page_ids(records) == previous:
+                    return
+                yield records
+                if len(records) < per_page:
+                    return
+                previous = page_ids(records)
+                pending.append(executor.submit(fetch, next_page))
+                next_page += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def api_get_list(url, token, params, fetch_all=False, prefetch=1, cache=False):
+    """
+    GET a paginated list endpoint: one page, or a :class:`RecordStream` over all pages.
+
+    ``cache`` applies to the single page only; walks over every page bypass
+    the HTTP cache.
+    """
+    if fetch_all:
+        return RecordStream(paginate(url, token, params, prefetch=prefetch))
+    return api_get(url, token, params, cache=cache)
 
+
+def record_count(records):
+    """
+    Number of records in a list, or consumed so far from a :class:`RecordStream`.
+    """
+    if isinstance(records, RecordStream):
+        return records.count
+    return len(records)
+
+
+def iter_ids(values, stdin=None):
+    """
+    Yield command line IDs, reading ``"-"`` as whitespace-separated IDs from stdin.
+
+    Stdin is read line by line, so IDs can be consumed while they are produced.
+
+    Parameters
+    ----------
+    values : iterable
+        Parsed IDs, possibly including ``"-"``
+    stdin : file, optional
+        Stream to read IDs from instead of ``sys.stdin``
+    """
+    for value in values:
+        if value != "-":
+            yield value
+            continue
+        for line in stdin or sys.stdin:
+            for token in line.split():
+                try:
+                    yield int(token)
+                except ValueError:
+                    raise CliValidationError(f"Invalid ID: {token!r}", field="-") from None
+
+
+def read_ids(values, stdin=None):
+    """
+    Expand the ID arguments of a ``show`` command.
+
+    Parameters
+    ----------
+    values : int or list
+        Parsed IDs; ``"-"`` stands for whitespace-separated IDs read from stdin
+    stdin : file, optional
+        Stream to read IDs from instead of ``sys.stdin``
+
+    Returns
+    -------
+    list of int
+        IDs in the order given
+    """
+    if not isinstance(values, list):
+        return [values]
+    ids = list(iter_ids(values, stdin))
+    if not ids:
+        raise CliValidationError("No IDs given", field="-")
+    return ids
+
+
+def error_message(error):
+    """
+    One-line description of an error raised while fetching a record.
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return f"{get_status_code_description(error.code)}: {error.reason}"
+    if isinstance(error, urllib.error.URLError):
+        return f"Connection failed: {error.reason}"
+    if isinstance(error, json.JSONDecodeError):
+        return "Invalid response from server"
+    return str(error)
+
+
+def fetch_many(fetch, ids, parallel=DEFAULT_SHOW_PARALLEL):
+    """
+    Call ``fetch(id)`` for every ID, ``parallel`` at a time.
+
+    Yields ``(id, result, error)`` tuples in input order; an exception raised
+    for one ID is yielded as its error instead of aborting the others.
+    """
+
+    def attempt(item_id):
+        try:
+            return item_id, fetch(item_id), None
+        except Exception as e:
+            return item_id, None, e
+
+    if parallel <= 1 or len(ids) <= 1:
+        yield from map(attempt, ids)
+        return
+
+    import concurrent.futures
+
+    from cbrain_cli import transport
+
+    transport.ensure_pool_size(parallel)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(parallel, len(ids))) as executor:
+        yield from executor.map(in_command_context(attempt), ids)
+
+
+class PollInterval:
+    """
+    Adaptive delay between the poll cycles of a ``watch`` command.
+
+    The delay drops back to ``minimum`` whenever a cycle saw a change and grows
+    by ``factor`` after every idle cycle, up to ``maximum``.
+    """
+
+    def __init__(
+        self, minimum=DEFAULT_POLL_INTERVAL, maximum=DEFAULT_MAX_POLL_INTERVAL, factor=1.5
+    ):
+        if minimum <= 0:
+            raise CliValidationError("interval must be greater than 0", field="--interval")
+        if maximum < minimum:
+            raise CliValidationError(
+                "max interval must not be less than --interval", field="--max-interval"
+            )
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def next(self, changed):
+        """
+        Seconds to wait before the next cycle, given whether the last one saw a change.
+        """
+        if changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        return self.current
+
+
+@tracing.timed("format")
 def output_json(args, data):
     """
     Print data as JSON or JSONL if requested. Returns True if output was handled.
@@ -305,6 +909,23 @@ def output_json(args, data):
     return False
 
 
+def name_field(field):
+    """
+    Key of the name resolved for ID field ``field`` (``bourreau_id`` -> ``bourreau_name``).
+    """
+    return f"{field[:-3] if field.endswith('_id') else field}_name"
+
+
+def named_id(record, field):
+    """
+    Table cell of ID column ``field``: ``name (id)`` once --resolve-names added the name.
+    """
+    value = record.get(field, "")
+    name = record.get(name_field(field))
+    return value if name is None else f"{name} ({value})"
+
+
+@tracing.timed("format")
 def display_key_value_table(pairs):
     """
     Print a (key-value) two-column Field/Value table from a list of (field, value) tuples.
@@ -313,29 +934,116 @@ def display_key_value_table(pairs):
     dynamic_table_print(rows, ["field", "value"], ["Field", "Value"])
 
 
+@tracing.timed("format")
 def json_printer(data):
     """
     Print data in JSON format.
+    A RecordStream is printed record by record as the same indented JSON array.
     """
+    if isinstance(data, RecordStream):
+        separator = "[\n"
+        for item in data:
+            item_text = json.dumps(item, indent=2).replace("\n", "\n  ")
+            print(f"{separator}  {item_text}", end="")
+            separator = ",\n"
+        print("[]" if separator == "[\n" else "\n]")
+        return
     print(json.dumps(data, indent=2))
 
 
+@tracing.timed("format")
 def jsonl_printer(data):
     """
     Print data in JSONL format.
     Each object is printed as a single line of JSON with no indentation.
     For lists, each object is separated by newlines with no commas or enclosing brackets.
     """
-    if isinstance(data, list):
+    if isinstance(data, (list, RecordStream)):
         for item in data:
             print(json.dumps(item, separators=(",", ":")))
     else:
         print(json.dumps(data, separators=(",", ":")))
 
 
+def print_show_results(results, args, print_details):
+    """
+    Print the records of a multi-ID ``show`` in input order.
+
+    With --json or --jsonl, records are streamed as an array or one per line
+    and a failed ID appears as ``{"id": ..., "error": ...}``. Otherwise every
+    record is printed with ``print_details`` and failures as error lines.
+
+    Parameters
+    ----------
+    results : iterable of tuple
+        ``(id, record, error)`` tuples, as yielded by :func:`fetch_many`
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    print_details : callable
+        Formatter printing one record, called as ``print_details(record, args)``
+
+    Returns
+    -------
+    int
+        Number of IDs that could not be shown
+    """
+    failed = 0
+
+    def outcomes():
+        nonlocal failed
+        for item_id, record, error in results:
+            if error is None and record is None:
+                error = "No data returned"
+            if error is not None:
+                failed += 1
+                yield item_id, None, error_message(error)
+            else:
+                yield item_id, record, None
+
+    stream = RecordStream(
+        [record if message is None else {"id": item_id, "error": message}]
+        for item_id, record, message in outcomes()
+    )
+    if output_json(args, stream):
+        return failed
+
+    separator = ""
+    for item_id, record, message in outcomes():
+        print(separator, end="")
+        separator = "\n"
+        if message is None:
+            print_details(record, args)
+        else:
+            print(f"Error: ID {item_id}: {message}")
+    return failed
+
+
+def print_fields_table(records, fields, args):
+    """
+    Print records reduced to ``--fields``: as JSON/JSONL, or as a table of those columns.
+
+    Parameters
+    ----------
+    records : list or RecordStream
+        Projected records of a list command
+    fields : list of str
+        Selected fields, used as the table columns and headers
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    """
+    if output_json(args, records):
+        return
+    if not records:
+        print("No records found.")
+        return
+    rows = ({field: record.get(field, "") for field in fields} for record in records)
+    dynamic_table_print(rows if isinstance(records, RecordStream) else list(rows), fields)
+    print(f"Total: {record_count(records)} record(s)")
+
+
 def pagination(args, query_params):
     """
-    Validate the per_page parameter.
+    Validate the per_page, page and prefetch parameters.
     """
     per_page = getattr(args, "per_page", 25)
     if per_page < 5 or per_page > 1000:
@@ -345,12 +1053,61 @@ def pagination(args, query_params):
     if page < 1:
         raise CliValidationError("page must be 1 or greater", field="--page")
 
+    prefetch = getattr(args, "prefetch", 1)
+    if prefetch < 1 or prefetch > MAX_PREFETCH:
+        raise CliValidationError(
+            f"prefetch must be between 1 and {MAX_PREFETCH}", field="--prefetch"
+        )
+
     query_params["page"] = str(page)
     query_params["per_page"] = str(per_page)
 
     return query_params
 
 
+class _TableWriter:
+    """
+    Buffer table lines and write them to stdout in chunks.
+
+    A chunk is written once it holds ``TABLE_WRITE_LINES`` lines, or when a
+    line is added more than ``TABLE_FLUSH_SECONDS`` after the last write, so
+    a slow stream still shows rows as they arrive.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.written_at = time.monotonic()
+
+    def add(self, line):
+        self.lines.append(line)
+        if (
+            len(self.lines) >= TABLE_WRITE_LINES
+            or time.monotonic() - self.written_at > TABLE_FLUSH_SECONDS
+        ):
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append("")
+            sys.stdout.write("\n".join(self.lines))
+            self.lines = []
+            sys.stdout.flush()
+        self.written_at = time.monotonic()
+
+
+def _fit_cell(text, width, truncated=False):
+    """
+    Cut ``text`` to ``width`` characters, ending with an ellipsis when truncated.
+    """
+    if len(text) > width:
+        text = text[:width]
+        truncated = True
+    if truncated and width >= 1:
+        text = text[: width - 3] + "..." if width >= 3 else "." * width
+    return text
+
+
+@tracing.timed("format")
 def dynamic_table_print(
     data,
     columns,
@@ -361,18 +1118,28 @@ def dynamic_table_print(
     indent_wrapped=True,
     max_row_lines=None,
     preserve_blank_lines=False,
+    widths=None,
 ):
     """
     Print data in a dynamically-sized table format with proper column alignment.
 
+    Rows are converted to text once and written to stdout in buffered chunks,
+    so a streamed table uses constant memory whatever its length.
+
     Parameters
     ----------
-    data : list of dict
-        List of dictionaries containing the data to display
+    data : list of dict or iterable of dict
+        Rows to display. Column widths come from every row of a list; for other
+        iterables they come from the first ``STREAM_SAMPLE_ROWS`` rows and later
+        rows are printed as they arrive, truncated to those widths.
     columns : list of str
         List of column keys to extract from each data dictionary
     headers : list of str, optional
         List of header names. If None, uses the column keys as headers
+    widths : dict, optional
+        Declared widths of streamed columns, by key. Declared columns are not
+        sampled, and a stream whose columns are all declared (or wrapped) is
+        printed from its first row on. Lists are always sized from their rows.
 
     Returns
     -------
@@ -387,14 +1154,6 @@ def dynamic_table_print(
     ... ]
     >>> dynamic_table_print(data, ["id", "type", "name"], ["ID", "Type", "File Name"])
     """
-    if not data:
-        print("No data found.")
-        return
-
-    # Lazy imports to avoid adding global deps when not needed
-    import shutil
-    import textwrap
-
     # Use column keys as headers if none provided
     if headers is None:
         headers = columns
@@ -404,6 +1163,29 @@ def dynamic_table_print(
 
     wrap_columns = set(wrap_columns or [])
     max_column_widths = max_column_widths or {}
+    widths = {} if isinstance(data, list) else widths or {}
+
+    def cells(item):
+        return [str(item.get(column, "")) for column in columns]
+
+    if isinstance(data, list):
+        sample = [cells(item) for item in data]
+        rest = iter(())
+    else:
+        # Size undeclared columns from a leading sample and stream the remaining rows.
+        rest = iter(data)
+        sampled = [c for c in columns if c not in widths and c not in wrap_columns]
+        sample_size = STREAM_SAMPLE_ROWS if sampled else 1
+        sample = [cells(item) for item in itertools.islice(rest, sample_size)]
+        rest = map(cells, rest)
+
+    if not sample:
+        print("No data found.")
+        return
+
+    # Lazy imports to avoid adding global deps when not needed
+    import shutil
+    import textwrap
 
     # Determine target total width (terminal width by default)
     if max_total_width is None:
@@ -414,8 +1196,13 @@ def dynamic_table_print(
 
     # Compute base widths for non-wrapped columns; headers included
     base_widths = []
-    for column, header in zip(columns, headers):
-        max_data_width = max(len(str(item.get(column, ""))) for item in data)
+    for index, (column, header) in enumerate(zip(columns, headers)):
+        if column in widths:
+            max_data_width = int(widths[column])
+        elif column in wrap_columns:
+            max_data_width = 0
+        else:
+            max_data_width = max(len(row[index]) for row in sample)
         width = max(max_data_width, len(str(header)))
         # Apply per-column maximums if provided
         if column in max_column_widths:
@@ -440,47 +1227,44 @@ def dynamic_table_print(
             # Try to stay within terminal width budget; if header is larger we accept overflow.
             column_widths[idx] = max(per_wrapped, header_len)
 
+    writer = _TableWriter()
     # Print header and matching separator
-    header_parts = []
-    separator_parts = []
-    for header, width in zip(headers, column_widths):
-        header_parts.append(f"{str(header):<{width}}")
-        separator_parts.append("-" * width)
-
-    print(" ".join(header_parts))
-    print(" ".join(separator_parts))
-
-    # Print each row with wrapping where requested.
-    for item in data:
-        wrapped_cells = []
-        max_lines = 1
-        for col, width in zip(columns, column_widths):
-            raw_value = str(item.get(col, ""))
-            if col in wrap_columns and width > 0:
-                # Preserve explicit newlines by wrapping each paragraph separately.
-                paragraphs = str(raw_value).splitlines() or [""]
-                lines: list[str] = []
-                for para in paragraphs:
-                    if para == "":
-                        if preserve_blank_lines:
-                            lines.append("")
-                        continue
-                    lines.extend(
-                        textwrap.wrap(
-                            para,
-                            width=width,
-                            replace_whitespace=False,
-                            drop_whitespace=False,
-                            break_long_words=True,
-                            break_on_hyphens=True,
-                        )
-                    )
-                wrapped = lines if lines else [""]
-            else:
-                wrapped = [raw_value]
-            wrapped_cells.append(wrapped)
-            if len(wrapped) > max_lines:
-                max_lines = len(wrapped)
+    writer.add(" ".join(f"{str(h):<{w}}" for h, w in zip(headers, column_widths)))
+    writer.add(" ".join("-" * width for width in column_widths))
+    writer.flush()
+
+    def wrap_cell(raw_value, width):
+        # Preserve explicit newlines by wrapping each paragraph separately.
+        lines: list[str] = []
+        for para in raw_value.splitlines() or [""]:
+            if para == "":
+                if preserve_blank_lines:
+                    lines.append("")
+                continue
+            lines.extend(
+                textwrap.wrap(
+                    para,
+                    width=width,
+                    replace_whitespace=False,
+                    drop_whitespace=False,
+                    break_long_words=True,
+                    break_on_hyphens=True,
+                )
+            )
+        return lines or [""]
+
+    def render(row):
+        if not wrap_columns and max_row_lines is None:
+            # Single-line rows: fit every cell to its column.
+            parts = (f"{_fit_cell(text, w):<{w}}" for text, w in zip(row, column_widths))
+            writer.add(" ".join(parts).rstrip())
+            return
+
+        wrapped_cells = [
+            wrap_cell(text, width) if col in wrap_columns and width > 0 else [text]
+            for text, col, width in zip(row, columns, column_widths)
+        ]
+        max_lines = max(len(cell_lines) for cell_lines in wrapped_cells)
 
         # Determine how many lines we will display for this row.
         visible_lines = max_lines if max_row_lines is None else min(max_lines, int(max_row_lines))
@@ -488,9 +1272,8 @@ def dynamic_table_print(
         # Emit lines for the tallest wrapped cell (capped by visible_lines).
         for line_idx in range(visible_lines):
             row_parts = []
-            for (col, width), cell_lines in zip(zip(columns, column_widths), wrapped_cells):
+            for col, width, cell_lines in zip(columns, column_widths, wrapped_cells):
                 text = cell_lines[line_idx] if line_idx < len(cell_lines) else ""
-                truncated_here = False
 
                 # Indent continuation lines for wrapped columns.
                 if line_idx > 0 and indent_wrapped and col in wrap_columns:
@@ -498,27 +1281,16 @@ def dynamic_table_print(
                     text = indent + text
 
                 # If this is the last visible line and there are more lines, append ellipsis
-                if (
+                truncated_here = (
                     col in wrap_columns
                     and line_idx == visible_lines - 1
                     and len(cell_lines) > visible_lines
-                ):
-                    truncated_here = True
-
-                # Ensure we do not overflow column width; append ellipsis if truncated.
-                if len(text) > width:
-                    # Hard truncate to width
-                    text = text[:width]
-                    truncated_here = True
-
-                if truncated_here and width >= 1:
-                    # Add an ellipsis within the width, prefer '...' but scale down if tight.
-                    ellipsis = "..." if width >= 3 else "." * width
-                    # Reserve space for ellipsis when possible.
-                    if width >= 3:
-                        text = text[: max(0, width - len(ellipsis))] + ellipsis
-                    else:
-                        text = ellipsis
-
-                row_parts.append(f"{text:<{width}}")
-            print(" ".join(row_parts).rstrip())
+                )
+                row_parts.append(f"{_fit_cell(text, width, truncated_here):<{width}}")
+            writer.add(" ".join(row_parts).rstrip())
+
+    try:
+        for row in itertools.chain(sample, rest):
+            render(row)
+    finally:
+        writer.flush()
@@ -0,0 +1,313 @@
+"""
+Python client of the CBRAIN API, for scripts and pipelines.
+
+A :class:`CbrainClient` owns everything a request needs: the server URL, the
+API token, a timeout, a retry policy and its own pool of keep-alive
+connections. It shares no session or connection with the CLI or with other
+clients, so a process may talk to several servers (or as several users) at
+once, from several threads. Its requests are recorded by the process-wide
+tracer of :mod:`cbrain_cli.tracing` only while tracing is enabled, so a
+long-running pipeline accumulates nothing. Listings are generators that fetch
+one page at a time as they are consumed; records are the decoded JSON
+dictionaries of the API.
+
+Examples
+--------
+>>> from cbrain_cli import CbrainClient
+>>> with CbrainClient.from_session() as client:  # doctest: +SKIP
+...     for userfile in client.iter_userfiles(data_provider_id=3):
+...         print(userfile["id"], userfile["name"])
+
+Errors are those of ``urllib``: :class:`urllib.error.HTTPError` for an error
+status, :class:`urllib.error.URLError` when the server cannot be reached.
+"""
+
+import json
+import urllib.parse
+import urllib.request
+
+from cbrain_cli import transport
+from cbrain_cli.cli_utils import (
+    DEFAULT_SHOW_PARALLEL,
+    CliValidationError,
+    _urlopen,
+    default_retry_policy,
+    fetch_many,
+    page_ids,
+)
+from cbrain_cli.config import (
+    DEFAULT_POOL_SIZE,
+    POOL_SIZE_ENV_VAR,
+    auth_headers,
+    env_int,
+    load_credentials,
+)
+
+# Seconds to wait for the server to connect or answer a request.
+DEFAULT_TIMEOUT = 60
+
+# Records per page of the listings walked by the iter_* methods.
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+
+class CbrainClient:
+    """
+    Connection to one CBRAIN server with one API token.
+
+    Parameters
+    ----------
+    base_url : str
+        URL of the CBRAIN portal, e.g. ``https://portal.cbrain.mcgill.ca``
+    api_token : str
+        API token of the session, as returned by ``cbrain login``
+    user_id : int, optional
+        ID of the user the token belongs to
+    timeout : float, optional
+        Seconds to wait for a connection or an answer; None waits forever
+    pool_size : int, optional
+        Idle keep-alive connections kept (default: ``CBRAIN_POOL_SIZE`` or 4)
+    retry_policy : cli_utils.RetryPolicy, optional
+        Retries of GET requests (default: ``CBRAIN_RETRIES`` or 3)
+    """
+
+    def __init__(
+        self,
+        base_url,
+        api_token,
+        user_id=None,
+        timeout=DEFAULT_TIMEOUT,
+        pool_size=None,
+        retry_policy=None,
+    ):
+        if not base_url or not api_token:
+            raise CliValidationError("A base URL and an API token are required", field="client")
+        self.base_url = base_url.rstrip("/")
+        self.api_token = api_token
+        self.user_id = user_id
+        self.timeout = timeout
+        self.retry_policy = retry_policy or default_retry_policy()
+        if pool_size is None:
+            pool_size = env_int(POOL_SIZE_ENV_VAR, DEFAULT_POOL_SIZE)
+        self.pool = transport.ConnectionPool(maxsize=pool_size)
+        self._opener = transport.build_opener(self.pool)
+
+    @classmethod
+    def from_session(cls, **kwargs):
+        """
+        Build a client for the session saved by ``cbrain login``.
+
+        Keyword arguments are passed on to :class:`CbrainClient`.
+        """
+        credentials = load_credentials() or {}
+        if not credentials.get("cbrain_url") or not credentials.get("api_token"):
+            raise CliValidationError("Not logged in. Use 'cbrain login' to login first.")
+        return cls(
+            credentials["cbrain_url"],
+            credentials["api_token"],
+            user_id=credentials.get("user_id"),
+            **kwargs,
+        )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.base_url!r}, user_id={self.user_id!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the idle connections of the client.
+        """
+        self.pool.clear()
+
+    # MARK: Requests
+    def url(self, path, params=None):
+        """
+        Absolute URL of an API path (``tasks/12``) with optional query parameters.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        return f"{url}?{urllib.parse.urlencode(params)}" if params else url
+
+    def request(self, method, path, params=None, payload=None, idempotent=None):
+        """
+        Send a request and return its decoded JSON answer and status.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method
+        path : str
+            API path relative to the base URL
+        params : dict, optional
+            Query parameters; None values are left out
+        payload : dict, optional
+            JSON body
+        idempotent : bool, optional
+            Whether the request may be retried; by default only GET is
+
+        Returns
+        -------
+        tuple
+            (data, status), data being None for an empty answer
+        """
+        headers = auth_headers(self.api_token)
+        body = None
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(payload).encode()
+        req = urllib.request.Request(
+            self.url(path, params), data=body, headers=headers, method=method
+        )
+        if idempotent is None:
+            idempotent = method == "GET"
+        with _urlopen(
+            req,
+            idempotent=idempotent,
+            opener=self._opener,
+            policy=self.retry_policy,
+            timeout=self.timeout,
+        ) as r:
+            raw = r.read()
+            return (json.loads(raw.decode()) if raw.strip() else None), r.status
+
+    def get(self, path, **params):
+        """
+        GET an API path and return its decoded JSON answer.
+        """
+        data, _status = self.request("GET", path, params)
+        return data
+
+    # MARK: Listings
+    def iter_pages(self, path, per_page=DEFAULT_PER_PAGE, **filters):
+        """
+        Yield the pages of a listing, fetching each one when the previous is consumed.
+
+        Parameters
+        ----------
+        path : str
+            API path of the listing (``userfiles``)
+        per_page : int
+            Records per request, 1 to 1000
+        **filters
+            Query parameters narrowing the listing; None values are left out
+        """
+        if per_page < 1 or per_page > MAX_PER_PAGE:
+            raise CliValidationError(
+                f"per_page must be between 1 and {MAX_PER_PAGE}", field="per_page"
+            )
+        page, previous = 1, None
+        while True:
+            records = self.get(path, **filters, page=page, per_page=per_page)
+            # Unpaginated listings (groups, bourreaux) return the same page again.
+            if not records or page_ids(records) == previous:
+                return
+            yield records
+            if len(records) < per_page:
+                return
+            previous = page_ids(records)
+            page += 1
+
+    def iter_records(self, path, per_page=DEFAULT_PER_PAGE, **filters):
+        """
+        Yield the records of a listing one by one, across pages (see :meth:`iter_pages`).
+        """
+        for page in self.iter_pages(path, per_page=per_page, **filters):
+            yield from page
+
+    def iter_userfiles(self, **filters):
+        """
+        Yield userfiles, e.g. ``iter_userfiles(data_provider_id=3, type="NiftiFile")``.
+
+        Filters are API parameters: ``group_id``, ``data_provider_id``,
+        ``user_id``, ``parent_id``, ``type``; ``per_page`` sets the page size.
+        """
+        return self.iter_records("userfiles", **filters)
+
+    def iter_tasks(self, **filters):
+        """
+        Yield tasks, e.g. ``iter_tasks(bourreau_id=2)``.
+        """
+        return self.iter_records("tasks", **filters)
+
+    def iter_projects(self, **filters):
+        """
+        Yield projects (groups).
+        """
+        return self.iter_records("groups", **filters)
+
+    def iter_tags(self, **filters):
+        """
+        Yield tags.
+        """
+        return self.iter_records("tags", **filters)
+
+    def iter_tools(self, **filters):
+        """
+        Yield tools.
+        """
+        return self.iter_records("tools", **filters)
+
+    def iter_tool_configs(self, **filters):
+        """
+        Yield tool configurations.
+        """
+        return self.iter_records("tool_configs", **filters)
+
+    def iter_data_providers(self, **filters):
+        """
+        Yield data providers.
+        """
+        return self.iter_records("data_providers", **filters)
+
+    def iter_remote_resources(self, **filters):
+        """
+        Yield remote resources (bourreaux).
+        """
+        return self.iter_records("bourreaux", **filters)
+
+    def iter_background_activities(self, **filters):
+        """
+        Yield background activities.
+        """
+        return self.iter_records("background_activities", **filters)
+
+    # MARK: Records
+    def get_userfile(self, userfile_id):
+        """
+        Return one userfile.
+        """
+        return self.get(f"userfiles/{userfile_id}")
+
+    def get_task(self, task_id):
+        """
+        Return one task.
+        """
+        return self.get(f"tasks/{task_id}")
+
+    def get_many(self, ids, collection="userfiles", parallel=DEFAULT_SHOW_PARALLEL):
+        """
+        Fetch many records of a collection, ``parallel`` requests at a time.
+
+        Parameters
+        ----------
+        ids : iterable of int
+            Record IDs
+        collection : str
+            API path of the records (``userfiles``, ``tasks``, ``tags``, ...)
+        parallel : int
+            Requests in flight at once
+
+        Yields
+        ------
+        tuple
+            ``(id, record, error)`` in input order; a failed request yields
+            its exception as ``error`` instead of stopping the others
+        """
+        ids = list(ids)
+        self.pool.maxsize = max(self.pool.maxsize, parallel)
+        return fetch_many(lambda record_id: self.get(f"{collection}/{record_id}"), ids, parallel)
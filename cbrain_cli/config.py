@@ -15,6 +15,55 @@ SESSION_FILE_NAME = "credentials.json"
 CREDENTIALS_FILE = SESSION_FILE_DIR / SESSION_FILE_NAME
 DEFAULT_CREDENTIALS_MODE = 0o600
 
+# Local SQLite mirror of userfile metadata (see `cbrain file index sync`).
+FILE_INDEX_FILE = SESSION_FILE_DIR / "userfiles_index.sqlite3"
+
+# Cached tool catalogue used by `cbrain tool show`, and how long it stays fresh.
+TOOL_INDEX_FILE = SESSION_FILE_DIR / "tools_index.json"
+DEFAULT_TOOL_INDEX_TTL = 3600
+TOOL_INDEX_TTL_ENV_VAR = "CBRAIN_TOOL_INDEX_TTL"
+
+# Cached names of the groups, users, bourreaux and data providers that list
+# tables refer to by ID (see `--resolve-names`), and how long they stay fresh.
+NAME_CACHE_FILE = SESSION_FILE_DIR / "names_cache.json"
+DEFAULT_NAME_CACHE_TTL = 3600
+NAME_CACHE_TTL_ENV_VAR = "CBRAIN_NAME_CACHE_TTL"
+
+# On-disk cache of GET responses revalidated with ETag / Last-Modified, and
+# its size in MiB (0 disables it).
+HTTP_CACHE_FILE = SESSION_FILE_DIR / "http_cache.sqlite3"
+DEFAULT_HTTP_CACHE_MB = 64
+HTTP_CACHE_MB_ENV_VAR = "CBRAIN_HTTP_CACHE_MB"
+
+# Unix socket of the resident `cbrain daemon`, how long it waits for a command
+# before exiting, and the variable turning forwarding to it off ("0").
+DAEMON_SOCKET_FILE = SESSION_FILE_DIR / "daemon.sock"
+DEFAULT_DAEMON_IDLE_TIMEOUT = 1800
+DAEMON_ENV_VAR = "CBRAIN_DAEMON"
+
+# Command history of `cbrain shell`, and how many lines of it are kept.
+SHELL_HISTORY_FILE = SESSION_FILE_DIR / "shell_history"
+SHELL_HISTORY_LENGTH = 1000
+
+# HTTP connection pool: idle keep-alive connections kept per host.
+DEFAULT_POOL_SIZE = 4
+POOL_SIZE_ENV_VAR = "CBRAIN_POOL_SIZE"
+
+# Connections the asyncio engine (`show --parallel` above 16) opens to one host.
+DEFAULT_ASYNC_HOST_CONNECTIONS = 32
+ASYNC_HOST_CONNECTIONS_ENV_VAR = "CBRAIN_HOST_CONNECTIONS"
+
+# Retries of idempotent requests answered with 429/502/503/504 or dropped.
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 30
+RETRIES_ENV_VAR = "CBRAIN_RETRIES"
+RETRY_MAX_DELAY_ENV_VAR = "CBRAIN_RETRY_MAX_DELAY"
+
+# Request tracing (see `--trace` / `--trace-file`).
+TRACE_ENV_VAR = "CBRAIN_TRACE"
+TRACE_FILE_ENV_VAR = "CBRAIN_TRACE_FILE"
+
 # HTTP headers.
 DEFAULT_HEADERS = {
     "Content-Type": "application/x-www-form-urlencoded",
@@ -87,3 +136,28 @@ def save_credentials(credentials):
         # Non-POSIX: skip permission handling.
         with open(CREDENTIALS_FILE, "w") as f:
             json.dump(credentials, f, indent=2)
+
+
+def env_int(name, default, minimum=1):
+    """
+    Read an integer setting from the environment.
+
+    Parameters
+    ----------
+    name : str
+        Environment variable name
+    default : int
+        Value used when the variable is unset or not a valid integer
+    minimum : int
+        Smallest accepted value; lower values fall back to ``default``
+
+    Returns
+    -------
+    int
+        The configured value
+    """
+    try:
+        value = int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+    return value if value >= minimum else default
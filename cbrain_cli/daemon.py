@@ -0,0 +1,523 @@
+"""
+Resident CBRAIN CLI process serving commands over a Unix socket (``cbrain daemon``).
+
+A daemon keeps the package imported, the credentials loaded, the HTTP
+connection pool warm and the in-memory caches filled. While it runs, ``cbrain``
+forwards its arguments, working directory, ``CBRAIN_*`` environment and
+terminal size over the socket and relays the output it sends back, so a
+command costs little more than its HTTP round trips. Without a daemon (or with ``CBRAIN_DAEMON=0``),
+commands run in-process as usual.
+
+Commands that prompt (``login``, ``shell``), change the session (``logout``),
+read IDs from stdin (``-``) or manage the daemon always run in-process. The daemon
+exits when the session file changes (login, logout, project switch), after
+which commands run in-process again until it is restarted.
+
+The daemon runs one command at a time: a command changes the working
+directory, environment and standard streams of the whole process. While one
+runs, other clients are told the daemon is busy and run their command
+in-process, so a long ``task watch`` never holds up other ``cbrain`` calls. A
+client that goes away (Ctrl-C) interrupts its command in the daemon.
+
+The protocol is one JSON object per line. The client sends
+``{"prog", "argv", "cwd", "env"}`` (or ``{"control": "status" | "stop"}``), ``env``
+holding ``COLUMNS`` and ``LINES`` when the client has a terminal, and the
+daemon answers with ``{"out": text}`` / ``{"err": text}`` messages followed by
+``{"exit": code}``, or ``{"stale": true}`` / ``{"busy": true}`` when it cannot
+run the command.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+from cbrain_cli.config import (
+    CREDENTIALS_FILE,
+    DAEMON_ENV_VAR,
+    DAEMON_SOCKET_FILE,
+    DEFAULT_DAEMON_IDLE_TIMEOUT,
+)
+
+# Commands always run in-process: they prompt, change the session, read the
+# terminal, or manage the daemon.
+LOCAL_ONLY_COMMANDS = ("login", "logout", "shell", "daemon")
+
+# Seconds to wait for a daemon to accept a connection, and for one to start.
+CONNECT_TIMEOUT = 1.0
+START_TIMEOUT = 5.0
+
+# Seconds between checks of the client of a running command, and for other
+# clients to send their request while the daemon is busy.
+WATCH_INTERVAL = 0.1
+
+# Set inside the daemon, whose own commands must never be forwarded.
+serving = False
+
+# Variables describing the client's terminal, so tables fit its width.
+TERMINAL_ENV_VARS = ("COLUMNS", "LINES")
+
+
+def is_enabled():
+    """
+    Whether commands may be forwarded to a daemon (``CBRAIN_DAEMON`` is not "0").
+    """
+    return os.environ.get(DAEMON_ENV_VAR, "").lower() not in ("0", "false", "no")
+
+
+def _check_platform():
+    import socket
+
+    from cbrain_cli.cli_utils import CliValidationError
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise CliValidationError(
+            "The daemon needs Unix domain sockets, which this platform lacks", field="daemon"
+        )
+
+
+def _connect():
+    """
+    Connect to the daemon socket, or return None when no daemon is listening.
+    """
+    import socket
+
+    if not hasattr(socket, "AF_UNIX") or not DAEMON_SOCKET_FILE.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(CONNECT_TIMEOUT)
+    try:
+        conn.connect(str(DAEMON_SOCKET_FILE))
+    except OSError:
+        conn.close()
+        return None
+    conn.settimeout(None)
+    return conn
+
+
+def _forwarded(key):
+    """
+    Whether an environment variable is sent with a forwarded command.
+    """
+    return key.startswith("CBRAIN_") or key in TERMINAL_ENV_VARS
+
+
+def _terminal_env():
+    """
+    Return ``COLUMNS`` and ``LINES`` of the client's terminal, or nothing without one.
+    """
+    import shutil
+
+    size = shutil.get_terminal_size(fallback=(0, 0))
+    if not size.columns:
+        return {}
+    return {"COLUMNS": str(size.columns), "LINES": str(size.lines)}
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+    stream.flush()
+
+
+def _request(message):
+    """
+    Send one control message and return the daemon's answer, or None without a daemon.
+    """
+    conn = _connect()
+    if conn is None:
+        return None
+    with conn, conn.makefile("rwb") as stream:
+        try:
+            _send(stream, message)
+            line = stream.readline()
+        except OSError:
+            return None
+    return json.loads(line) if line else None
+
+
+def forward(argv, command=None):
+    """
+    Run a command in the daemon when one is running.
+
+    Parameters
+    ----------
+    argv : list of str
+        Command line arguments, without the program name
+    command : str, optional
+        Command named in ``argv``; commands of ``LOCAL_ONLY_COMMANDS`` are
+        never forwarded
+
+    Returns
+    -------
+    int or None
+        Exit code of the command run by the daemon, or None when it must run
+        in-process (no daemon, forwarding disabled, stdin input, stale or busy
+        daemon)
+    """
+    if serving or command in LOCAL_ONLY_COMMANDS or "-" in argv or not is_enabled():
+        return None
+    conn = _connect()
+    if conn is None:
+        return None
+    request = {
+        "prog": sys.argv[0] if sys.argv else "cbrain",
+        "argv": list(argv),
+        "cwd": os.getcwd(),
+        "env": {
+            **{key: value for key, value in os.environ.items() if key.startswith("CBRAIN_")},
+            **_terminal_env(),
+        },
+    }
+    outputs = {"out": sys.stdout, "err": sys.stderr}
+    with conn, conn.makefile("rwb") as stream:
+        try:
+            _send(stream, request)
+            for line in stream:
+                message = json.loads(line)
+                if "exit" in message:
+                    return message["exit"]
+                if message.get("stale") or message.get("busy"):
+                    return None
+                for key, text in message.items():
+                    outputs[key].write(text)
+                    outputs[key].flush()
+        except KeyboardInterrupt:
+            print("\nOperation cancelled")
+            return 1
+        except OSError:
+            pass
+    print("Error: lost the connection to the cbrain daemon", file=sys.stderr)
+    return 1
+
+
+def status():
+    """
+    Describe the running daemon.
+
+    Returns
+    -------
+    dict or None
+        Process ID, socket path, start time, uptime, commands served, whether
+        a command is running and idle timeout; None when no daemon is running
+    """
+    return _request({"control": "status"})
+
+
+def stop():
+    """
+    Ask the running daemon to exit.
+
+    Returns
+    -------
+    dict or None
+        Status of the daemon before it stopped, or None when none was running
+    """
+    return _request({"control": "stop"})
+
+
+def start(idle_timeout=DEFAULT_DAEMON_IDLE_TIMEOUT):
+    """
+    Start a daemon in the background unless one is already running.
+
+    Returns
+    -------
+    tuple
+        ``(status, started)``: the daemon's status (None if it failed to
+        start within ``START_TIMEOUT`` seconds) and whether it was started now
+    """
+    _check_platform()
+    running = status()
+    if running is not None:
+        return running, False
+
+    import subprocess
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (package_root, env.get("PYTHONPATH"))))
+    subprocess.Popen(
+        [sys.executable, "-m", "cbrain_cli.daemon", "--idle-timeout", str(idle_timeout)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        running = status()
+        if running is not None:
+            return running, True
+    return None, True
+
+
+class _Relay(io.TextIOBase):
+    """
+    Text stream sending what a command writes to stdout or stderr to the client.
+    """
+
+    def __init__(self, stream, key):
+        self._stream = stream
+        self._key = key
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            # Output of a command whose client went away is dropped.
+            with contextlib.suppress(OSError, ValueError):
+                self._stream.write(
+                    json.dumps({self._key: text}, separators=(",", ":")).encode() + b"\n"
+                )
+                if "\n" in text:
+                    self._stream.flush()
+        return len(text)
+
+    def flush(self):
+        with contextlib.suppress(OSError, ValueError):
+            self._stream.flush()
+
+
+class _Watcher:
+    """
+    Thread watching the daemon socket while a command runs in the main thread.
+
+    Other clients get ``{"busy": true}`` (or the status for control messages),
+    and the command is interrupted with SIGINT when its own client disconnects.
+    A stop request is answered and honoured once the command is over.
+    """
+
+    def __init__(self, server, conn, describe):
+        self.server = server
+        self.conn = conn
+        self.describe = describe
+        self.stop_requested = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._done.set()
+        self._thread.join()
+
+    def _client_gone(self):
+        import socket
+
+        try:
+            return not self.conn.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _interrupt(self):
+        import signal
+
+        with self._lock:
+            if not self._done.is_set():
+                signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+
+    def _answer(self, conn):
+        with conn, conn.makefile("rwb") as stream:
+            conn.settimeout(WATCH_INTERVAL * 10)
+            request = json.loads(stream.readline() or b"{}")
+            control = request.get("control")
+            if control in ("status", "stop"):
+                _send(stream, self.describe())
+                self.stop_requested = self.stop_requested or control == "stop"
+            else:
+                _send(stream, {"busy": True})
+
+    def _watch(self):
+        import select
+
+        watched = [self.server, self.conn]
+        while not self._done.is_set():
+            readable, _, _ = select.select(watched, [], [], WATCH_INTERVAL)
+            if self.conn in readable and self._client_gone():
+                watched.remove(self.conn)
+                self._interrupt()
+            if self.server in readable:
+                try:
+                    conn, _address = self.server.accept()
+                    self._answer(conn)
+                except Exception:
+                    continue
+
+
+def _credentials_fingerprint():
+    try:
+        stat = CREDENTIALS_FILE.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextlib.contextmanager
+def _command_context(request):
+    """
+    Run a forwarded command in the client's directory, ``CBRAIN_*`` environment
+    and terminal size.
+    """
+    cwd, argv = os.getcwd(), sys.argv
+    saved = {key: value for key, value in os.environ.items() if _forwarded(key)}
+    try:
+        os.chdir(request.get("cwd") or cwd)
+        for key in saved:
+            del os.environ[key]
+        os.environ.update(request.get("env") or {})
+        # Usage messages name the client's program, not the daemon's.
+        sys.argv = [request.get("prog") or "cbrain", *request["argv"]]
+        yield
+    finally:
+        sys.argv = argv
+        os.chdir(cwd)
+        for key in [key for key in os.environ if _forwarded(key)]:
+            del os.environ[key]
+        os.environ.update(saved)
+
+
+def _run(request, stream):
+    """
+    Run one forwarded command with its output relayed to the client; return its exit code.
+    """
+    from cbrain_cli import cli_utils, tracing
+    from cbrain_cli.main import main
+
+    out, err = _Relay(stream, "out"), _Relay(stream, "err")
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(_command_context(request))
+        stack.enter_context(contextlib.redirect_stdout(out))
+        stack.enter_context(contextlib.redirect_stderr(err))
+        # Forwarded commands never read the daemon's own stdin.
+        stack.callback(setattr, sys, "stdin", sys.stdin)
+        sys.stdin = io.StringIO()
+        tracing.reset()
+        cli_utils.retry_policy = cli_utils.default_retry_policy()
+        try:
+            code = main(request["argv"])
+        except SystemExit as e:
+            # argparse exits after printing usage or help.
+            code = e.code if isinstance(e.code, int) or e.code is None else 1
+    out.flush()
+    return code or 0
+
+
+def serve(idle_timeout=DEFAULT_DAEMON_IDLE_TIMEOUT):
+    """
+    Serve commands on the daemon socket until stopped or idle for ``idle_timeout`` seconds.
+
+    Parameters
+    ----------
+    idle_timeout : float
+        Seconds without any connection after which the daemon exits; 0 never
+    """
+    global serving
+    import signal
+    import socket
+
+    _check_platform()
+    if status() is not None:
+        from cbrain_cli.cli_utils import CliValidationError
+
+        raise CliValidationError("A daemon is already running", field="daemon")
+
+    DAEMON_SOCKET_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        DAEMON_SOCKET_FILE.unlink()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(str(DAEMON_SOCKET_FILE))
+    finally:
+        os.umask(umask)
+    bound = DAEMON_SOCKET_FILE.stat().st_ino
+    server.listen(16)
+    server.settimeout(idle_timeout or None)
+
+    serving = True
+    fingerprint = _credentials_fingerprint()
+    started = time.time()
+    commands = 0
+    busy = False
+
+    def describe():
+        return {
+            "pid": os.getpid(),
+            "socket": str(DAEMON_SOCKET_FILE),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "uptime_seconds": round(time.time() - started, 1),
+            "commands": commands,
+            "busy": busy,
+            "idle_timeout": idle_timeout,
+        }
+
+    with contextlib.suppress(ValueError):
+        # Exit cleanly (removing the socket) when terminated, and let SIGINT
+        # interrupt a command even when started with SIGINT ignored.
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        while True:
+            try:
+                conn, _address = server.accept()
+            except socket.timeout:
+                return
+            watcher = None
+            # Closing the stream flushes it, which fails if the client is gone.
+            with contextlib.suppress(OSError), conn, conn.makefile("rwb") as stream:
+                conn.settimeout(None)
+                try:
+                    request = json.loads(stream.readline() or b"{}")
+                    control = request.get("control")
+                    if control in ("status", "stop"):
+                        _send(stream, describe())
+                        if control == "stop":
+                            return
+                    elif "argv" in request:
+                        if _credentials_fingerprint() != fingerprint:
+                            _send(stream, {"stale": True})
+                            return
+                        commands += 1
+                        busy = True
+                        watcher = _Watcher(server, conn, describe)
+                        try:
+                            with watcher:
+                                code = _run(request, stream)
+                        finally:
+                            busy = False
+                        _send(stream, {"exit": code})
+                except KeyboardInterrupt:
+                    # The client of the command went away before it ended.
+                    pass
+                except Exception:
+                    # The client went away, sent garbage or the command broke
+                    # down; the daemon keeps serving the next clients.
+                    pass
+            if watcher is not None and watcher.stop_requested:
+                return
+    finally:
+        serving = False
+        server.close()
+        with contextlib.suppress(OSError):
+            if DAEMON_SOCKET_FILE.stat().st_ino == bound:
+                DAEMON_SOCKET_FILE.unlink()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CBRAIN CLI daemon")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_DAEMON_IDLE_TIMEOUT)
+    # Serve through the imported module, whose `serving` flag cbrain_cli.main checks.
+    from cbrain_cli import daemon
+
+    daemon.serve(parser.parse_args().idle_timeout)
@@ -1,4 +1,22 @@
-from cbrain_cli.cli_utils import CliValidationError, api_get, api_token, cbrain_url
+import time
+import urllib.error
+
+from cbrain_cli.cli_utils import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    CliValidationError,
+    PollInterval,
+    api_get,
+    api_token,
+    cbrain_url,
+    iter_ids,
+)
+
+# Statuses after which a background activity no longer progresses on its own;
+# only "Completed" means every item succeeded.
+FINISHED_STATUSES = ("Completed", "PartiallyCompleted", "Failed", "InternalError", "Cancelled")
+# Status reported for a watched activity ID the server does not know (404).
+MISSING_STATUS = "Not Found"
 
 
 def list_background_activities(args):
@@ -37,3 +55,210 @@ def show_background_activity(args):
     if not activity_id:
         raise CliValidationError("Background activity ID is required", field="id")
     return api_get(f"{cbrain_url}/background_activities/{activity_id}", api_token)
+
+
+def is_finished(activity):
+    """
+    Whether an activity reached a final status (or could not be found).
+    """
+    return activity.get("status") in FINISHED_STATUSES or activity.get("status") == MISSING_STATUS
+
+
+def is_failed(activity):
+    """
+    Whether a finished (or missing) activity did not complete every item.
+    """
+    status = activity.get("status")
+    if status == MISSING_STATUS:
+        return True
+    return status in FINISHED_STATUSES and (
+        status != "Completed" or bool(activity.get("num_failures"))
+    )
+
+
+class ActivityWatcher:
+    """
+    Follow the progress of background activities with one list request per poll.
+
+    Every cycle fetches ``/background_activities`` once for all watched IDs
+    instead of showing each activity, and the delay between cycles adapts with
+    :class:`~cbrain_cli.cli_utils.PollInterval`.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including id (IDs or ``-``), interval and
+        max_interval
+
+    Attributes
+    ----------
+    activities : dict
+        Latest known record of every watched activity, by ID
+    """
+
+    def __init__(self, args):
+        self.activity_ids = set(iter_ids(getattr(args, "id", None) or []))
+        if not self.activity_ids:
+            raise CliValidationError("Background activity ID(s) are required", field="id")
+        self.interval = PollInterval(
+            getattr(args, "interval", None) or DEFAULT_POLL_INTERVAL,
+            getattr(args, "max_interval", None) or DEFAULT_MAX_POLL_INTERVAL,
+        )
+        self.activities = {}
+        self.started = time.monotonic()
+        # (elapsed seconds, items done) when the watch started, to measure the rate.
+        self._baseline = None
+
+    def poll(self):
+        """
+        Fetch the watched activities once.
+
+        Watched IDs missing from the listing are shown one by one, since the
+        listing may leave some activities out; only those the server does not
+        know (404) get the "Not Found" status.
+
+        Returns
+        -------
+        dict
+            Activity records by ID
+        """
+        found = {}
+        for activity in api_get(f"{cbrain_url}/background_activities", api_token) or []:
+            activity_id = int(activity.get("id"))
+            if activity_id in self.activity_ids:
+                found[activity_id] = activity
+        for activity_id in sorted(self.activity_ids - set(found)):
+            try:
+                found[activity_id] = api_get(
+                    f"{cbrain_url}/background_activities/{activity_id}", api_token
+                )
+            except urllib.error.HTTPError as e:
+                if e.code != 404:
+                    raise
+                found[activity_id] = {
+                    **self.activities.get(activity_id, {"id": activity_id}),
+                    "status": MISSING_STATUS,
+                }
+        return found
+
+    def update(self, found):
+        """
+        Merge one poll into :attr:`activities` and return the status changes it brought.
+
+        Returns
+        -------
+        list of dict
+            One event per new activity or status change: id, type, status and
+            previous status (None the first time an activity is seen)
+        """
+        changes = []
+        for activity_id in sorted(found):
+            activity = found[activity_id]
+            previous = self.activities.get(activity_id, {}).get("status")
+            if activity_id not in self.activities or previous != activity.get("status"):
+                changes.append(
+                    {
+                        "id": activity_id,
+                        "type": activity.get("type"),
+                        "status": activity.get("status"),
+                        "previous": previous,
+                    }
+                )
+            self.activities[activity_id] = activity
+        return changes
+
+    @property
+    def finished(self):
+        """
+        Whether every watched activity reached a final status.
+        """
+        return all(is_finished(activity) for activity in self.activities.values())
+
+    def progress(self):
+        """
+        Aggregate the item counts of the watched activities.
+
+        The completion rate is measured from the first poll, so the ETA
+        reflects how fast items are being processed while watching.
+
+        Returns
+        -------
+        dict
+            Activity and finished activity counts, items, successes, failures,
+            items done, percentage, rate (items per second, None until
+            measurable), ETA in seconds (None when unknown), elapsed seconds
+            and local time
+        """
+        elapsed = round(time.monotonic() - self.started, 3)
+        items = successes = failures = finished = 0
+        for activity in self.activities.values():
+            items += len(activity.get("items") or [])
+            successes += activity.get("num_successes") or 0
+            failures += activity.get("num_failures") or 0
+            finished += is_finished(activity)
+        done = successes + failures
+        if self._baseline is None:
+            self._baseline = (elapsed, done)
+        since, done_before = self._baseline
+        rate = eta = None
+        if elapsed > since and done > done_before:
+            rate = round((done - done_before) / (elapsed - since), 3)
+            eta = round(max(items - done, 0) / rate, 1)
+        return {
+            "activities": len(self.activities),
+            "finished": finished,
+            "items": items,
+            "successes": successes,
+            "failures": failures,
+            "done": done,
+            "percent": round(100 * done / items, 1) if items else None,
+            "rate": rate,
+            "eta_seconds": eta,
+            "elapsed": elapsed,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def cycles(self, sleep=None):
+        """
+        Poll until every watched activity is finished, waiting with ``sleep``
+        (default :func:`time.sleep`) between cycles.
+
+        Yields
+        ------
+        tuple
+            ``(changes, progress)`` of each cycle (see :meth:`update` and
+            :meth:`progress`); the first cycle reports every watched activity
+        """
+        done = None
+        while True:
+            changes = self.update(self.poll())
+            progress = self.progress()
+            yield changes, progress
+            if self.finished:
+                return
+            changed = bool(changes) or progress["done"] != done
+            done = progress["done"]
+            (sleep or time.sleep)(self.interval.next(changed))
+
+    def summary(self):
+        """
+        Summarize the watched activities once they are finished.
+
+        Returns
+        -------
+        dict
+            Activity, completed and failed counts, IDs of the failed
+            activities, item counts and elapsed seconds
+        """
+        failed_ids = sorted(i for i, activity in self.activities.items() if is_failed(activity))
+        progress = self.progress()
+        return {
+            "activities": len(self.activities),
+            "completed": len(self.activities) - len(failed_ids),
+            "failed": len(failed_ids),
+            "failed_ids": failed_ids,
+            "items": progress["items"],
+            "successes": progress["successes"],
+            "failures": progress["failures"],
+            "seconds": progress["elapsed"],
+        }
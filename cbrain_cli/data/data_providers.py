@@ -2,6 +2,7 @@ from cbrain_cli.cli_utils import (
     CliApiError,
     CliValidationError,
     api_get,
+    api_get_list,
     api_send,
     api_token,
     cbrain_url,
@@ -27,7 +28,7 @@ def show_data_provider(args):
     data_provider_id = getattr(args, "id", None)
     if not data_provider_id:
         return list_data_providers(args)
-    data = api_get(f"{cbrain_url}/data_providers/{data_provider_id}", api_token)
+    data = api_get(f"{cbrain_url}/data_providers/{data_provider_id}", api_token, cache=True)
     if data.get("error"):
         raise CliApiError(data.get("error"))
     return data
@@ -44,11 +45,17 @@ def list_data_providers(args):
 
     Returns
     -------
-    list
-        List of data provider dictionaries
+    list or RecordStream
+        List of data provider dictionaries (a lazy stream over every page with --all)
     """
     params = pagination(args, {})
-    return api_get(f"{cbrain_url}/data_providers", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/data_providers",
+        api_token,
+        params,
+        fetch_all=getattr(args, "all", False),
+        cache=True,
+    )
 
 
 def is_alive(args):
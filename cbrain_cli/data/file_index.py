@@ -0,0 +1,239 @@
+import datetime
+import json
+import sqlite3
+
+from cbrain_cli.cli_utils import (
+    CliValidationError,
+    RecordStream,
+    api_token,
+    cbrain_url,
+    paginate,
+    user_id,
+)
+from cbrain_cli.config import FILE_INDEX_FILE
+
+# Page size and parallel page requests used when walking /userfiles for a sync.
+SYNC_PER_PAGE = 1000
+SYNC_PREFETCH = 4
+
+# Indexed columns, named after the /userfiles query parameters they answer.
+INDEX_COLUMNS = ("group_id", "data_provider_id", "user_id", "parent_id", "type")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS userfiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    group_id INTEGER,
+    data_provider_id INTEGER,
+    user_id INTEGER,
+    parent_id INTEGER,
+    updated_at TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS userfiles_group_id ON userfiles (group_id);
+CREATE INDEX IF NOT EXISTS userfiles_data_provider_id ON userfiles (data_provider_id);
+CREATE INDEX IF NOT EXISTS userfiles_user_id ON userfiles (user_id);
+CREATE INDEX IF NOT EXISTS userfiles_parent_id ON userfiles (parent_id);
+CREATE INDEX IF NOT EXISTS userfiles_type ON userfiles (type);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _connect(create=False):
+    if not create and not FILE_INDEX_FILE.exists():
+        raise CliValidationError(
+            "No local file index found. Run 'cbrain file index sync' first", field="--cached"
+        )
+    if create:
+        FILE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(FILE_INDEX_FILE))
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _read_meta(conn):
+    return dict(conn.execute("SELECT key, value FROM meta"))
+
+
+def _row(record):
+    return (
+        record["id"],
+        record.get("name"),
+        record.get("type"),
+        record.get("group_id"),
+        record.get("data_provider_id"),
+        record.get("user_id"),
+        record.get("parent_id"),
+        record.get("updated_at"),
+        json.dumps(record, separators=(",", ":")),
+    )
+
+
+def _known_updated_at(conn, ids):
+    # Older SQLite builds cap a statement at 999 bound parameters.
+    known = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        known.update(
+            conn.execute(
+                f"SELECT id, updated_at FROM userfiles WHERE id IN ({placeholders})", chunk
+            )
+        )
+    return known
+
+
+def sync_file_index(args):
+    """
+    Mirror ``/userfiles`` metadata into the local SQLite index.
+
+    The API has no ``updated_at`` filter, so every page is listed (at the
+    maximum page size, several pages in parallel); only records whose
+    ``updated_at`` changed are written, and records no longer listed are
+    removed. An index built for another server or user is rebuilt.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments
+
+    Returns
+    -------
+    dict
+        Counts of added, updated, removed and unchanged records, the total
+        number of indexed records, and the sync timestamp
+    """
+    owner = {"cbrain_url": str(cbrain_url), "user_id": str(user_id)}
+    counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+    conn = _connect(create=True)
+    try:
+        with conn:
+            meta = _read_meta(conn)
+            if any(meta.get(key) not in (None, value) for key, value in owner.items()):
+                conn.execute("DELETE FROM userfiles")
+            conn.execute("CREATE TEMP TABLE seen (id INTEGER PRIMARY KEY)")
+
+            pages = paginate(
+                f"{cbrain_url}/userfiles",
+                api_token,
+                {"page": "1", "per_page": str(SYNC_PER_PAGE)},
+                prefetch=SYNC_PREFETCH,
+            )
+            for records in pages:
+                ids = [record["id"] for record in records]
+                known = _known_updated_at(conn, ids)
+                changed = []
+                for record in records:
+                    if record["id"] not in known:
+                        counts["added"] += 1
+                    elif known[record["id"]] != record.get("updated_at"):
+                        counts["updated"] += 1
+                    else:
+                        counts["unchanged"] += 1
+                        continue
+                    changed.append(_row(record))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO userfiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", changed
+                )
+                conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(i,) for i in ids])
+
+            counts["removed"] = conn.execute(
+                "DELETE FROM userfiles WHERE id NOT IN (SELECT id FROM seen)"
+            ).rowcount
+            conn.execute("DROP TABLE seen")
+
+            synced_at = datetime.datetime.now().isoformat()
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                list({**owner, "synced_at": synced_at}.items()),
+            )
+            total = conn.execute("SELECT COUNT(*) FROM userfiles").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {**counts, "total": total, "synced_at": synced_at}
+
+
+def file_index_status(args):
+    """
+    Describe the local file index.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments
+
+    Returns
+    -------
+    dict
+        Index path, server and user it mirrors, last sync time and record count
+    """
+    conn = _connect()
+    try:
+        meta = _read_meta(conn)
+        total = conn.execute("SELECT COUNT(*) FROM userfiles").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "path": str(FILE_INDEX_FILE),
+        "cbrain_url": meta.get("cbrain_url"),
+        "user_id": meta.get("user_id"),
+        "synced_at": meta.get("synced_at"),
+        "total": total,
+    }
+
+
+def _indexed_pages(conn, query, values, per_page):
+    try:
+        cursor = conn.execute(query, values)
+        yield from iter(lambda: cursor.fetchmany(per_page), [])
+    finally:
+        conn.close()
+
+
+def list_indexed_files(args, filters):
+    """
+    List userfiles from the local index instead of the server.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments, including pagination and --all
+    filters : dict
+        ``/userfiles`` query parameters (``group_id``, ``type``, ...) to match
+
+    Returns
+    -------
+    list or RecordStream
+        File dictionaries as last returned by the server
+    """
+    unknown = set(filters) - set(INDEX_COLUMNS)
+    if unknown:
+        raise CliValidationError(f"Cannot filter the local index by {', '.join(sorted(unknown))}")
+
+    conn = _connect()
+    meta = _read_meta(conn)
+    if meta.get("cbrain_url") != str(cbrain_url) or meta.get("user_id") != str(user_id):
+        conn.close()
+        raise CliValidationError(
+            "Local file index belongs to another session. Run 'cbrain file index sync'",
+            field="--cached",
+        )
+
+    where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+    query = f"SELECT record FROM userfiles WHERE {where} ORDER BY id"
+    values = list(filters.values())
+    per_page = getattr(args, "per_page", 25)
+    offset = (getattr(args, "page", 1) - 1) * per_page
+
+    if getattr(args, "all", False):
+        pages = _indexed_pages(conn, f"{query} LIMIT -1 OFFSET ?", values + [offset], per_page)
+        return RecordStream([json.loads(record) for (record,) in page] for page in pages)
+
+    try:
+        rows = conn.execute(f"{query} LIMIT ? OFFSET ?", values + [per_page, offset]).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(record) for (record,) in rows]
@@ -1,17 +1,98 @@
+import concurrent.futures
+import glob
+import itertools
 import json
 import mimetypes
 import os
+import time
+import urllib.error
 import urllib.request
 
+from cbrain_cli import transport
 from cbrain_cli.cli_utils import (
     CliValidationError,
     api_get,
+    api_get_list,
     api_send,
     api_token,
     cbrain_url,
+    get_status_code_description,
+    in_command_context,
+    invalidate_cached,
+    iter_ids,
     pagination,
 )
 from cbrain_cli.config import auth_headers
+from cbrain_cli.data import file_index
+
+# Bytes read from disk per chunk when streaming an upload.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Concurrent uploads for `file upload` with several files.
+DEFAULT_UPLOAD_PARALLEL = 4
+MAX_UPLOAD_PARALLEL = 32
+
+# IDs sent per request, and batches sent concurrently, when `file delete`,
+# `file copy` and `file move` work through many IDs.
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 1000
+DEFAULT_BATCH_PARALLEL = 1
+MAX_BATCH_PARALLEL = 8
+
+
+class MultipartFileBody:
+    """
+    Streamed ``multipart/form-data`` body carrying form fields and one file.
+
+    Iterating yields the form preamble, the file in ``chunk_size`` blocks read
+    from disk, then the closing boundary, so memory use does not depend on the
+    file size. The body can be iterated again (e.g. when a request is retried)
+    and ``len()`` gives the exact Content-Length, computed from the file size.
+
+    Parameters
+    ----------
+    fields : dict
+        Form field names and values sent before the file
+    file_field : str
+        Form field name of the file part
+    file_path : str
+        Path of the file to send
+    mime_type : str
+        Content type of the file part
+    """
+
+    boundary = "----formdata-cbrain-cli"
+
+    def __init__(self, fields, file_field, file_path, mime_type, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        body_parts = []
+        for name, value in fields.items():
+            body_parts += [
+                f"--{self.boundary}",
+                f'Content-Disposition: form-data; name="{name}"',
+                "",
+                str(value),
+            ]
+        file_name = os.path.basename(file_path)
+        body_parts += [
+            f"--{self.boundary}",
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{file_name}"',
+            f"Content-Type: {mime_type}",
+            "",
+        ]
+        self.preamble = ("\r\n".join(body_parts) + "\r\n").encode("utf-8")
+        self.epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+        self.file_size = os.path.getsize(file_path)
+
+    def __len__(self):
+        return len(self.preamble) + self.file_size + len(self.epilogue)
+
+    def __iter__(self):
+        yield self.preamble
+        with open(self.file_path, "rb") as f:
+            yield from iter(lambda: f.read(self.chunk_size), b"")
+        yield self.epilogue
 
 
 def show_file(args):
@@ -35,6 +116,32 @@ def show_file(args):
     return api_get(f"{cbrain_url}/userfiles/{file_id}", api_token)
 
 
+def _post_upload(file_path, data_provider_id, group_id):
+    mime_type, _ = mimetypes.guess_type(file_path)
+    if not mime_type:
+        mime_type = "application/octet-stream"
+
+    body = MultipartFileBody(
+        {"data_provider_id": data_provider_id, "userfile[group_id]": group_id},
+        "upload_file",
+        file_path,
+        mime_type,
+    )
+
+    headers = auth_headers(api_token)
+    headers["Content-Type"] = f"multipart/form-data; boundary={body.boundary}"
+    headers["Content-Length"] = str(len(body))
+
+    request = urllib.request.Request(
+        f"{cbrain_url}/userfiles", data=body, headers=headers, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read().decode("utf-8")), response.status
+    finally:
+        invalidate_cached(request.full_url)
+
+
 def upload_file(args):
     """
     Upload a file to CBRAIN.
@@ -49,68 +156,162 @@ def upload_file(args):
     tuple
         (response_data, response_status, file_name, file_size) or None if error
     """
+    file_path = args.file_path
+    if isinstance(file_path, list):
+        # `file upload` collects one or more paths; this function sends exactly one.
+        if len(file_path) != 1:
+            raise CliValidationError("Exactly one file path is required", field="file_path")
+        file_path = file_path[0]
+
     # Check if file exists.
-    if not os.path.exists(args.file_path):
-        raise CliValidationError(f"File not found: {args.file_path}", field="file_path")
+    if not os.path.exists(file_path):
+        raise CliValidationError(f"File not found: {file_path}", field="file_path")
 
     if args.group_id is None:
         raise CliValidationError("Group ID is required", field="--group-id")
 
-    file_name = os.path.basename(args.file_path)
-    file_size = os.path.getsize(args.file_path)
+    file_name = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
 
-    mime_type, _ = mimetypes.guess_type(args.file_path)
-    if not mime_type:
-        mime_type = "application/octet-stream"
+    response_data, status = _post_upload(file_path, args.data_provider, args.group_id)
+    return response_data, status, file_name, file_size, args.data_provider
 
-    boundary = "----formdata-cbrain-cli"
-    body_parts = [
-        f"--{boundary}",
-        'Content-Disposition: form-data; name="data_provider_id"',
-        "",
-        str(args.data_provider),
-        f"--{boundary}",
-        'Content-Disposition: form-data; name="userfile[group_id]"',
-        "",
-        str(args.group_id),
-        f"--{boundary}",
-        f'Content-Disposition: form-data; name="upload_file"; filename="{file_name}"',
-        f"Content-Type: {mime_type}",
-        "",
-    ]
-
-    body_text = "\r\n".join(body_parts) + "\r\n"
-    with open(args.file_path, "rb") as f:
-        file_content = f.read()
-
-    body = body_text.encode("utf-8") + file_content + f"\r\n--{boundary}--\r\n".encode()
 
-    headers = auth_headers(api_token)
-    headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
-    headers["Content-Length"] = str(len(body))
+def expand_upload_paths(paths, recursive=False):
+    """
+    Expand files, directories and glob patterns into the list of files to upload.
 
-    request = urllib.request.Request(
-        f"{cbrain_url}/userfiles", data=body, headers=headers, method="POST"
-    )
-    with urllib.request.urlopen(request) as response:
-        response_data = json.loads(response.read().decode("utf-8"))
-        return response_data, response.status, file_name, file_size, args.data_provider
+    Parameters
+    ----------
+    paths : list of str
+        Paths as given on the command line
+    recursive : bool
+        Descend into subdirectories of directory arguments
 
+    Returns
+    -------
+    list of str
+        Regular files, in argument order, without duplicates
+    """
+    expanded = []
+    for path in paths:
+        is_pattern = any(char in path for char in "*?[")
+        matches = sorted(glob.glob(path)) if is_pattern else [path]
+        if not matches or not all(os.path.exists(match) for match in matches):
+            raise CliValidationError(f"File not found: {path}", field="file_path")
+        for match in matches:
+            if not os.path.isdir(match):
+                expanded.append(match)
+            elif recursive:
+                for root, dirs, names in os.walk(match):
+                    dirs.sort()
+                    expanded.extend(os.path.join(root, name) for name in sorted(names))
+            else:
+                expanded.extend(
+                    entry.path
+                    for entry in sorted(os.scandir(match), key=lambda entry: entry.name)
+                    if entry.is_file()
+                )
+    return list(dict.fromkeys(expanded))
+
+
+def _upload_record(file_path, data_provider_id, group_id):
+    record = {
+        "file_path": file_path,
+        "file_name": os.path.basename(file_path),
+        "size": None,
+        "status": "failed",
+        "http_status": None,
+        "userfile_id": None,
+        "error": None,
+        "seconds": None,
+    }
+    started = time.monotonic()
+    try:
+        record["size"] = os.path.getsize(file_path)
+        response_data, status = _post_upload(file_path, data_provider_id, group_id)
+        record["http_status"] = status
+        if status in (200, 201):
+            record["status"] = "uploaded"
+            if isinstance(response_data, dict):
+                record["userfile_id"] = response_data.get("id")
+        else:
+            record["error"] = get_status_code_description(status)
+    except urllib.error.HTTPError as e:
+        record["http_status"] = e.code
+        record["error"] = f"{get_status_code_description(e.code)}: {e.reason}"
+    except Exception as e:
+        record["error"] = str(e)
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def upload_files(args):
+    """
+    Upload many files concurrently.
 
-def _change_provider(args, operation):
-    file_ids = getattr(args, "file_id", None)
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including file_path (list of files, directories
+        or glob patterns), data_provider, group_id, recursive and parallel
+
+    Returns
+    -------
+    iterator of dict
+        One record per file (path, size, status, HTTP status, userfile ID,
+        error, elapsed seconds), yielded as each upload finishes
+    """
+    if args.group_id is None:
+        raise CliValidationError("Group ID is required", field="--group-id")
+
+    parallel = getattr(args, "parallel", DEFAULT_UPLOAD_PARALLEL)
+    if parallel < 1 or parallel > MAX_UPLOAD_PARALLEL:
+        raise CliValidationError(
+            f"parallel must be between 1 and {MAX_UPLOAD_PARALLEL}", field="--parallel"
+        )
+
+    file_paths = expand_upload_paths(args.file_path, getattr(args, "recursive", False))
+    if not file_paths:
+        raise CliValidationError("No files to upload", field="file_path")
+
+    def run():
+        transport.ensure_pool_size(parallel)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [
+                executor.submit(
+                    in_command_context(_upload_record), path, args.data_provider, args.group_id
+                )
+                for path in file_paths
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+
+    return run()
+
+
+def _destination_provider(args):
     dest_provider_id = getattr(args, "dp_id", None) or getattr(
         args, "data_provider_id_for_mv_cp", None
     )
-    if not file_ids:
-        raise CliValidationError("File ID(s) are required", field="--file-id")
     if not dest_provider_id:
         raise CliValidationError("Destination data provider ID is required", field="--dp-id")
-    payload = {
+    return dest_provider_id
+
+
+def _change_provider_payload(file_ids, dest_provider_id, operation):
+    return {
         "file_ids": file_ids,
         "data_provider_id_for_mv_cp": dest_provider_id,
         operation: "",
     }
+
+
+def _change_provider(args, operation):
+    file_ids = getattr(args, "file_id", None)
+    if not file_ids:
+        raise CliValidationError("File ID(s) are required", field="--file-id")
+    payload = _change_provider_payload(file_ids, _destination_provider(args), operation)
     return api_send(f"{cbrain_url}/userfiles/change_provider", api_token, payload=payload)
 
 
@@ -148,6 +349,56 @@ def move_file(args):
     return _change_provider(args, "move")
 
 
+def _change_provider_batches(args, operation):
+    dest_provider_id = _destination_provider(args)
+
+    def send(file_ids):
+        payload = _change_provider_payload(
+            [str(file_id) for file_id in file_ids], dest_provider_id, operation
+        )
+        return api_send(f"{cbrain_url}/userfiles/change_provider", api_token, payload=payload)
+
+    return _run_batches(args, send, field="--file-id")
+
+
+def copy_files(args):
+    """
+    Copy many files to a different data provider in batches of IDs.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including file_id (IDs or ``-``), dp_id,
+        from_file, batch_size and parallel
+
+    Returns
+    -------
+    iterator of dict
+        One record per batch, yielded as each batch finishes (see
+        :func:`delete_files`)
+    """
+    return _change_provider_batches(args, "copy")
+
+
+def move_files(args):
+    """
+    Move many files to a different data provider in batches of IDs.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including file_id (IDs or ``-``), dp_id,
+        from_file, batch_size and parallel
+
+    Returns
+    -------
+    iterator of dict
+        One record per batch, yielded as each batch finishes (see
+        :func:`delete_files`)
+    """
+    return _change_provider_batches(args, "move")
+
+
 def list_files(args):
     """
     Get list of all files from CBRAIN.
@@ -155,12 +406,14 @@ def list_files(args):
     Parameters
     ----------
     args : argparse.Namespace
-        Command line arguments, including the --json flag, filter options, and pagination
+        Command line arguments, including the --json flag, filter options, pagination,
+        and --cached to read from the local file index instead of the server
 
     Returns
     -------
-    list or None
-        List of file dictionaries, or None if error
+    list or RecordStream or None
+        List of file dictionaries (a lazy stream over every page with --all),
+        or None if error
     """
     params = {}
     for attr, key in [
@@ -174,8 +427,17 @@ def list_files(args):
         if val is not None:
             params[key] = str(val)
 
+    if getattr(args, "cached", False):
+        return file_index.list_indexed_files(args, params)
+
     params = pagination(args, params)
-    return api_get(f"{cbrain_url}/userfiles", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/userfiles",
+        api_token,
+        params,
+        fetch_all=getattr(args, "all", False),
+        prefetch=getattr(args, "prefetch", 1),
+    )
 
 
 def delete_file(args):
@@ -202,3 +464,124 @@ def delete_file(args):
         payload={"file_ids": [str(file_id)]},
     )
     return data
+
+
+def _batch_ids(args):
+    """
+    Yield the IDs given on the command line, on stdin (``-``) and in --from-file.
+    """
+    yield from iter_ids(getattr(args, "file_id", None) or [])
+    from_file = getattr(args, "from_file", None)
+    if from_file:
+        with open(from_file) as f:
+            yield from iter_ids(["-"], stdin=f)
+
+
+def _send_batch(number, file_ids, send):
+    record = {
+        "batch": number,
+        "files": len(file_ids),
+        "first_id": file_ids[0],
+        "last_id": file_ids[-1],
+        "status": "failed",
+        "http_status": None,
+        "background_activity_id": None,
+        "message": None,
+        "error": None,
+        "seconds": None,
+    }
+    started = time.monotonic()
+    try:
+        data, status = send(file_ids)
+        record["http_status"] = status
+        record["status"] = "submitted"
+        if isinstance(data, dict):
+            record["background_activity_id"] = data.get("background_activity_id")
+            record["message"] = (data.get("message") or "").strip() or None
+    except urllib.error.HTTPError as e:
+        record["http_status"] = e.code
+        record["error"] = f"{get_status_code_description(e.code)}: {e.reason}"
+    except Exception as e:
+        record["error"] = str(e)
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def _run_batches(args, send, field):
+    """
+    Submit the IDs of ``args`` in batches with ``send(file_ids) -> (data, status)``.
+
+    Batches of --batch-size IDs are read lazily and up to --parallel of them
+    are in flight at once; the next batch is only read once a slot is free.
+    """
+    batch_size = getattr(args, "batch_size", DEFAULT_BATCH_SIZE)
+    if batch_size < 1 or batch_size > MAX_BATCH_SIZE:
+        raise CliValidationError(
+            f"batch size must be between 1 and {MAX_BATCH_SIZE}", field="--batch-size"
+        )
+    parallel = getattr(args, "parallel", DEFAULT_BATCH_PARALLEL)
+    if parallel < 1 or parallel > MAX_BATCH_PARALLEL:
+        raise CliValidationError(
+            f"parallel must be between 1 and {MAX_BATCH_PARALLEL}", field="--parallel"
+        )
+
+    ids = _batch_ids(args)
+    first = next(ids, None)
+    if first is None:
+        raise CliValidationError("File ID(s) are required", field=field)
+    ids = itertools.chain([first], ids)
+    batches = iter(lambda: list(itertools.islice(ids, batch_size)), [])
+
+    def run():
+        if parallel == 1:
+            for number, batch in enumerate(batches, 1):
+                yield _send_batch(number, batch, send)
+            return
+        transport.ensure_pool_size(parallel)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+            pending = set()
+            for number, batch in enumerate(batches, 1):
+                pending.add(executor.submit(in_command_context(_send_batch), number, batch, send))
+                if len(pending) >= parallel:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        yield future.result()
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+
+    return run()
+
+
+def delete_files(args):
+    """
+    Delete many files in batches of IDs.
+
+    IDs are read lazily from the command line, stdin and --from-file and
+    grouped into batches of --batch-size, one ``/userfiles/delete_files``
+    request each; up to --parallel batches are in flight at once.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including file_id (IDs or ``-``), from_file,
+        batch_size and parallel
+
+    Returns
+    -------
+    iterator of dict
+        One record per batch (batch number, file count, first and last ID,
+        status, HTTP status, background activity ID, message, error, elapsed
+        seconds), yielded as each batch finishes
+    """
+
+    def send(file_ids):
+        return api_send(
+            f"{cbrain_url}/userfiles/delete_files",
+            api_token,
+            method="DELETE",
+            payload={"file_ids": [str(file_id) for file_id in file_ids]},
+        )
+
+    return _run_batches(args, send, field="file_id")
@@ -0,0 +1,162 @@
+import json
+import os
+import time
+import urllib.error
+
+from cbrain_cli.cli_utils import (
+    RecordStream,
+    api_token,
+    cbrain_url,
+    name_field,
+    paginate,
+    user_id,
+)
+from cbrain_cli.config import (
+    DEFAULT_NAME_CACHE_TTL,
+    NAME_CACHE_FILE,
+    NAME_CACHE_TTL_ENV_VAR,
+    env_int,
+)
+from cbrain_cli.data import tools
+
+# Page size used to fetch a whole dimension.
+DIMENSION_PER_PAGE = 1000
+
+# ID field -> (endpoint listing the referenced records, attribute used as their name).
+NAMED_FIELDS = {
+    "bourreau_id": ("bourreaux", "name"),
+    "remote_resource_id": ("bourreaux", "name"),
+    "data_provider_id": ("data_providers", "name"),
+    "group_id": ("groups", "name"),
+    "tool_id": ("tools", "name"),
+    "user_id": ("users", "login"),
+}
+
+
+def _read_cache():
+    """
+    Return the cached ``{endpoint: {"fetched_at": ..., "names": {...}}}`` of this session.
+    """
+    try:
+        with open(NAME_CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("cbrain_url") != str(cbrain_url) or cache.get("user_id") != str(user_id):
+        return {}
+    return cache.get("dimensions", {})
+
+
+def _write_cache(dimensions):
+    """
+    Save the cached dimensions; failing to write the cache is not an error.
+    """
+    cache = {"cbrain_url": str(cbrain_url), "user_id": str(user_id), "dimensions": dimensions}
+    temp_file = NAME_CACHE_FILE.with_name(f"{NAME_CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        NAME_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_file, "w") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(temp_file, NAME_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def _fetch_dimension(endpoint, attribute, refresh=True):
+    """
+    Fetch the ``{id: name}`` map of every record listed by ``endpoint``.
+
+    Tool names come from the tool catalogue index, which has its own cache;
+    without ``refresh`` that index is only fetched when stale. Returns None
+    when the endpoint is not readable with this session (users other than
+    yourself are only listed to administrators).
+    """
+    try:
+        if endpoint == "tools":
+            catalogue = tools.tool_catalogue(refresh=refresh)
+            return {key: tool.get(attribute) for key, tool in catalogue.items()}
+
+        names = {}
+        params = {"page": "1", "per_page": str(DIMENSION_PER_PAGE)}
+        for page in paginate(f"{cbrain_url}/{endpoint}", api_token, params):
+            for record in page:
+                names[str(record.get("id"))] = record.get(attribute)
+        return names
+    except urllib.error.HTTPError:
+        return None
+
+
+class NameLookup:
+    """
+    Names of referenced records, loading each dimension at most once per run.
+
+    A dimension is read from the local cache while it is fresh; it is fetched
+    whole when the cache is stale or misses an ID, and at most once, so a table
+    costs one request per dimension rather than one per row.
+    """
+
+    def __init__(self):
+        self._cache = _read_cache()
+        self._names = {}
+        self._fetched = set()
+
+    def name(self, field, record_id):
+        """
+        Return the name of the record ``record_id`` referenced by ``field``, or None.
+        """
+        endpoint, attribute = NAMED_FIELDS[field]
+        key = str(record_id)
+        if endpoint not in self._names:
+            self._names[endpoint] = self._cached(endpoint, attribute)
+        if key not in self._names[endpoint] and endpoint not in self._fetched:
+            self._fetched.add(endpoint)
+            fetched = _fetch_dimension(endpoint, attribute)
+            if fetched is not None:
+                self._names[endpoint] = fetched
+                if endpoint != "tools":
+                    self._cache[endpoint] = {"fetched_at": time.time(), "names": fetched}
+                    _write_cache(self._cache)
+        return self._names[endpoint].get(key)
+
+    def _cached(self, endpoint, attribute):
+        if endpoint == "tools":
+            return _fetch_dimension(endpoint, attribute, refresh=False) or {}
+        entry = self._cache.get(endpoint, {})
+        ttl = env_int(NAME_CACHE_TTL_ENV_VAR, DEFAULT_NAME_CACHE_TTL, minimum=0)
+        if time.time() - entry.get("fetched_at", 0) > ttl:
+            return {}
+        return entry.get("names", {})
+
+
+def resolve_names(records, fields):
+    """
+    Add the name of every record referenced by ``fields`` next to its ID.
+
+    Parameters
+    ----------
+    records : list or RecordStream
+        Records as returned by a list command
+    fields : iterable of str
+        ID fields to resolve, keys of ``NAMED_FIELDS`` (``group_id``, ...)
+
+    Returns
+    -------
+    list or RecordStream
+        Copies of the records with a ``<field>_name`` key (``group_name``,
+        ...) for every ID whose name is known; streams stay lazy
+    """
+    lookup = NameLookup()
+
+    def named(record):
+        record = dict(record)
+        for field in fields:
+            if record.get(field) in (None, ""):
+                continue
+            name = lookup.name(field, record[field])
+            if name is not None:
+                record[name_field(field)] = name
+        return record
+
+    if isinstance(records, RecordStream):
+        return RecordStream([named(record)] for record in records)
+    return [named(record) for record in records]
@@ -42,7 +42,7 @@ def switch_project(args):
             f"Invalid group ID '{group_id}'. Must be a number or 'all'", field="group_id"
         ) from None
 
-    api_send(f"{cbrain_url}/groups/switch?id={group_id}", api_token)
+    api_send(f"{cbrain_url}/groups/switch?id={group_id}", api_token, idempotent=True)
     group_data = api_get(f"{cbrain_url}/groups/{group_id}", api_token)
 
     credentials = load_credentials()
@@ -77,7 +77,7 @@ def unswitch_project(args):
         previous_group_name = credentials.get("current_group_name")
 
     if previous_group_id:
-        api_send(f"{cbrain_url}/groups/switch", api_token)
+        api_send(f"{cbrain_url}/groups/switch", api_token, idempotent=True)
 
     if credentials is not None:
         credentials.pop("current_group_id", None)
@@ -112,7 +112,7 @@ def show_project(args):
     if project_id:
         # Show specific project by ID
         try:
-            return api_get(f"{cbrain_url}/groups/{project_id}", api_token)
+            return api_get(f"{cbrain_url}/groups/{project_id}", api_token, cache=True)
         except urllib.error.HTTPError as e:
             if e.code == 404:
                 raise CliApiError(f"Project with ID {project_id} not found") from None
@@ -127,7 +127,7 @@ def show_project(args):
         return None
 
     try:
-        return api_get(f"{cbrain_url}/groups/{current_group_id}", api_token)
+        return api_get(f"{cbrain_url}/groups/{current_group_id}", api_token, cache=True)
     except urllib.error.HTTPError as e:
         if e.code == 404:
             credentials.pop("current_group_id", None)
@@ -151,4 +151,4 @@ def list_projects(args):
     list
         List of project dictionaries
     """
-    return api_get(f"{cbrain_url}/groups", api_token)
+    return api_get(f"{cbrain_url}/groups", api_token, cache=True)
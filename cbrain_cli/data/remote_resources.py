@@ -15,7 +15,7 @@ def list_remote_resources(args):
     list
         List of remote resource dictionaries
     """
-    return api_get(f"{cbrain_url}/bourreaux", api_token)
+    return api_get(f"{cbrain_url}/bourreaux", api_token, cache=True)
 
 
 def show_remote_resource(args):
@@ -35,4 +35,4 @@ def show_remote_resource(args):
     resource_id = getattr(args, "remote_resource", None)
     if not resource_id:
         raise CliValidationError("Remote resource ID is required", field="remote_resource")
-    return api_get(f"{cbrain_url}/bourreaux/{resource_id}", api_token)
+    return api_get(f"{cbrain_url}/bourreaux/{resource_id}", api_token, cache=True)
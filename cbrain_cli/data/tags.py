@@ -1,6 +1,7 @@
 from cbrain_cli.cli_utils import (
     CliValidationError,
     api_get,
+    api_get_list,
     api_send,
     api_token,
     cbrain_url,
@@ -32,11 +33,13 @@ def list_tags(args):
 
     Returns
     -------
-    list
-        List of tag dictionaries
+    list or RecordStream
+        List of tag dictionaries (a lazy stream over every page with --all)
     """
     params = pagination(args, {})
-    return api_get(f"{cbrain_url}/tags", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/tags", api_token, params, fetch_all=getattr(args, "all", False)
+    )
 
 
 def show_tag(args):
@@ -100,7 +103,9 @@ def update_tag(args):
     if not tag_id:
         raise CliValidationError("Tag ID is required", field="tag_id")
     payload = _tag_payload(args)
-    data, status = api_send(f"{cbrain_url}/tags/{tag_id}", api_token, method="PUT", payload=payload)
+    data, status = api_send(
+        f"{cbrain_url}/tags/{tag_id}", api_token, method="PUT", payload=payload, idempotent=True
+    )
     success = status in (200, 201, 204)
     return data, success, None, status
 
@@ -1,13 +1,37 @@
+import time
+
 from cbrain_cli.cli_utils import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
     CliValidationError,
+    PollInterval,
     api_get,
+    api_get_list,
     api_send,
     api_token,
     cbrain_url,
+    iter_ids,
     json_printer,
+    paginate,
     pagination,
 )
 
+# Task statuses after which a task no longer changes on its own.
+COMPLETED_STATUSES = ("Completed",)
+FAILED_STATUSES = (
+    "Failed To Setup",
+    "Failed On Cluster",
+    "Failed To PostProcess",
+    "Failed Setup Prerequisites",
+    "Failed PostProcess Prerequisites",
+    "Terminated",
+)
+# Status reported for a watched task ID the listing does not return.
+MISSING_STATUS = "Not Found"
+
+# Page size of the task listing polled by `task watch`.
+WATCH_PER_PAGE = 1000
+
 
 def list_tasks(args):
     """
@@ -20,8 +44,9 @@ def list_tasks(args):
 
     Returns
     -------
-    list or None
-        List of task dictionaries, or None on error
+    list or RecordStream or None
+        List of task dictionaries (a lazy stream over every page with --all),
+        or None on error
     """
     params = {}
     filter_name = getattr(args, "filter_name", None)
@@ -43,7 +68,13 @@ def list_tasks(args):
         )
 
     params = pagination(args, params)
-    return api_get(f"{cbrain_url}/tasks", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/tasks",
+        api_token,
+        params,
+        fetch_all=getattr(args, "all", False),
+        prefetch=getattr(args, "prefetch", 1),
+    )
 
 
 def show_task(args):
@@ -72,3 +103,161 @@ def operation_task(args):
     """
     data, _ = api_send(f"{cbrain_url}/tasks/operation", api_token)
     json_printer(data)
+
+
+def is_failed(status):
+    """
+    Whether a task status is a failure (including a task that could not be found).
+    """
+    return status in FAILED_STATUSES or status == MISSING_STATUS
+
+
+def is_finished(status):
+    """
+    Whether a task status is terminal: completed, failed, terminated or missing.
+    """
+    return status in COMPLETED_STATUSES or is_failed(status)
+
+
+class TaskWatcher:
+    """
+    Follow the statuses of a set of tasks with one list query per poll cycle.
+
+    Tasks are selected by ID, by batch or by bourreau; IDs can be combined
+    with --batch-id / --bourreau-id to narrow the listing that is polled.
+    Every cycle walks the ``/tasks`` listing (stopping early once every
+    watched ID was seen) instead of showing each task, and the delay between
+    cycles adapts with :class:`~cbrain_cli.cli_utils.PollInterval`.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command line arguments including task (IDs or ``-``), batch_id,
+        bourreau_id, interval and max_interval
+
+    Attributes
+    ----------
+    tasks : dict
+        Latest known record of every watched task, by ID
+    """
+
+    def __init__(self, args):
+        self.task_ids = set(iter_ids(getattr(args, "task", None) or []))
+        self.params = {}
+        for attr in ("batch_id", "bourreau_id"):
+            value = getattr(args, attr, None)
+            if value is not None:
+                self.params[attr] = str(value)
+        if not self.task_ids and not self.params:
+            raise CliValidationError(
+                "Task ID(s), --batch-id or --bourreau-id are required", field="task"
+            )
+        self.interval = PollInterval(
+            getattr(args, "interval", None) or DEFAULT_POLL_INTERVAL,
+            getattr(args, "max_interval", None) or DEFAULT_MAX_POLL_INTERVAL,
+        )
+        self.tasks = {}
+        self.started = time.monotonic()
+
+    def poll(self):
+        """
+        Fetch the watched tasks once.
+
+        Returns
+        -------
+        dict
+            Task records by ID; watched IDs missing from the listing are absent
+        """
+        params = {**self.params, "page": "1", "per_page": str(WATCH_PER_PAGE)}
+        found = {}
+        for page in paginate(f"{cbrain_url}/tasks", api_token, params):
+            for task in page:
+                task_id = int(task.get("id"))
+                if not self.task_ids or task_id in self.task_ids:
+                    found[task_id] = task
+            if self.task_ids and len(found) == len(self.task_ids):
+                break
+        return found
+
+    def update(self, found):
+        """
+        Merge one poll into :attr:`tasks` and return the status changes it brought.
+
+        Returns
+        -------
+        list of dict
+            One event per new task or status change: id, type, status,
+            previous status (None the first time a task is seen), seconds since
+            the watch started and local time
+        """
+        for task_id in self.task_ids - set(found):
+            found[task_id] = {**self.tasks.get(task_id, {"id": task_id}), "status": MISSING_STATUS}
+        changes = []
+        elapsed = round(time.monotonic() - self.started, 3)
+        at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        for task_id in sorted(found):
+            task = found[task_id]
+            previous = self.tasks.get(task_id, {}).get("status")
+            if task_id not in self.tasks or previous != task.get("status"):
+                changes.append(
+                    {
+                        "id": task_id,
+                        "type": task.get("type"),
+                        "status": task.get("status"),
+                        "previous": previous,
+                        "elapsed": elapsed,
+                        "at": at,
+                    }
+                )
+            self.tasks[task_id] = task
+        return changes
+
+    @property
+    def finished(self):
+        """
+        Whether every watched task reached a terminal status.
+        """
+        return all(is_finished(task.get("status")) for task in self.tasks.values())
+
+    def cycles(self, sleep=None):
+        """
+        Poll until every watched task is finished, waiting with ``sleep``
+        (default :func:`time.sleep`) between cycles.
+
+        Yields
+        ------
+        list of dict
+            Status changes of each cycle (see :meth:`update`); the first cycle
+            reports every watched task. Nothing is polled again once no task
+            was found at all.
+        """
+        while True:
+            changes = self.update(self.poll())
+            yield changes
+            if not self.tasks or self.finished:
+                return
+            (sleep or time.sleep)(self.interval.next(bool(changes)))
+
+    def summary(self):
+        """
+        Count the watched tasks by status.
+
+        Returns
+        -------
+        dict
+            Number of tasks, completed and failed tasks, IDs of the failed
+            tasks, per-status counts and elapsed seconds
+        """
+        statuses = {}
+        for task in self.tasks.values():
+            status = task.get("status")
+            statuses[status] = statuses.get(status, 0) + 1
+        failed_ids = sorted(i for i, task in self.tasks.items() if is_failed(task.get("status")))
+        return {
+            "tasks": len(self.tasks),
+            "completed": sum(n for s, n in statuses.items() if s in COMPLETED_STATUSES),
+            "failed": len(failed_ids),
+            "failed_ids": failed_ids,
+            "statuses": statuses,
+            "seconds": round(time.monotonic() - self.started, 3),
+        }
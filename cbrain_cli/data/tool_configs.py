@@ -1,6 +1,7 @@
 from cbrain_cli.cli_utils import (
     CliValidationError,
     api_get,
+    api_get_list,
     api_token,
     cbrain_url,
     pagination,
@@ -13,12 +14,18 @@ def list_tool_configs(args):
 
     Returns
     -------
-    list
+    list or RecordStream
         A list of tool configurations, each represented as a dictionary containing
-        configuration details.
+        configuration details (a lazy stream over every page with --all).
     """
     params = pagination(args, {})
-    return api_get(f"{cbrain_url}/tool_configs", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/tool_configs",
+        api_token,
+        params,
+        fetch_all=getattr(args, "all", False),
+        cache=True,
+    )
 
 
 def show_tool_config(args):
@@ -33,7 +40,7 @@ def show_tool_config(args):
     config_id = getattr(args, "id", None)
     if not config_id:
         raise CliValidationError("Tool configuration ID is required", field="id")
-    return api_get(f"{cbrain_url}/tool_configs/{config_id}", api_token)
+    return api_get(f"{cbrain_url}/tool_configs/{config_id}", api_token, cache=True)
 
 
 def tool_config_boutiques_descriptor(args):
@@ -48,4 +55,6 @@ def tool_config_boutiques_descriptor(args):
     config_id = getattr(args, "id", None)
     if not config_id:
         raise CliValidationError("Tool configuration ID is required", field="id")
-    return api_get(f"{cbrain_url}/tool_configs/{config_id}/boutiques_descriptor", api_token)
+    return api_get(
+        f"{cbrain_url}/tool_configs/{config_id}/boutiques_descriptor", api_token, cache=True
+    )
@@ -1,47 +1,142 @@
+import json
+import os
+import time
+
 from cbrain_cli.cli_utils import (
     CliApiError,
     CliValidationError,
-    api_get,
+    api_get_list,
     api_token,
     cbrain_url,
+    paginate,
     pagination,
+    user_id,
+)
+from cbrain_cli.config import (
+    DEFAULT_TOOL_INDEX_TTL,
+    TOOL_INDEX_FILE,
+    TOOL_INDEX_TTL_ENV_VAR,
+    env_int,
 )
 
+# Page size used to fetch the whole tool catalogue for the index.
+TOOL_INDEX_PER_PAGE = 1000
+
 
 def list_tools(args):
     """
-    Get paginated list of tools from CBRAIN.
+    Get paginated list of tools from CBRAIN, or a lazy stream over every page with --all.
     """
     params = pagination(args, {})
-    return api_get(f"{cbrain_url}/tools", api_token, params)
+    return api_get_list(
+        f"{cbrain_url}/tools",
+        api_token,
+        params,
+        fetch_all=getattr(args, "all", False),
+        cache=True,
+    )
+
+
+def _read_tool_index():
+    """
+    Return the cached ``{id: tool}`` index, or None if missing, stale or foreign.
+    """
+    try:
+        with open(TOOL_INDEX_FILE) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("cbrain_url") != str(cbrain_url) or index.get("user_id") != str(user_id):
+        return None
+    ttl = env_int(TOOL_INDEX_TTL_ENV_VAR, DEFAULT_TOOL_INDEX_TTL, minimum=0)
+    if time.time() - index.get("fetched_at", 0) > ttl:
+        return None
+    return index.get("tools")
+
+
+def _fetch_tool_index():
+    """
+    Fetch the whole tool catalogue at the maximum page size and cache it.
+
+    Failing to write the cache is not an error; the next call fetches again.
+    """
+    tools = {}
+    params = {"page": "1", "per_page": str(TOOL_INDEX_PER_PAGE)}
+    for page in paginate(f"{cbrain_url}/tools", api_token, params):
+        for tool in page:
+            tools[str(tool.get("id"))] = tool
+
+    index = {
+        "cbrain_url": str(cbrain_url),
+        "user_id": str(user_id),
+        "fetched_at": time.time(),
+        "tools": tools,
+    }
+    temp_file = TOOL_INDEX_FILE.with_name(f"{TOOL_INDEX_FILE.name}.{os.getpid()}.tmp")
+    try:
+        TOOL_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_file, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(temp_file, TOOL_INDEX_FILE)
+    except OSError:
+        pass
+    return tools
+
+
+def tool_catalogue(tool_ids=(), refresh=False):
+    """
+    Return the ``{id: tool}`` catalogue, from the local index when possible.
+
+    The index is refetched when it is older than its TTL, when any of
+    ``tool_ids`` is missing from it, or with ``refresh``.
+    """
+    tools = None if refresh else _read_tool_index()
+    if tools is None or any(str(tool_id) not in tools for tool_id in tool_ids):
+        tools = _fetch_tool_index()
+    return tools
 
 
 def show_tool(args):
     """
     Get detailed information about a specific tool from CBRAIN.
 
-    Searches paginated ``GET /tools`` results because ``GET /tools/{id}``
-    returns 204 No Content on this API.
+    ``GET /tools/{id}`` returns 204 No Content on this API, so tools are
+    looked up in a local index of the whole catalogue. The index is refetched
+    when it is older than its TTL, when the tool is missing from it, or with
+    --refresh.
     """
     tool_id = getattr(args, "id", None)
     if not tool_id:
         raise CliValidationError("Tool ID is required", field="id")
 
-    per_page = 20
-    page = 1
-    while True:
-        tools_page = api_get(
-            f"{cbrain_url}/tools",
-            api_token,
-            {"page": str(page), "per_page": str(per_page)},
-        )
-        if not tools_page:
-            break
-        for tool in tools_page:
-            if tool.get("id") == tool_id:
-                return tool
-        if len(tools_page) < per_page:
-            break
-        page += 1
-
-    raise CliApiError(f"Tool with ID {tool_id} not found")
+    tools = tool_catalogue([tool_id], refresh=getattr(args, "refresh", False))
+    tool = tools.get(str(tool_id))
+    if tool is None:
+        raise CliApiError(f"Tool with ID {tool_id} not found")
+    return tool
+
+
+def show_tools(tool_ids, refresh=False):
+    """
+    Look several tools up in the catalogue index, fetching it at most once.
+
+    Parameters
+    ----------
+    tool_ids : list of int
+        IDs of the tools to show
+    refresh : bool
+        Refetch the index even if it is fresh
+
+    Returns
+    -------
+    list of tuple
+        ``(id, tool, error)`` per ID, in input order; ``error`` is a
+        CliApiError for a tool missing from the catalogue
+    """
+    tools = tool_catalogue(tool_ids, refresh=refresh)
+    results = []
+    for tool_id in tool_ids:
+        tool = tools.get(str(tool_id))
+        error = None if tool is not None else CliApiError(f"Tool with ID {tool_id} not found")
+        results.append((tool_id, tool, error))
+    return results
@@ -1,4 +1,11 @@
-from cbrain_cli.cli_utils import display_key_value_table, dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    display_key_value_table,
+    dynamic_table_print,
+    json_printer,
+    jsonl_printer,
+    named_id,
+    output_json,
+)
 
 
 def print_activities_list(activities_data, args):
@@ -25,8 +32,8 @@ def print_activities_list(activities_data, args):
     formatted_activities = [
         {
             "id": a.get("id", ""),
-            "user_id": a.get("user_id", ""),
-            "remote_resource_id": a.get("remote_resource_id", ""),
+            "user_id": named_id(a, "user_id"),
+            "remote_resource_id": named_id(a, "remote_resource_id"),
             "status": a.get("status", ""),
             "created_at": (
                 a.get("created_at", "").split("T")[0]
@@ -112,3 +119,96 @@ def print_activity_details(activity_data, args):
             ("Retry Delay", str(activity_data.get("retry_delay", "N/A"))),
         ]
     )
+
+
+def _duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def print_activity_progress(changes, progress, args, initial=False):
+    """
+    Print one poll cycle of ``background watch``: status changes and overall progress.
+
+    Parameters
+    ----------
+    changes : list of dict
+        Status change events (id, type, status, previous)
+    progress : dict
+        Aggregate item counts, rate and ETA of the watched activities
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    initial : bool
+        Whether this is the first cycle, whose statuses are summarized in one
+        line rather than printed as transitions
+    """
+    if getattr(args, "jsonl", False):
+        jsonl_printer({**progress, "changes": changes})
+        return
+    if getattr(args, "json", False):
+        # Printed with the summary once every activity has finished.
+        return
+
+    time_of_day = progress["at"][11:]
+    if initial:
+        counts = {}
+        for change in changes:
+            counts[change["status"]] = counts.get(change["status"], 0) + 1
+        statuses = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+        print(f"Watching {len(changes)} background activity(ies): {statuses}")
+    else:
+        for change in changes:
+            activity_type = (change["type"] or "").replace("BackgroundActivity::", "")
+            label = f"Activity {change['id']}" + (f" ({activity_type})" if activity_type else "")
+            print(f"{time_of_day}  {label}: {change['previous'] or '-'} -> {change['status']}")
+
+    line = f"{time_of_day}  {progress['done']}/{progress['items']} item(s)"
+    if progress["percent"] is not None:
+        line += f" ({progress['percent']:.1f}%)"
+    line += (
+        f", {progress['failures']} failed;"
+        f" {progress['finished']}/{progress['activities']} activity(ies) finished"
+    )
+    if progress["rate"]:
+        line += f", {progress['rate']:.1f} item(s)/s"
+    if progress["eta_seconds"] is not None and progress["finished"] < progress["activities"]:
+        line += f", ETA {_duration(progress['eta_seconds'])}"
+    print(line, flush=True)
+
+
+def print_activity_watch_summary(activities_data, summary, args):
+    """
+    Print the final state of the activities followed by ``background watch``.
+
+    Parameters
+    ----------
+    activities_data : dict
+        Latest record of every watched activity, by ID
+    summary : dict
+        Activity, completed and failed counts, failed IDs, item counts and
+        elapsed seconds
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    """
+    if getattr(args, "jsonl", False):
+        return
+    if getattr(args, "json", False):
+        activities = [activities_data[i] for i in sorted(activities_data)]
+        json_printer({"activities": activities, "summary": summary})
+        return
+
+    print("-" * 60)
+    print(
+        f"{summary['activities']} background activity(ies) finished in "
+        f"{_duration(summary['seconds'])}: {summary['successes']} item(s) succeeded, "
+        f"{summary['failures']} failed"
+    )
+    if summary["failed_ids"]:
+        failed = (f"{i} ({activities_data[i].get('status')})" for i in summary["failed_ids"])
+        print(f"Not fully completed: {', '.join(failed)}")
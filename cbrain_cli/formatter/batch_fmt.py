@@ -0,0 +1,61 @@
+import sys
+
+from cbrain_cli.cli_utils import json_printer, jsonl_printer
+
+
+def print_batch_result(result, args):
+    """
+    Print the captured output of one command of a batch, under a label.
+
+    Parameters
+    ----------
+    result : dict
+        Result record (line, command, exit_code, seconds, stdout, stderr)
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    """
+    if getattr(args, "jsonl", False):
+        jsonl_printer(result)
+        return
+    if getattr(args, "json", False):
+        # Printed with the summary once every command has finished.
+        return
+
+    status = "ok" if not result["exit_code"] else f"exit {result['exit_code']}"
+    label = f"line {result['line']}: cbrain {result['command']}"
+    print(f"==> {label} ({status}, {result['seconds']:.2f}s)")
+    for text, stream in ((result["stdout"], sys.stdout), (result["stderr"], sys.stderr)):
+        if text:
+            stream.write(text if text.endswith("\n") else f"{text}\n")
+    sys.stdout.flush()
+
+
+def print_batch_summary(results, summary, args):
+    """
+    Print the aggregate result of a batch.
+
+    Parameters
+    ----------
+    results : list of dict
+        Result records of the commands that ran, in file order
+    summary : dict
+        Command counts, failed line numbers and elapsed seconds
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    """
+    if getattr(args, "jsonl", False):
+        return
+    if getattr(args, "json", False):
+        json_printer({"results": results, "summary": summary})
+        return
+
+    print("-" * 60)
+    print(
+        f"Ran {summary['succeeded'] + summary['failed']}/{summary['commands']} command(s) "
+        f"in {summary['seconds']:.1f}s: {summary['succeeded']} succeeded, "
+        f"{summary['failed']} failed"
+    )
+    if summary["failed_lines"]:
+        print(f"Failed lines: {' '.join(str(line) for line in summary['failed_lines'])}")
+    if summary["skipped"]:
+        print(f"Skipped {summary['skipped']} command(s) after a failure")
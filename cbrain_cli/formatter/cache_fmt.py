@@ -0,0 +1,46 @@
+from cbrain_cli.cli_utils import display_key_value_table, output_json
+
+
+def print_cache_stats(stats, args):
+    """
+    Print the state of the HTTP response cache.
+
+    Parameters
+    ----------
+    stats : dict
+        Cache path, entry count, size, size limit, hits and misses
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, stats):
+        return
+
+    requests = stats["hits"] + stats["misses"]
+    hit_rate = f"{100 * stats['hits'] / requests:.1f}%" if requests else "N/A"
+    display_key_value_table(
+        [
+            ("Path", stats["path"]),
+            ("Cached Responses", stats["entries"]),
+            ("Size", f"{stats['bytes'] / (1024 * 1024):.1f} MiB"),
+            ("Size Limit", f"{stats['max_bytes'] / (1024 * 1024):.0f} MiB"),
+            ("Served From Cache (304)", stats["hits"]),
+            ("Downloaded", stats["misses"]),
+            ("Hit Rate", hit_rate),
+        ]
+    )
+
+
+def print_cache_cleared(removed, args):
+    """
+    Print how many cached responses were removed.
+
+    Parameters
+    ----------
+    removed : int
+        Number of responses removed
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, {"removed": removed}):
+        return
+    print(f"Removed {removed} cached response(s)")
@@ -0,0 +1,75 @@
+from cbrain_cli.cli_utils import display_key_value_table, output_json
+
+
+def print_daemon_status(status, args):
+    """
+    Print the state of the resident daemon.
+
+    Parameters
+    ----------
+    status : dict or None
+        Process ID, socket, start time, uptime, commands served, whether a
+        command is running and idle timeout; None when no daemon is running
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, status or {"running": False}):
+        return
+    if status is None:
+        print("No daemon is running")
+        return
+
+    idle_timeout = status["idle_timeout"]
+    display_key_value_table(
+        [
+            ("PID", status["pid"]),
+            ("Socket", status["socket"]),
+            ("Started At", status["started_at"]),
+            ("Uptime", f"{status['uptime_seconds']:.0f}s"),
+            ("Commands Served", status["commands"]),
+            ("Running A Command", "yes" if status.get("busy") else "no"),
+            ("Idle Timeout", f"{idle_timeout:.0f}s" if idle_timeout else "never"),
+        ]
+    )
+
+
+def print_daemon_started(status, started, args):
+    """
+    Print the outcome of ``daemon start``.
+
+    Parameters
+    ----------
+    status : dict or None
+        Status of the daemon, or None if it did not start
+    started : bool
+        Whether the daemon was started by this command
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, {"started": started, "status": status}):
+        return
+    if status is None:
+        print("Error: the daemon did not start")
+    elif started:
+        print(f"Daemon started (pid {status['pid']}), listening on {status['socket']}")
+    else:
+        print(f"Daemon already running (pid {status['pid']})")
+
+
+def print_daemon_stopped(status, args):
+    """
+    Print the outcome of ``daemon stop``.
+
+    Parameters
+    ----------
+    status : dict or None
+        Status of the daemon before it stopped, or None if none was running
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, {"stopped": status is not None}):
+        return
+    if status is None:
+        print("No daemon is running")
+    else:
+        print(f"Daemon stopped (pid {status['pid']}, {status['commands']} command(s) served)")
@@ -64,8 +64,8 @@ def print_providers_list(providers_data, args):
 
     Parameters
     ----------
-    providers_data : list
-        List of data provider dictionaries
+    providers_data : list or RecordStream
+        List of data provider dictionaries, or a stream of them with --all
     args : argparse.Namespace
         Command line arguments, including the --json flag
     """
@@ -79,7 +79,7 @@ def print_providers_list(providers_data, args):
         print("No data providers found.")
         return
 
-    formatted_providers = [
+    formatted_providers = (
         {
             "id": p.get("id", ""),
             "name": p.get("name", ""),
@@ -88,7 +88,7 @@ def print_providers_list(providers_data, args):
             "online": "Yes" if p.get("online", False) else "No",
         }
         for p in providers_data
-    ]
+    )
 
     dynamic_table_print(
         formatted_providers,
@@ -1,4 +1,16 @@
-from cbrain_cli.cli_utils import dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    display_key_value_table,
+    dynamic_table_print,
+    json_printer,
+    jsonl_printer,
+    output_json,
+)
+
+# Column widths of `file list --all`, which are not sampled from the stream.
+STREAM_COLUMN_WIDTHS = {"id": 9, "type": 30, "name": 80}
+
+# Noun of each batched operation in the summary line.
+BATCH_NOUNS = {"delete": "deletion", "copy": "copying", "move": "moving"}
 
 
 def print_file_details(file_data, args):
@@ -42,8 +54,8 @@ def print_files_list(files_data, args):
 
     Parameters
     ----------
-    files_data : list
-        List of file dictionaries
+    files_data : list or RecordStream
+        List of file dictionaries, or a stream of them with --all
     args : argparse.Namespace
         Command line arguments, including the --json flag
     """
@@ -54,8 +66,13 @@ def print_files_list(files_data, args):
         print("No files found.")
         return
 
-    # Use the reusable dynamic table formatter
-    dynamic_table_print(files_data, ["id", "type", "name"], ["ID", "Type", "File Name"])
+    # Streamed (--all) listings use declared widths, so rows print as pages arrive.
+    dynamic_table_print(
+        files_data,
+        ["id", "type", "name"],
+        ["ID", "Type", "File Name"],
+        widths=STREAM_COLUMN_WIDTHS,
+    )
 
 
 def print_upload_result(response_data, response_status, file_name, file_size, data_provider_id):
@@ -83,6 +100,63 @@ def print_upload_result(response_data, response_status, file_name, file_size, da
             print(f"Server response: {response_data['notice']}")
 
 
+def print_upload_record(record, args):
+    """
+    Print the outcome of one file in a multi-file upload.
+
+    Parameters
+    ----------
+    record : dict
+        Per-file upload record (file_path, size, status, error, seconds, ...)
+    args : argparse.Namespace
+        Command line arguments, including the --jsonl flag
+    """
+    if getattr(args, "jsonl", False):
+        jsonl_printer(record)
+        return
+    if getattr(args, "json", False):
+        # Printed with the summary once every upload has finished.
+        return
+
+    if record["status"] == "uploaded":
+        print(
+            f"OK    {record['file_path']} ({record['size']} bytes, {record['seconds']}s)"
+            f" -> file ID {record['userfile_id']}"
+        )
+    else:
+        print(f"FAIL  {record['file_path']}: {record['error']}")
+
+
+def print_upload_summary(records, summary, args):
+    """
+    Print the aggregate result of a multi-file upload.
+
+    Parameters
+    ----------
+    records : list of dict
+        Per-file upload records
+    summary : dict
+        Counts, total bytes, elapsed seconds and throughput
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if getattr(args, "jsonl", False):
+        return
+    if getattr(args, "json", False):
+        json_printer({"files": records, "summary": summary})
+        return
+
+    megabytes = summary["bytes"] / (1024 * 1024)
+    print("-" * 60)
+    print(
+        f"Uploaded {summary['uploaded']}/{summary['files']} file(s), "
+        f"{megabytes:.1f} MiB in {summary['seconds']:.1f}s "
+        f"({summary['mib_per_second']:.1f} MiB/s)"
+    )
+    if summary["failed"]:
+        print(f"{summary['failed']} upload(s) failed")
+
+
 def print_move_copy_result(response_data, response_status, operation="move"):
     """
     Print the result of a file move or copy operation.
@@ -135,3 +209,114 @@ def print_delete_result(response_data, args):
         print(f"Background activity ID: {background_activity_id}")
     else:
         print("File deletion initiated successfully")
+
+
+def print_file_batch(record, submitted, args):
+    """
+    Print the outcome of one batch of a multi-file delete, copy or move.
+
+    Parameters
+    ----------
+    record : dict
+        Per-batch record (batch, files, first_id, last_id, status, error, ...)
+    submitted : int
+        Files submitted so far, this batch included
+    args : argparse.Namespace
+        Command line arguments, including the --jsonl flag
+    """
+    if getattr(args, "jsonl", False):
+        jsonl_printer(record)
+        return
+    if getattr(args, "json", False):
+        # Printed with the summary once every batch has finished.
+        return
+
+    ids = f"IDs {record['first_id']}..{record['last_id']}"
+    if record["status"] == "submitted":
+        activity = record["background_activity_id"]
+        suffix = f" -> background activity {activity}" if activity else ""
+        print(
+            f"OK    batch {record['batch']}: {record['files']} file(s), {ids}{suffix}"
+            f" ({submitted} submitted so far)"
+        )
+    else:
+        print(f"FAIL  batch {record['batch']}: {record['files']} file(s), {ids}: {record['error']}")
+
+
+def print_file_batch_summary(records, summary, args, operation="delete"):
+    """
+    Print the aggregate result of a multi-file delete, copy or move.
+
+    Parameters
+    ----------
+    records : list of dict
+        Per-batch records, in batch order
+    summary : dict
+        Batch and file counts, background activity IDs and elapsed seconds
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    operation : str
+        Operation type ("delete", "copy" or "move")
+    """
+    if getattr(args, "jsonl", False):
+        return
+    if getattr(args, "json", False):
+        json_printer({"batches": records, "summary": summary})
+        return
+
+    print("-" * 60)
+    print(
+        f"Submitted {summary['submitted']}/{summary['files']} file(s) for "
+        f"{BATCH_NOUNS[operation]} in {summary['batches']} batch(es), {summary['seconds']:.1f}s"
+    )
+    if summary["failed_batches"]:
+        print(f"{summary['failed_batches']} batch(es) failed ({summary['failed']} file(s))")
+    if summary["background_activity_ids"]:
+        activity_ids = " ".join(str(i) for i in summary["background_activity_ids"])
+        print(f"Background activity IDs: {activity_ids}")
+
+
+def print_index_sync_result(result, args):
+    """
+    Print the outcome of a local file index sync.
+
+    Parameters
+    ----------
+    result : dict
+        Added/updated/removed/unchanged counts, total and sync timestamp
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, result):
+        return
+
+    print(
+        f"File index synced: {result['added']} added, {result['updated']} updated, "
+        f"{result['removed']} removed, {result['unchanged']} unchanged"
+    )
+    print(f"Total indexed files: {result['total']}")
+
+
+def print_index_status(status, args):
+    """
+    Print the state of the local file index.
+
+    Parameters
+    ----------
+    status : dict
+        Index path, server, user, last sync time and record count
+    args : argparse.Namespace
+        Command line arguments, including the --json flag
+    """
+    if output_json(args, status):
+        return
+
+    display_key_value_table(
+        [
+            ("Path", status.get("path")),
+            ("Server", status.get("cbrain_url") or "N/A"),
+            ("User ID", status.get("user_id") or "N/A"),
+            ("Last Sync", status.get("synced_at") or "N/A"),
+            ("Indexed Files", status.get("total")),
+        ]
+    )
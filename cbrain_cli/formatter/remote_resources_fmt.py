@@ -1,4 +1,9 @@
-from cbrain_cli.cli_utils import display_key_value_table, dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    display_key_value_table,
+    dynamic_table_print,
+    named_id,
+    output_json,
+)
 
 
 def print_resources_list(resources_data, args):
@@ -29,8 +34,8 @@ def print_resources_list(resources_data, args):
         {
             "id": r.get("id", ""),
             "name": r.get("name", ""),
-            "user_id": r.get("user_id", ""),
-            "group_id": r.get("group_id", ""),
+            "user_id": named_id(r, "user_id"),
+            "group_id": named_id(r, "group_id"),
             "online": "Yes" if r.get("online", False) else "No",
             "read_only": "Yes" if r.get("read_only", False) else "No",
         }
@@ -1,4 +1,10 @@
-from cbrain_cli.cli_utils import display_key_value_table, dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    display_key_value_table,
+    dynamic_table_print,
+    named_id,
+    output_json,
+    record_count,
+)
 
 
 def print_tags_list(tags_data, args):
@@ -7,8 +13,8 @@ def print_tags_list(tags_data, args):
 
     Parameters
     ----------
-    tags_data : list
-        List of tag dictionaries
+    tags_data : list or RecordStream
+        List of tag dictionaries, or a stream of them with --all
     args : argparse.Namespace
         Command line arguments, including the --json flag
     """
@@ -24,11 +30,20 @@ def print_tags_list(tags_data, args):
 
     print("TAGS")
     print("-" * 40)
+    formatted_tags = (
+        {
+            "id": tag.get("id", ""),
+            "name": tag.get("name", ""),
+            "user_id": named_id(tag, "user_id"),
+            "group_id": named_id(tag, "group_id"),
+        }
+        for tag in tags_data
+    )
     dynamic_table_print(
-        tags_data, ["id", "name", "user_id", "group_id"], ["ID", "Name", "User", "Group"]
+        formatted_tags, ["id", "name", "user_id", "group_id"], ["ID", "Name", "User", "Group"]
     )
     print("-" * 40)
-    print(f"Total: {len(tags_data)} tag(s)")
+    print(f"Total: {record_count(tags_data)} tag(s)")
 
 
 def print_tag_details(tag_data, args):
@@ -1,6 +1,14 @@
 import json
 
-from cbrain_cli.cli_utils import display_key_value_table, dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    display_key_value_table,
+    dynamic_table_print,
+    json_printer,
+    jsonl_printer,
+    named_id,
+    output_json,
+    record_count,
+)
 
 
 def print_task_data(tasks_data, args):
@@ -9,8 +17,8 @@ def print_task_data(tasks_data, args):
 
     Parameters
     ----------
-    tasks_data : list
-        List of task data dictionaries
+    tasks_data : list or RecordStream
+        List of task data dictionaries, or a stream of them with --all
     args : argparse.Namespace
         Command line arguments, including the --json flag
     """
@@ -24,17 +32,17 @@ def print_task_data(tasks_data, args):
         print("No tasks found.")
         return
 
-    formatted_tasks = [
+    formatted_tasks = (
         {
             "id": task.get("id", ""),
             "type": task.get("type", "").replace("BoutiquesTask::", ""),
             "status": task.get("status", ""),
-            "bourreau_id": task.get("bourreau_id", ""),
-            "user_id": task.get("user_id", ""),
-            "group_id": task.get("group_id", ""),
+            "bourreau_id": named_id(task, "bourreau_id"),
+            "user_id": named_id(task, "user_id"),
+            "group_id": named_id(task, "group_id"),
         }
         for task in tasks_data
-    ]
+    )
 
     dynamic_table_print(
         formatted_tasks,
@@ -43,7 +51,81 @@ def print_task_data(tasks_data, args):
     )
 
     print("-" * 85)
-    print(f"Total: {len(tasks_data)} task(s)")
+    print(f"Total: {record_count(tasks_data)} task(s)")
+
+
+def _status_counts(statuses):
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+
+
+def print_task_changes(changes, args, initial=False):
+    """
+    Print the status changes seen by one poll cycle of ``task watch``.
+
+    Parameters
+    ----------
+    changes : list of dict
+        Status change events (id, type, status, previous, elapsed, at)
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    initial : bool
+        Whether these are the statuses of the first cycle, summarized in one
+        line rather than printed as transitions
+    """
+    if getattr(args, "jsonl", False):
+        for change in changes:
+            jsonl_printer(change)
+        return
+    if getattr(args, "json", False):
+        # Printed with the summary once every task has finished.
+        return
+
+    if initial:
+        if changes:
+            statuses = _status_counts(change["status"] for change in changes)
+            print(f"Watching {len(changes)} task(s): {statuses}")
+        return
+    for change in changes:
+        task_type = (change["type"] or "").replace("BoutiquesTask::", "")
+        label = f"Task {change['id']} ({task_type})" if task_type else f"Task {change['id']}"
+        previous = change["previous"] or "-"
+        print(f"{change['at'][11:]}  {label}: {previous} -> {change['status']}", flush=True)
+
+
+def print_task_watch_summary(tasks_data, summary, args):
+    """
+    Print the final statuses of the tasks followed by ``task watch``.
+
+    Parameters
+    ----------
+    tasks_data : dict
+        Latest record of every watched task, by ID
+    summary : dict
+        Task, completed and failed counts, failed task IDs, per-status counts
+        and elapsed seconds
+    args : argparse.Namespace
+        Command line arguments, including the --json and --jsonl flags
+    """
+    if getattr(args, "jsonl", False):
+        return
+    if getattr(args, "json", False):
+        json_printer({"tasks": [tasks_data[i] for i in sorted(tasks_data)], "summary": summary})
+        return
+
+    if not tasks_data:
+        print("No tasks found.")
+        return
+    print("-" * 85)
+    print(
+        f"{summary['tasks']} task(s) finished in {summary['seconds']:.1f}s: "
+        f"{summary['completed']} completed, {summary['failed']} failed"
+    )
+    if summary["failed_ids"]:
+        failed = (f"{i} ({tasks_data[i].get('status')})" for i in summary["failed_ids"])
+        print(f"Failed: {', '.join(failed)}")
 
 
 def print_task_details(task_data, args):
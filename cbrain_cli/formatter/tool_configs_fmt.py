@@ -1,4 +1,10 @@
-from cbrain_cli.cli_utils import dynamic_table_print, json_printer, output_json
+from cbrain_cli.cli_utils import (
+    dynamic_table_print,
+    json_printer,
+    named_id,
+    output_json,
+    record_count,
+)
 
 
 def print_tool_configs_list(tool_configs, args):
@@ -15,39 +21,45 @@ def print_tool_configs_list(tool_configs, args):
         print("No tool configurations found.")
         return
     # Prepare data for better display.
-    formatted_configs = [
+    formatted_configs = (
         {
             "id": config.get("id", ""),
             "version_name": config.get("version_name", ""),
-            "tool_id": config.get("tool_id", ""),
-            "bourreau_id": config.get("bourreau_id", ""),
-            "group_id": config.get("group_id", ""),
+            "tool_id": named_id(config, "tool_id"),
+            "bourreau_id": named_id(config, "bourreau_id"),
+            "group_id": named_id(config, "group_id"),
             "ncpus": config.get("ncpus", "1"),
             "description": config.get("description", ""),
         }
         for config in tool_configs
-    ]
+    )
+
+    max_column_widths = {
+        "id": 8,
+        "version_name": 12,
+        "tool_id": 8,
+        "bourreau_id": 10,
+        "group_id": 6,
+        "ncpus": 4,
+    }
+    if getattr(args, "resolve_names", False):
+        # Leave room for "name (id)" in the resolved columns.
+        for column in ("tool_id", "bourreau_id", "group_id"):
+            max_column_widths[column] = 24
 
     dynamic_table_print(
         formatted_configs,
         ["id", "version_name", "tool_id", "bourreau_id", "group_id", "ncpus", "description"],
         ["ID", "Version", "Tool ID", "Bourreau", "Group", "CPUs", "Description"],
         wrap_columns=["description"],
-        max_column_widths={
-            "id": 8,
-            "version_name": 12,
-            "tool_id": 8,
-            "bourreau_id": 10,
-            "group_id": 6,
-            "ncpus": 4,
-        },
+        max_column_widths=max_column_widths,
         indent_wrapped=True,
         max_row_lines=3,
         preserve_blank_lines=False,
     )
 
     print("-" * 85)
-    print(f"Total: {len(tool_configs)} configuration(s)")
+    print(f"Total: {record_count(tool_configs)} configuration(s)")
 
 
 def print_tool_config_details(tool_config, args):
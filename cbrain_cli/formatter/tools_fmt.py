@@ -1,4 +1,9 @@
-from cbrain_cli.cli_utils import display_key_value_table, dynamic_table_print, output_json
+from cbrain_cli.cli_utils import (
+    RecordStream,
+    display_key_value_table,
+    dynamic_table_print,
+    output_json,
+)
 
 
 def print_tool_details(tool_data, args):
@@ -36,8 +41,8 @@ def print_tools_list(tools_data, args):
 
     Parameters
     ----------
-    tools_data : list
-        List of tool dictionaries
+    tools_data : list or RecordStream
+        List of tool dictionaries, or a stream of them with --all
     args : argparse.Namespace
         Command line arguments, including the --json flag
     """
@@ -51,7 +56,10 @@ def print_tools_list(tools_data, args):
         print("No tools found.")
         return
 
-    print(f"Found {len(tools_data)} tools:")
+    # A stream's length is only known once it has been printed.
+    streaming = isinstance(tools_data, RecordStream)
+    if not streaming:
+        print(f"Found {len(tools_data)} tools:")
 
     # Use the reusable dynamic table formatter with wrapping for long descriptions.
     # - Wrap the 'description' column to fit terminal width.
@@ -67,3 +75,5 @@ def print_tools_list(tools_data, args):
     )
 
     print("-" * 80)
+    if streaming:
+        print(f"Found {tools_data.count} tools")
@@ -5,54 +5,148 @@ This module contains all the handler functions that process CLI commands
 and format their output appropriately.
 """
 
-from cbrain_cli.cli_utils import json_printer
-from cbrain_cli.data import (
-    background_activities,
-    data_providers,
-    files,
-    projects,
-    remote_resources,
-    tags,
-    tasks,
-    tool_configs,
-    tools,
-)
-from cbrain_cli.formatter import (
-    background_activities_fmt,
-    data_providers_fmt,
-    files_fmt,
-    projects_fmt,
-    remote_resources_fmt,
-    tags_fmt,
-    tasks_fmt,
-    tool_configs_fmt,
-    tools_fmt,
+import argparse
+import os
+import time
+
+from cbrain_cli.cli_utils import (
+    DEFAULT_SHOW_PARALLEL,
+    MAX_ASYNC_PARALLEL,
+    MAX_SHOW_PARALLEL,
+    CliValidationError,
+    fetch_many,
+    json_printer,
+    lazy_import,
+    print_fields_table,
+    print_show_results,
+    read_ids,
 )
 
+# Data and formatter modules are loaded on first use, so a command only pays
+# for importing the modules of its own family.
+aio = lazy_import("cbrain_cli.aio")
+batch = lazy_import("cbrain_cli.batch")
+daemon = lazy_import("cbrain_cli.daemon")
+http_cache = lazy_import("cbrain_cli.http_cache")
+selection = lazy_import("cbrain_cli.selection")
+shell = lazy_import("cbrain_cli.shell")
+
+background_activities = lazy_import("cbrain_cli.data.background_activities")
+data_providers = lazy_import("cbrain_cli.data.data_providers")
+file_index = lazy_import("cbrain_cli.data.file_index")
+files = lazy_import("cbrain_cli.data.files")
+names = lazy_import("cbrain_cli.data.names")
+projects = lazy_import("cbrain_cli.data.projects")
+remote_resources = lazy_import("cbrain_cli.data.remote_resources")
+tags = lazy_import("cbrain_cli.data.tags")
+tasks = lazy_import("cbrain_cli.data.tasks")
+tool_configs = lazy_import("cbrain_cli.data.tool_configs")
+tools = lazy_import("cbrain_cli.data.tools")
+
+background_activities_fmt = lazy_import("cbrain_cli.formatter.background_activities_fmt")
+batch_fmt = lazy_import("cbrain_cli.formatter.batch_fmt")
+cache_fmt = lazy_import("cbrain_cli.formatter.cache_fmt")
+daemon_fmt = lazy_import("cbrain_cli.formatter.daemon_fmt")
+data_providers_fmt = lazy_import("cbrain_cli.formatter.data_providers_fmt")
+files_fmt = lazy_import("cbrain_cli.formatter.files_fmt")
+projects_fmt = lazy_import("cbrain_cli.formatter.projects_fmt")
+remote_resources_fmt = lazy_import("cbrain_cli.formatter.remote_resources_fmt")
+tags_fmt = lazy_import("cbrain_cli.formatter.tags_fmt")
+tasks_fmt = lazy_import("cbrain_cli.formatter.tasks_fmt")
+tool_configs_fmt = lazy_import("cbrain_cli.formatter.tool_configs_fmt")
+tools_fmt = lazy_import("cbrain_cli.formatter.tools_fmt")
+
+
+def _show(args, id_field, fetch, print_details, path=None):
+    """
+    Show one record, or several fetched concurrently when more IDs are given.
+
+    ``id_field`` names the argument holding the IDs; ``fetch`` and
+    ``print_details`` are the data and formatter functions of a single record.
+    When ``fetch`` is a plain GET of ``<path>/<id>``, ``path`` lets a
+    --parallel above MAX_SHOW_PARALLEL fetch the records on the asyncio engine.
+    """
+    ids = read_ids(getattr(args, id_field))
+    if len(ids) == 1:
+        setattr(args, id_field, ids[0])
+        result = fetch(args)
+        if result is None:
+            return 1
+        print_details(result, args)
+        return None
+
+    parallel = getattr(args, "parallel", DEFAULT_SHOW_PARALLEL)
+    max_parallel = MAX_SHOW_PARALLEL if path is None else MAX_ASYNC_PARALLEL
+    if parallel < 1 or parallel > max_parallel:
+        raise CliValidationError(
+            f"parallel must be between 1 and {max_parallel}", field="--parallel"
+        )
+
+    def fetch_one(item_id):
+        return fetch(argparse.Namespace(**{**vars(args), id_field: item_id}))
+
+    if parallel > MAX_SHOW_PARALLEL:
+        results = aio.fetch_records(path, ids, parallel)
+    else:
+        results = fetch_many(fetch_one, ids, parallel)
+    if print_show_results(results, args, print_details):
+        return 1
+    return None
+
+
+def _list(args, fetch, print_list, name_fields=()):
+    """
+    List records and display them, applying --resolve-names, --where and --fields.
+
+    ``fetch`` and ``print_list`` are the data and formatter functions of the
+    listing; ``name_fields`` are the ID fields --resolve-names can name. The
+    selection is checked before any request is sent. With --fields, records
+    are printed as a table of those fields instead of the listing's own table.
+    """
+    selected = selection.Selection.from_args(args)
+    result = fetch(args)
+    if result is None:
+        return 1
+    if name_fields:
+        result = _with_names(result, args, name_fields)
+    result = selected.apply(result)
+    if selected.fields:
+        print_fields_table(result, selected.fields, args)
+    else:
+        print_list(result, args)
+    return None
+
+
+def _with_names(records, args, fields):
+    """
+    Join the names of the records referenced by ``fields`` with --resolve-names.
+    """
+    if getattr(args, "resolve_names", False):
+        return names.resolve_names(records, fields)
+    return records
+
 
 # File command handlers
 def handle_file_list(args):
     """
     Retrieve and display a paginated list of files from CBRAIN with optional filtering.
     """
-    result = files.list_files(args)
-    if result is None:
-        return 1
-    files_fmt.print_files_list(result, args)
+    return _list(args, files.list_files, files_fmt.print_files_list)
 
 
 def handle_file_show(args):
     """
     Retrieve and display detailed information about a specific file by its ID.
     """
-    result = files.show_file(args)
-    if result is None:
-        return 1
-    files_fmt.print_file_details(result, args)
+    return _show(args, "file", files.show_file, files_fmt.print_file_details, path="userfiles")
 
 
 def handle_file_upload(args):
-    """Upload a local file to CBRAIN and display the upload result with file details."""
+    """Upload local files to CBRAIN and display the upload result with file details."""
+    paths = getattr(args, "file_path", None)
+    if isinstance(paths, list) and (len(paths) > 1 or not os.path.isfile(paths[0])):
+        return handle_file_upload_many(args)
+
     result = files.upload_file(args)
     if result is None:
         return 1
@@ -61,8 +155,49 @@ def handle_file_upload(args):
         return 1
 
 
+def handle_file_upload_many(args):
+    """Upload several files, directories or globs concurrently and report each file."""
+    started = time.monotonic()
+    records = []
+    for record in files.upload_files(args):
+        files_fmt.print_upload_record(record, args)
+        records.append(record)
+
+    seconds = time.monotonic() - started
+    uploaded = [r for r in records if r["status"] == "uploaded"]
+    total_bytes = sum(r["size"] for r in uploaded)
+    summary = {
+        "files": len(records),
+        "uploaded": len(uploaded),
+        "failed": len(records) - len(uploaded),
+        "bytes": total_bytes,
+        "seconds": round(seconds, 3),
+        "mib_per_second": round(total_bytes / (1024 * 1024) / seconds, 3) if seconds else 0.0,
+    }
+    files_fmt.print_upload_summary(records, summary, args)
+    if summary["failed"]:
+        return 1
+
+
+def _batched_file_ids(args):
+    """
+    Whether the IDs of a file delete, copy or move are sent in batches.
+
+    IDs read from stdin or --from-file always are; IDs given on the command
+    line only when they do not fit in a single request.
+    """
+    file_ids = getattr(args, "file_id", None) or []
+    return (
+        "-" in file_ids
+        or bool(getattr(args, "from_file", None))
+        or len(file_ids) > getattr(args, "batch_size", files.DEFAULT_BATCH_SIZE)
+    )
+
+
 def handle_file_copy(args):
     """Copy one or more files to a different data provider and display the operation results."""
+    if _batched_file_ids(args):
+        return _handle_file_batches(args, files.copy_files(args), "copy")
     result = files.copy_file(args)
     if result is None:
         return 1
@@ -73,6 +208,8 @@ def handle_file_copy(args):
 
 def handle_file_move(args):
     """Move one or more files to a different data provider and display the operation results."""
+    if _batched_file_ids(args):
+        return _handle_file_batches(args, files.move_files(args), "move")
     result = files.move_file(args)
     if result is None:
         return 1
@@ -83,27 +220,74 @@ def handle_file_move(args):
 
 def handle_file_delete(args):
     """Delete a specific file from CBRAIN and display the deletion status."""
+    file_ids = getattr(args, "file_id", None)
+    if isinstance(file_ids, list):
+        if len(file_ids) != 1 or _batched_file_ids(args):
+            return _handle_file_batches(args, files.delete_files(args), "delete")
+        args.file_id = file_ids[0]
+
     result = files.delete_file(args)
     if result is None:
         return 1
     files_fmt.print_delete_result(result, args)
 
 
+def _handle_file_batches(args, batches, operation):
+    """Report each batch of a multi-file delete, copy or move as it completes, then a summary."""
+    started = time.monotonic()
+    records = []
+    submitted = 0
+    for record in batches:
+        if record["status"] == "submitted":
+            submitted += record["files"]
+        files_fmt.print_file_batch(record, submitted, args)
+        records.append(record)
+
+    records.sort(key=lambda record: record["batch"])
+    failed = [r for r in records if r["status"] != "submitted"]
+    summary = {
+        "batches": len(records),
+        "failed_batches": len(failed),
+        "files": sum(r["files"] for r in records),
+        "submitted": submitted,
+        "failed": sum(r["files"] for r in failed),
+        "background_activity_ids": [
+            r["background_activity_id"] for r in records if r["background_activity_id"]
+        ],
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    files_fmt.print_file_batch_summary(records, summary, args, operation=operation)
+    if failed:
+        return 1
+
+
+def handle_file_index_sync(args):
+    """Mirror userfile metadata into the local index and display what changed."""
+    result = file_index.sync_file_index(args)
+    if result is None:
+        return 1
+    files_fmt.print_index_sync_result(result, args)
+
+
+def handle_file_index_status(args):
+    """Display the location, owner, freshness and size of the local file index."""
+    result = file_index.file_index_status(args)
+    if result is None:
+        return 1
+    files_fmt.print_index_status(result, args)
+
+
 # Data provider command handlers
 def handle_dataprovider_list(args):
     """Retrieve and display a paginated list of available data providers in CBRAIN."""
-    result = data_providers.list_data_providers(args)
-    if result is None:
-        return 1
-    data_providers_fmt.print_providers_list(result, args)
+    return _list(args, data_providers.list_data_providers, data_providers_fmt.print_providers_list)
 
 
 def handle_dataprovider_show(args):
     """Retrieve and display detailed information about a specific data provider."""
-    result = data_providers.show_data_provider(args)
-    if result is None:
-        return 1
-    data_providers_fmt.print_provider_details(result, args)
+    return _show(
+        args, "id", data_providers.show_data_provider, data_providers_fmt.print_provider_details
+    )
 
 
 def handle_dataprovider_is_alive(args):
@@ -125,10 +309,7 @@ def handle_dataprovider_delete_unregistered(args):
 # Project command handlers
 def handle_project_list(args):
     """Retrieve and display a list of all available projects (groups) in CBRAIN."""
-    result = projects.list_projects(args)
-    if result is None:
-        return 1
-    projects_fmt.print_projects_list(result, args)
+    return _list(args, projects.list_projects, projects_fmt.print_projects_list)
 
 
 def handle_project_switch(args):
@@ -166,36 +347,44 @@ def handle_project_unswitch(args):
 
 # Tool command handlers
 def handle_tool_show(args):
-    """Retrieve and display detailed information about a specific computational tool."""
-    result = tools.show_tool(args)
-    if result is None:
+    """Retrieve and display detailed information about one or more computational tools."""
+    ids = read_ids(args.id)
+    if len(ids) == 1:
+        args.id = ids[0]
+        return _show(args, "id", tools.show_tool, tools_fmt.print_tool_details)
+
+    # Tools come from one cached catalogue, so there is nothing to parallelise.
+    results = tools.show_tools(ids, refresh=getattr(args, "refresh", False))
+    if print_show_results(results, args, tools_fmt.print_tool_details):
         return 1
-    tools_fmt.print_tool_details(result, args)
+    return None
 
 
 def handle_tool_list(args):
     """Retrieve and display a paginated list of available computational tools in CBRAIN."""
-    result = tools.list_tools(args)
-    if result is None:
-        return 1
-    tools_fmt.print_tools_list(result, args)
+    return _list(args, tools.list_tools, tools_fmt.print_tools_list)
 
 
 # Tool config command handlers
 def handle_tool_config_list(args):
     """Retrieve and display a paginated list of tool configurations available in CBRAIN."""
-    result = tool_configs.list_tool_configs(args)
-    if result is None:
-        return 1
-    tool_configs_fmt.print_tool_configs_list(result, args)
+    return _list(
+        args,
+        tool_configs.list_tool_configs,
+        tool_configs_fmt.print_tool_configs_list,
+        ("tool_id", "bourreau_id", "group_id"),
+    )
 
 
 def handle_tool_config_show(args):
     """Retrieve and display detailed configuration settings for a specific tool."""
-    result = tool_configs.show_tool_config(args)
-    if result is None:
-        return 1
-    tool_configs_fmt.print_tool_config_details(result, args)
+    return _show(
+        args,
+        "id",
+        tool_configs.show_tool_config,
+        tool_configs_fmt.print_tool_config_details,
+        path="tool_configs",
+    )
 
 
 def handle_tool_config_boutiques_descriptor(args):
@@ -209,18 +398,12 @@ def handle_tool_config_boutiques_descriptor(args):
 # Tag command handlers
 def handle_tag_list(args):
     """Retrieve and display a paginated list of tags available in CBRAIN."""
-    result = tags.list_tags(args)
-    if result is None:
-        return 1
-    tags_fmt.print_tags_list(result, args)
+    return _list(args, tags.list_tags, tags_fmt.print_tags_list, ("user_id", "group_id"))
 
 
 def handle_tag_show(args):
     """Retrieve and display detailed information about a specific tag by its ID."""
-    result = tags.show_tag(args)
-    if result is None:
-        return 1
-    tags_fmt.print_tag_details(result, args)
+    return _show(args, "id", tags.show_tag, tags_fmt.print_tag_details, path="tags")
 
 
 def handle_tag_create(args):
@@ -270,49 +453,153 @@ def handle_tag_delete(args):
 # Background activity command handlers
 def handle_background_list(args):
     """Retrieve and display a list of background activities currently running in CBRAIN."""
-    result = background_activities.list_background_activities(args)
-    if result is None:
-        return 1
-    background_activities_fmt.print_activities_list(result, args)
+    return _list(
+        args,
+        background_activities.list_background_activities,
+        background_activities_fmt.print_activities_list,
+        ("user_id", "remote_resource_id"),
+    )
 
 
 def handle_background_show(args):
     """Retrieve and display detailed information about a specific background activity."""
-    result = background_activities.show_background_activity(args)
-    if result is None:
+    return _show(
+        args,
+        "id",
+        background_activities.show_background_activity,
+        background_activities_fmt.print_activity_details,
+        path="background_activities",
+    )
+
+
+def handle_background_watch(args):
+    """Follow background activities until they finish, printing their progress and ETA."""
+    watcher = background_activities.ActivityWatcher(args)
+    done = None
+    for number, (changes, progress) in enumerate(watcher.cycles()):
+        if changes or progress["done"] != done:
+            background_activities_fmt.print_activity_progress(
+                changes, progress, args, initial=number == 0
+            )
+        done = progress["done"]
+    summary = watcher.summary()
+    background_activities_fmt.print_activity_watch_summary(watcher.activities, summary, args)
+    if summary["failed"]:
         return 1
-    background_activities_fmt.print_activity_details(result, args)
 
 
 # Task command handlers
 def handle_task_list(args):
     """Retrieve and display a paginated list of computational tasks with optional filtering."""
-    result = tasks.list_tasks(args)
-    if result is None:
-        return 1
-    tasks_fmt.print_task_data(result, args)
+    return _list(
+        args, tasks.list_tasks, tasks_fmt.print_task_data, ("bourreau_id", "user_id", "group_id")
+    )
 
 
 def handle_task_show(args):
     """Retrieve and display detailed information about a specific computational task."""
-    result = tasks.show_task(args)
-    if result is None:
+    return _show(args, "task", tasks.show_task, tasks_fmt.print_task_details, path="tasks")
+
+
+def handle_task_watch(args):
+    """Follow tasks until they finish, printing their status changes as they happen."""
+    watcher = tasks.TaskWatcher(args)
+    for number, changes in enumerate(watcher.cycles()):
+        tasks_fmt.print_task_changes(changes, args, initial=number == 0)
+    summary = watcher.summary()
+    tasks_fmt.print_task_watch_summary(watcher.tasks, summary, args)
+    if not watcher.tasks or summary["failed"]:
         return 1
-    tasks_fmt.print_task_details(result, args)
+
+
+def handle_task_operation(args):
+    """Run an operation on tasks."""
+    return tasks.operation_task(args)
 
 
 # Remote resource command handlers
 def handle_remote_resource_list(args):
     """Retrieve and display a list of remote computational resources available in CBRAIN."""
-    result = remote_resources.list_remote_resources(args)
-    if result is None:
-        return 1
-    remote_resources_fmt.print_resources_list(result, args)
+    return _list(
+        args,
+        remote_resources.list_remote_resources,
+        remote_resources_fmt.print_resources_list,
+        ("user_id", "group_id"),
+    )
 
 
 def handle_remote_resource_show(args):
     """Retrieve and display detailed information about a specific remote computational resource."""
-    result = remote_resources.show_remote_resource(args)
-    if result is None:
+    return _show(
+        args,
+        "remote_resource",
+        remote_resources.show_remote_resource,
+        remote_resources_fmt.print_resource_details,
+        path="bourreaux",
+    )
+
+
+# Cache command handlers
+def handle_cache_stats(args):
+    """Display the size and hit counts of the local HTTP response cache."""
+    cache_fmt.print_cache_stats(http_cache.stats(), args)
+
+
+def handle_cache_clear(args):
+    """Remove every response from the local HTTP response cache."""
+    cache_fmt.print_cache_cleared(http_cache.clear(), args)
+
+
+# Daemon command handlers
+def handle_daemon_start(args):
+    """Start the resident daemon that later commands are forwarded to."""
+    if getattr(args, "foreground", False):
+        daemon.serve(args.idle_timeout)
+        return None
+    status, started = daemon.start(args.idle_timeout)
+    daemon_fmt.print_daemon_started(status, started, args)
+    if status is None:
+        return 1
+
+
+def handle_daemon_stop(args):
+    """Stop the resident daemon, if one is running."""
+    daemon_fmt.print_daemon_stopped(daemon.stop(), args)
+
+
+def handle_daemon_status(args):
+    """Display whether the resident daemon runs, and how long it has served commands."""
+    status = daemon.status()
+    daemon_fmt.print_daemon_status(status, args)
+    if status is None:
         return 1
-    remote_resources_fmt.print_resource_details(result, args)
+
+
+# Batch command handler
+def handle_batch(args):
+    """Run the command lines of a batch file in this process, then summarize their exit codes."""
+    commands = batch.read_commands(args.file)
+    started = time.monotonic()
+    results = []
+    for result in batch.run_commands(commands, args.parallel, args.stop_on_error):
+        batch_fmt.print_batch_result(result, args)
+        results.append(result)
+
+    failed = [r for r in results if r["exit_code"]]
+    summary = {
+        "commands": len(commands),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "skipped": len(commands) - len(results),
+        "failed_lines": [r["line"] for r in failed],
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    batch_fmt.print_batch_summary(results, summary, args)
+    # The worst exit code, so a usage error (2) is not reported as a plain failure.
+    return max((r["exit_code"] for r in failed), default=0) or None
+
+
+# Shell command handler
+def handle_shell(args):
+    """Run commands typed at an interactive prompt until exit; return the last exit code."""
+    return shell.Shell().run()
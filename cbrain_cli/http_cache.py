@@ -0,0 +1,292 @@
+"""
+On-disk cache of GET responses, revalidated with ETag / Last-Modified.
+
+Bodies are stored per URL and CBRAIN user along with their validators. The
+next GET of the same URL sends ``If-None-Match`` / ``If-Modified-Since``, and a
+304 Not Modified answer is served from the cache, so unchanged reference data
+is not downloaded again. Only requests that ask for it are cached
+(``api_get(..., cache=True)``): reference listings and records such as tools,
+bourreaux, data providers, groups and tool configurations, never walks over
+every page or polling. The cache is bounded in size and evicts the least
+recently used responses first. A cache that cannot be read or written never
+fails a request; it is simply bypassed.
+"""
+
+import atexit
+import collections
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from cbrain_cli.config import (
+    DEFAULT_HTTP_CACHE_MB,
+    HTTP_CACHE_FILE,
+    HTTP_CACHE_MB_ENV_VAR,
+    env_int,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    owner TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (owner, url)
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+# Seconds to wait for another CLI process (or thread) holding the database lock.
+LOCK_TIMEOUT = 5
+
+# Hits and misses not written yet: they are saved along with the next write to
+# the cache, or when the process exits, rather than in a transaction per GET.
+_pending_counts = collections.Counter()
+_counts_lock = threading.Lock()
+
+
+def max_bytes():
+    """
+    Size limit of the cache in bytes; 0 when caching is disabled.
+    """
+    return env_int(HTTP_CACHE_MB_ENV_VAR, DEFAULT_HTTP_CACHE_MB, minimum=0) * 1024 * 1024
+
+
+def _connect():
+    created = not HTTP_CACHE_FILE.exists()
+    if created:
+        HTTP_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(HTTP_CACHE_FILE), timeout=LOCK_TIMEOUT)
+    if created:
+        # Cached bodies are as private as the session that fetched them.
+        os.chmod(HTTP_CACHE_FILE, 0o600)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _run(operation, default=None):
+    """
+    Run ``operation(conn)`` in a transaction, returning ``default`` if the cache fails.
+    """
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError):
+        return default
+    try:
+        with conn:
+            return operation(conn)
+    except (sqlite3.Error, OSError):
+        return default
+    finally:
+        conn.close()
+
+
+def _count(name):
+    with _counts_lock:
+        if not _pending_counts:
+            atexit.register(flush_counts)
+        _pending_counts[name] += 1
+
+
+def _take_counts():
+    with _counts_lock:
+        counts = dict(_pending_counts)
+        _pending_counts.clear()
+    atexit.unregister(flush_counts)
+    return counts
+
+
+def _write_counts(conn, counts):
+    for name, value in counts.items():
+        conn.execute("INSERT OR IGNORE INTO counters VALUES (?, 0)", (name,))
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (value, name))
+
+
+def flush_counts():
+    """
+    Save the hits and misses counted since the last write to the cache.
+    """
+    counts = _take_counts()
+    if counts:
+        _run(lambda conn: _write_counts(conn, counts))
+
+
+def lookup(owner, url):
+    """
+    Return the cached ``(etag, last_modified, body)`` of ``url``, or None.
+    """
+    if not max_bytes() or not HTTP_CACHE_FILE.exists():
+        return None
+    return _run(
+        lambda conn: conn.execute(
+            "SELECT etag, last_modified, body FROM responses WHERE owner = ? AND url = ?",
+            (str(owner), url),
+        ).fetchone()
+    )
+
+
+def conditional_headers(cached):
+    """
+    Request headers revalidating a response returned by :func:`lookup`.
+    """
+    etag, last_modified, _body = cached
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def store(owner, url, headers, body):
+    """
+    Cache a full response body if it carries an ETag or Last-Modified validator.
+
+    Least recently used responses are evicted to keep the cache within
+    :func:`max_bytes`; bodies larger than the whole cache are not stored.
+    """
+    limit = max_bytes()
+    if not limit:
+        return
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+
+    _count("misses")
+    if not (etag or last_modified) or len(body) > limit:
+        return
+
+    def operation(conn):
+        _write_counts(conn, _take_counts())
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(owner), url, etag, last_modified, body, len(body), time.time()),
+        )
+        _evict(conn, limit)
+
+    _run(operation)
+
+
+def _evict(conn, limit):
+    excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0] - limit
+    if excess <= 0:
+        return
+    evicted = []
+    for owner, url, size in conn.execute("SELECT owner, url, size FROM responses ORDER BY used_at"):
+        evicted.append((owner, url))
+        excess -= size
+        if excess <= 0:
+            break
+    conn.executemany("DELETE FROM responses WHERE owner = ? AND url = ?", evicted)
+
+
+def revalidated(owner, url):
+    """
+    Record that the server answered 304 for ``url`` and its cached body was used.
+    """
+
+    _count("hits")
+
+    def operation(conn):
+        _write_counts(conn, _take_counts())
+        conn.execute(
+            "UPDATE responses SET used_at = ? WHERE owner = ? AND url = ?",
+            (time.time(), str(owner), url),
+        )
+
+    _run(operation)
+
+
+def collection_url(url):
+    """
+    URL of the collection a request URL belongs to: ``.../tags/5?x=1`` -> ``.../tags``.
+    """
+    parts = urllib.parse.urlsplit(url)
+    segment = parts.path.lstrip("/").split("/", 1)[0]
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, f"/{segment}", "", ""))
+
+
+def invalidate(owner, url):
+    """
+    Drop the cached responses of ``url`` and of every URL below it.
+    """
+    if not HTTP_CACHE_FILE.exists():
+        return
+    escaped = url.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    _run(
+        lambda conn: conn.execute(
+            "DELETE FROM responses WHERE owner = ? AND (url = ? OR url LIKE ? ESCAPE '\\' "
+            "OR url LIKE ? ESCAPE '\\')",
+            (str(owner), url, f"{escaped}/%", f"{escaped}?%"),
+        )
+    )
+
+
+def stats():
+    """
+    Describe the cache.
+
+    Returns
+    -------
+    dict
+        Path, number of cached responses, their total size, the size limit,
+        and how many GETs were answered from the cache (hits) or downloaded
+        (misses)
+    """
+
+    def operation(conn):
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        return {"entries": entries, "bytes": size, **counters}
+
+    result = {"entries": 0, "bytes": 0}
+    if HTTP_CACHE_FILE.exists():
+        result = _run(operation, result)
+    with _counts_lock:
+        pending = dict(_pending_counts)
+    return {
+        "path": str(HTTP_CACHE_FILE),
+        "entries": result["entries"],
+        "bytes": result["bytes"],
+        "max_bytes": max_bytes(),
+        "hits": result.get("hits", 0) + pending.get("hits", 0),
+        "misses": result.get("misses", 0) + pending.get("misses", 0),
+    }
+
+
+def clear(owner=None):
+    """
+    Remove cached responses, of every user or only of ``owner``.
+
+    Returns
+    -------
+    int
+        Number of responses removed
+    """
+    if owner is None:
+        _take_counts()
+    if not HTTP_CACHE_FILE.exists():
+        return 0
+    if owner is not None:
+        return _run(
+            lambda conn: (
+                conn.execute("DELETE FROM responses WHERE owner = ?", (str(owner),)).rowcount
+            ),
+            0,
+        )
+
+    def operation(conn):
+        removed = conn.execute("DELETE FROM responses").rowcount
+        conn.execute("DELETE FROM counters")
+        return removed
+
+    removed = _run(operation, 0)
+    _run(lambda conn: conn.execute("VACUUM"))
+    return removed
@@ -5,24 +5,38 @@ Setup and commands for the CBRAIN CLI command line interface.
 import argparse
 import sys
 
+from cbrain_cli import daemon, tracing
 from cbrain_cli.cli_utils import (
+    DEFAULT_SHOW_PARALLEL,
+    MAX_ASYNC_PARALLEL,
+    MAX_SHOW_PARALLEL,
     PAGINATABLE_ACTIONS,
     CliValidationError,
+    configure_retries,
     handle_errors,
     is_authenticated,
     pagination,
     version_info,
 )
-from cbrain_cli.data.tasks import operation_task
+from cbrain_cli.config import DEFAULT_DAEMON_IDLE_TIMEOUT
 from cbrain_cli.handlers import (
     handle_background_list,
     handle_background_show,
+    handle_background_watch,
+    handle_batch,
+    handle_cache_clear,
+    handle_cache_stats,
+    handle_daemon_start,
+    handle_daemon_status,
+    handle_daemon_stop,
     handle_dataprovider_delete_unregistered,
     handle_dataprovider_is_alive,
     handle_dataprovider_list,
     handle_dataprovider_show,
     handle_file_copy,
     handle_file_delete,
+    handle_file_index_status,
+    handle_file_index_sync,
     handle_file_list,
     handle_file_move,
     handle_file_show,
@@ -33,13 +47,16 @@ from cbrain_cli.handlers import (
     handle_project_unswitch,
     handle_remote_resource_list,
     handle_remote_resource_show,
+    handle_shell,
     handle_tag_create,
     handle_tag_delete,
     handle_tag_list,
     handle_tag_show,
     handle_tag_update,
     handle_task_list,
+    handle_task_operation,
     handle_task_show,
+    handle_task_watch,
     handle_tool_config_boutiques_descriptor,
     handle_tool_config_list,
     handle_tool_config_show,
@@ -50,47 +67,119 @@ from cbrain_cli.sessions import create_session, logout_session
 from cbrain_cli.users import whoami_user
 
 
-def build_parser():
+def _id_or_stdin(value):
     """
-    Build and return the CBRAIN CLI argument parser and command subparsers.
+    Argument type of record IDs: an integer, or ``-`` to read IDs from stdin.
+    """
+    if value == "-":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid ID: {value!r}") from None
 
-    Returns
-    -------
-    tuple
-        (parser, command_parsers) where command_parsers maps command names
-        to their top-level subparsers for help display.
+
+def _add_poll_interval(parser):
+    """
+    Add the adaptive poll interval options of a ``watch`` action.
     """
-    parser = argparse.ArgumentParser(description="CBRAIN CLI")
-    parser.add_argument("-j", "--json", action="store_true", help="Output in JSON format")
     parser.add_argument(
-        "-jl",
-        "--jsonl",
-        action="store_true",
-        help="Output in JSONL format (one JSON object per line)",
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Seconds between polls while statuses change (default: 2)",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=60.0,
+        help="Longest wait between polls once nothing changes (default: 60)",
     )
 
-    subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
-    # Version command
-    version_parser = subparsers.add_parser("version", help="Show CLI version")
-    version_parser.set_defaults(func=handle_errors(version_info))
+def _add_file_batch_options(parser, verb):
+    """
+    Add the options of a file action working through many IDs in batches.
+    """
+    parser.add_argument(
+        "--from-file",
+        metavar="PATH",
+        help=f"Also {verb} the IDs listed in PATH (whitespace-separated)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help=f"With many IDs, number of files per {verb} request (1-1000, default: 500)",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help=f"With many IDs, number of {verb} requests sent concurrently (1-8, default: 1)",
+    )
 
-    # MARK: Session commands (top-level)
-    # Create new session.
-    login_parser = subparsers.add_parser("login", help="Login to CBRAIN")
-    login_parser.set_defaults(func=handle_errors(create_session))
 
-    # Logout session.
-    logout_parser = subparsers.add_parser("logout", help="Logout from CBRAIN")
-    logout_parser.set_defaults(func=handle_errors(logout_session))
+def _add_show_ids(parser, dest, help, parallel=True, fanout=True):
+    """
+    Add the ID arguments of a ``show`` action: one or more IDs, or ``-`` for stdin.
 
-    # Show current session.
-    whoami_parser = subparsers.add_parser("whoami", help="Show current session")
-    whoami_parser.add_argument("-v", "--version", action="store_true", help="Show version")
-    whoami_parser.set_defaults(func=handle_errors(whoami_user))
+    With ``fanout``, --parallel goes beyond MAX_SHOW_PARALLEL threads on the
+    asyncio engine.
+    """
+    parser.add_argument(
+        dest, type=_id_or_stdin, nargs="+", help=f"{help}(s), or - to read from stdin"
+    )
+    if parallel:
+        limits = f"1-{MAX_SHOW_PARALLEL}"
+        if fanout:
+            limits = f"1-{MAX_ASYNC_PARALLEL}; above {MAX_SHOW_PARALLEL}, on the asyncio engine"
+        parser.add_argument(
+            "--parallel",
+            type=int,
+            default=DEFAULT_SHOW_PARALLEL,
+            help=(
+                "With several IDs, number of records fetched concurrently "
+                f"({limits}, default: {DEFAULT_SHOW_PARALLEL})"
+            ),
+        )
+
+
+def _add_resolve_names(parser):
+    """
+    Add ``--resolve-names`` to a ``list`` action whose table shows referenced IDs.
+    """
+    parser.add_argument(
+        "--resolve-names",
+        action="store_true",
+        help="Show the names of referenced users, groups, tools and servers next to their IDs",
+    )
 
-    # MARK: Model-based commands
-    # File commands
+
+def _add_selection(parser):
+    """
+    Add ``--where`` and ``--fields`` to a ``list`` action.
+    """
+    parser.add_argument(
+        "--where",
+        action="append",
+        metavar="EXPR",
+        help=(
+            "Only show records matching FIELD OP VALUE, with OP one of = != < <= > >= ~ (glob)"
+            " !~, e.g. 'size>=1G', 'name~*.nii.gz' or 'size=1M..10M'; repeat to combine"
+        ),
+    )
+    parser.add_argument(
+        "--fields",
+        metavar="A,B,C",
+        help="Only show these comma-separated fields, in this order",
+    )
+
+
+def _add_file_commands(subparsers):
+    """
+    Add the ``file`` command and its actions to ``subparsers``.
+    """
     file_parser = subparsers.add_parser("file", help="File operations")
     file_subparsers = file_parser.add_subparsers(dest="action", help="File actions")
 
@@ -105,20 +194,54 @@ def build_parser():
     file_list_parser.add_argument(
         "--per-page", type=int, default=25, help="Number of files per page (5-1000, default: 25)"
     )
+    file_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
+    file_list_parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=1,
+        help="With --all, number of pages to fetch in parallel (1-16, default: 1)",
+    )
+    file_list_parser.add_argument(
+        "--cached",
+        "--offline",
+        dest="cached",
+        action="store_true",
+        help="List from the local file index (see 'file index sync') without contacting the server",
+    )
+    _add_selection(file_list_parser)
     file_list_parser.set_defaults(func=handle_errors(handle_file_list))
 
     # file show
     file_show_parser = file_subparsers.add_parser("show", help="Show file details")
-    file_show_parser.add_argument("file", type=int, help="File ID")
+    _add_show_ids(file_show_parser, "file", "File ID")
     file_show_parser.set_defaults(func=handle_errors(handle_file_show))
 
     # file upload
     file_upload_parser = file_subparsers.add_parser("upload", help="Upload a file to CBRAIN")
-    file_upload_parser.add_argument("file_path", help="Path to the file to upload")
+    file_upload_parser.add_argument(
+        "file_path",
+        nargs="+",
+        help="Files, directories or glob patterns to upload",
+    )
     file_upload_parser.add_argument(
         "--data-provider", type=int, required=True, help="Data provider ID"
     )
     file_upload_parser.add_argument("--group-id", type=int, help="Group ID")
+    file_upload_parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Include files in subdirectories of directory arguments",
+    )
+    file_upload_parser.add_argument(
+        "--parallel",
+        type=int,
+        default=4,
+        help="Number of files uploaded concurrently (1-32, default: 4)",
+    )
 
     file_upload_parser.set_defaults(func=handle_errors(handle_file_upload))
 
@@ -128,14 +251,15 @@ def build_parser():
     )
     file_copy_parser.add_argument(
         "--file-id",
-        type=int,
+        type=_id_or_stdin,
         nargs="+",
-        required=True,
-        help="One or more file IDs to copy",
+        default=[],
+        help="One or more file IDs to copy, or - to read them from stdin",
     )
     file_copy_parser.add_argument(
         "--dp-id", type=int, required=True, help="Destination data provider ID"
     )
+    _add_file_batch_options(file_copy_parser, "copy")
     file_copy_parser.set_defaults(func=handle_errors(handle_file_copy))
 
     # file move
@@ -144,22 +268,55 @@ def build_parser():
     )
     file_move_parser.add_argument(
         "--file-id",
-        type=int,
+        type=_id_or_stdin,
         nargs="+",
-        required=True,
-        help="One or more file IDs to move",
+        default=[],
+        help="One or more file IDs to move, or - to read them from stdin",
     )
     file_move_parser.add_argument(
         "--dp-id", type=int, required=True, help="Destination data provider ID"
     )
+    _add_file_batch_options(file_move_parser, "move")
     file_move_parser.set_defaults(func=handle_errors(handle_file_move))
 
     # file delete
-    file_delete_parser = file_subparsers.add_parser("delete", help="Delete a file")
-    file_delete_parser.add_argument("file_id", type=int, help="ID of the file to delete")
+    file_delete_parser = file_subparsers.add_parser("delete", help="Delete one or more files")
+    file_delete_parser.add_argument(
+        "file_id",
+        type=_id_or_stdin,
+        nargs="*",
+        help="ID(s) of the files to delete, or - to read them from stdin",
+    )
+    _add_file_batch_options(file_delete_parser, "delete")
     file_delete_parser.set_defaults(func=handle_errors(handle_file_delete))
 
-    # Data provider commands
+    # file index
+    file_index_parser = file_subparsers.add_parser(
+        "index", help="Manage the local file metadata index"
+    )
+    file_index_subparsers = file_index_parser.add_subparsers(
+        dest="index_action", required=True, help="File index actions"
+    )
+
+    # file index sync
+    file_index_sync_parser = file_index_subparsers.add_parser(
+        "sync", help="Mirror file metadata from CBRAIN into the local index"
+    )
+    file_index_sync_parser.set_defaults(func=handle_errors(handle_file_index_sync))
+
+    # file index status
+    file_index_status_parser = file_index_subparsers.add_parser(
+        "status", help="Show the state of the local file index"
+    )
+    file_index_status_parser.set_defaults(func=handle_errors(handle_file_index_status))
+
+    return file_parser
+
+
+def _add_dataprovider_commands(subparsers):
+    """
+    Add the ``dataprovider`` command and its actions to ``subparsers``.
+    """
     dataprovider_parser = subparsers.add_parser("dataprovider", help="Data provider operations")
     dataprovider_subparsers = dataprovider_parser.add_subparsers(
         dest="action", help="Data provider actions"
@@ -169,6 +326,7 @@ def build_parser():
     dataprovider_list_parser = dataprovider_subparsers.add_parser(
         "list", help="List data providers"
     )
+    _add_selection(dataprovider_list_parser)
     dataprovider_list_parser.set_defaults(func=handle_errors(handle_dataprovider_list))
 
     dataprovider_list_parser.add_argument(
@@ -180,11 +338,16 @@ def build_parser():
         default=25,
         help="Number of data providers per page (5-1000, default: 25)",
     )
+    dataprovider_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
     # dataprovider show
     dataprovider_show_parser = dataprovider_subparsers.add_parser(
         "show", help="Show data provider details"
     )
-    dataprovider_show_parser.add_argument("id", type=int, help="Data provider ID")
+    _add_show_ids(dataprovider_show_parser, "id", "Data provider ID", fanout=False)
     dataprovider_show_parser.set_defaults(func=handle_errors(handle_dataprovider_show))
 
     # dataprovider is_alive
@@ -206,12 +369,19 @@ def build_parser():
         func=handle_errors(handle_dataprovider_delete_unregistered)
     )
 
-    # Project commands
+    return dataprovider_parser
+
+
+def _add_project_commands(subparsers):
+    """
+    Add the ``project`` command and its actions to ``subparsers``.
+    """
     project_parser = subparsers.add_parser("project", help="Project operations")
     project_subparsers = project_parser.add_subparsers(dest="action", help="Project actions")
 
     # project list
     project_list_parser = project_subparsers.add_parser("list", help="List projects")
+    _add_selection(project_list_parser)
     project_list_parser.set_defaults(func=handle_errors(handle_project_list))
 
     # project switch
@@ -234,13 +404,24 @@ def build_parser():
     )
     project_unswitch_parser.set_defaults(func=handle_errors(handle_project_unswitch))
 
-    # Tool commands
+    return project_parser
+
+
+def _add_tool_commands(subparsers):
+    """
+    Add the ``tool`` command and its actions to ``subparsers``.
+    """
     tool_parser = subparsers.add_parser("tool", help="Tool operations")
     tool_subparsers = tool_parser.add_subparsers(dest="action", help="Tool actions")
 
     # tool show
     tool_show_parser = tool_subparsers.add_parser("show", help="Show tool details")
-    tool_show_parser.add_argument("id", type=int, help="Tool ID")
+    _add_show_ids(tool_show_parser, "id", "Tool ID", parallel=False)
+    tool_show_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Refetch the cached tool catalogue before looking the tool up",
+    )
     tool_show_parser.set_defaults(func=handle_errors(handle_tool_show))
 
     # tool list
@@ -249,9 +430,21 @@ def build_parser():
     tool_list_parser.add_argument(
         "--per-page", type=int, default=25, help="Number of tools per page (5-1000, default: 25)"
     )
+    tool_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
+    _add_selection(tool_list_parser)
     tool_list_parser.set_defaults(func=handle_errors(handle_tool_list))
 
-    ## MARK: tool-config commands
+    return tool_parser
+
+
+def _add_tool_config_commands(subparsers):
+    """
+    Add the ``tool-config`` command and its actions to ``subparsers``.
+    """
     tool_configs_parser = subparsers.add_parser("tool-config", help="Tool configuration operations")
     tool_configs_subparsers = tool_configs_parser.add_subparsers(
         dest="action", help="Tool configuration actions"
@@ -261,6 +454,8 @@ def build_parser():
     tool_configs_list_parser = tool_configs_subparsers.add_parser(
         "list", help="List all tool configurations"
     )
+    _add_resolve_names(tool_configs_list_parser)
+    _add_selection(tool_configs_list_parser)
     tool_configs_list_parser.set_defaults(func=handle_errors(handle_tool_config_list))
 
     tool_configs_list_parser.add_argument(
@@ -272,12 +467,17 @@ def build_parser():
         default=25,
         help="Number of tool configurations per page (5-1000, default: 25)",
     )
+    tool_configs_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
 
     # tool-config show
     tool_configs_show_parser = tool_configs_subparsers.add_parser(
         "show", help="Show tool configuration details"
     )
-    tool_configs_show_parser.add_argument("id", type=int, help="Tool configuration ID")
+    _add_show_ids(tool_configs_show_parser, "id", "Tool configuration ID")
     tool_configs_show_parser.set_defaults(func=handle_errors(handle_tool_config_show))
 
     # tool-config boutiques-descriptor
@@ -289,22 +489,35 @@ def build_parser():
         func=handle_errors(handle_tool_config_boutiques_descriptor)
     )
 
-    # Tag commands
+    return tool_configs_parser
+
+
+def _add_tag_commands(subparsers):
+    """
+    Add the ``tag`` command and its actions to ``subparsers``.
+    """
     tag_parser = subparsers.add_parser("tag", help="Tag operations")
     tag_subparsers = tag_parser.add_subparsers(dest="action", help="Tag actions")
 
     # tag list
     tag_list_parser = tag_subparsers.add_parser("list", help="List tags")
+    _add_resolve_names(tag_list_parser)
+    _add_selection(tag_list_parser)
     tag_list_parser.set_defaults(func=handle_errors(handle_tag_list))
 
     tag_list_parser.add_argument("--page", type=int, default=1, help="Page number (default: 1)")
     tag_list_parser.add_argument(
         "--per-page", type=int, default=25, help="Number of tags per page (5-1000, default: 25)"
     )
+    tag_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
 
     # tag show
     tag_show_parser = tag_subparsers.add_parser("show", help="Show tag details")
-    tag_show_parser.add_argument("id", type=int, help="Tag ID")
+    _add_show_ids(tag_show_parser, "id", "Tag ID")
     tag_show_parser.set_defaults(func=handle_errors(handle_tag_show))
 
     # tag create
@@ -335,7 +548,13 @@ def build_parser():
     )
     tag_delete_parser.set_defaults(func=handle_errors(handle_tag_delete))
 
-    # Background activity commands
+    return tag_parser
+
+
+def _add_background_commands(subparsers):
+    """
+    Add the ``background`` command and its actions to ``subparsers``.
+    """
     background_parser = subparsers.add_parser("background", help="Background activity operations")
     background_subparsers = background_parser.add_subparsers(
         dest="action", help="Background activity actions"
@@ -345,16 +564,37 @@ def build_parser():
     background_list_parser = background_subparsers.add_parser(
         "list", help="List background activities"
     )
+    _add_resolve_names(background_list_parser)
+    _add_selection(background_list_parser)
     background_list_parser.set_defaults(func=handle_errors(handle_background_list))
 
     # background show
     background_show_parser = background_subparsers.add_parser(
         "show", help="Show background activity details"
     )
-    background_show_parser.add_argument("id", type=int, help="Background activity ID")
+    _add_show_ids(background_show_parser, "id", "Background activity ID")
     background_show_parser.set_defaults(func=handle_errors(handle_background_show))
 
-    # Task commands
+    # background watch
+    background_watch_parser = background_subparsers.add_parser(
+        "watch", help="Follow background activities until they finish, with progress and ETA"
+    )
+    background_watch_parser.add_argument(
+        "id",
+        type=_id_or_stdin,
+        nargs="+",
+        help="ID(s) of the background activities to watch, or - to read them from stdin",
+    )
+    _add_poll_interval(background_watch_parser)
+    background_watch_parser.set_defaults(func=handle_errors(handle_background_watch))
+
+    return background_parser
+
+
+def _add_task_commands(subparsers):
+    """
+    Add the ``task`` command and its actions to ``subparsers``.
+    """
     task_parser = subparsers.add_parser("task", help="Task operations")
     task_subparsers = task_parser.add_subparsers(dest="action", help="Task actions")
 
@@ -367,24 +607,62 @@ def build_parser():
     task_list_parser.add_argument(
         "--per-page", type=int, default=25, help="Number of tasks per page (5-1000, default: 25)"
     )
+    task_list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every page, starting at --page, streaming results as they arrive",
+    )
+    task_list_parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=1,
+        help="With --all, number of pages to fetch in parallel (1-16, default: 1)",
+    )
     task_list_parser.add_argument(
         "bourreau_id",
         type=int,
         nargs="?",
         help="Bourreau ID (required when filter is bourreau-id)",
     )
+    _add_resolve_names(task_list_parser)
+    _add_selection(task_list_parser)
     task_list_parser.set_defaults(func=handle_errors(handle_task_list))
 
     # task show
     task_show_parser = task_subparsers.add_parser("show", help="Show task details")
-    task_show_parser.add_argument("task", type=int, help="Task ID")
+    _add_show_ids(task_show_parser, "task", "Task ID")
     task_show_parser.set_defaults(func=handle_errors(handle_task_show))
 
+    # task watch
+    task_watch_parser = task_subparsers.add_parser(
+        "watch", help="Follow tasks until they finish, printing status changes"
+    )
+    task_watch_parser.add_argument(
+        "task",
+        type=_id_or_stdin,
+        nargs="*",
+        help="ID(s) of the tasks to watch, or - to read them from stdin",
+    )
+    task_watch_parser.add_argument(
+        "--batch-id", type=int, help="Watch the tasks of this batch (or narrow the IDs to it)"
+    )
+    task_watch_parser.add_argument(
+        "--bourreau-id", type=int, help="Watch the tasks on this bourreau (or narrow the IDs to it)"
+    )
+    _add_poll_interval(task_watch_parser)
+    task_watch_parser.set_defaults(func=handle_errors(handle_task_watch))
+
     # task operation
     task_operation_parser = task_subparsers.add_parser("operation", help="operation on a task")
-    task_operation_parser.set_defaults(func=handle_errors(operation_task))
+    task_operation_parser.set_defaults(func=handle_errors(handle_task_operation))
+
+    return task_parser
+
 
-    # Remote resource commands
+def _add_remote_resource_commands(subparsers):
+    """
+    Add the ``remote-resource`` command and its actions to ``subparsers``.
+    """
     remote_resource_parser = subparsers.add_parser(
         "remote-resource", help="Remote resource operations"
     )
@@ -396,29 +674,222 @@ def build_parser():
     remote_resource_list_parser = remote_resource_subparsers.add_parser(
         "list", help="List remote resources"
     )
+    _add_resolve_names(remote_resource_list_parser)
+    _add_selection(remote_resource_list_parser)
     remote_resource_list_parser.set_defaults(func=handle_errors(handle_remote_resource_list))
 
     # remote-resource show
     remote_resource_show_parser = remote_resource_subparsers.add_parser(
         "show", help="Show remote resource details"
     )
-    remote_resource_show_parser.add_argument("remote_resource", type=int, help="Remote resource ID")
+    _add_show_ids(remote_resource_show_parser, "remote_resource", "Remote resource ID")
     remote_resource_show_parser.set_defaults(func=handle_errors(handle_remote_resource_show))
 
+    return remote_resource_parser
+
+
+def _add_cache_commands(subparsers):
+    """
+    Add the ``cache`` command and its actions to ``subparsers``.
+    """
+    cache_parser = subparsers.add_parser("cache", help="Local HTTP response cache operations")
+    cache_subparsers = cache_parser.add_subparsers(dest="action", help="Cache actions")
+
+    # cache stats
+    cache_stats_parser = cache_subparsers.add_parser(
+        "stats", help="Show the size and hit counts of the cache"
+    )
+    cache_stats_parser.set_defaults(func=handle_errors(handle_cache_stats))
+
+    # cache clear
+    cache_clear_parser = cache_subparsers.add_parser("clear", help="Remove every cached response")
+    cache_clear_parser.set_defaults(func=handle_errors(handle_cache_clear))
+
+    return cache_parser
+
+
+def _add_daemon_commands(subparsers):
+    """
+    Add the ``daemon`` command and its actions to ``subparsers``.
+    """
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="Resident process running commands over a warm connection"
+    )
+    daemon_subparsers = daemon_parser.add_subparsers(dest="action", help="Daemon actions")
+
+    # daemon start
+    daemon_start_parser = daemon_subparsers.add_parser(
+        "start", help="Start the daemon; later commands are forwarded to it"
+    )
+    daemon_start_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_DAEMON_IDLE_TIMEOUT,
+        help="Exit after this many seconds without a command (0: never, default: 1800)",
+    )
+    daemon_start_parser.add_argument(
+        "--foreground", action="store_true", help="Serve in this process instead of detaching"
+    )
+    daemon_start_parser.set_defaults(func=handle_errors(handle_daemon_start))
+
+    # daemon stop
+    daemon_stop_parser = daemon_subparsers.add_parser("stop", help="Stop the daemon")
+    daemon_stop_parser.set_defaults(func=handle_errors(handle_daemon_stop))
+
+    # daemon status
+    daemon_status_parser = daemon_subparsers.add_parser(
+        "status", help="Show whether the daemon is running"
+    )
+    daemon_status_parser.set_defaults(func=handle_errors(handle_daemon_status))
+
+    return daemon_parser
+
+
+# Top-level options followed by a separate value argument.
+GLOBAL_OPTIONS_WITH_VALUE = ("--trace-file", "--retries", "--retry-max-delay")
+
+# Commands that do not need a session.
+SESSION_COMMANDS = ("version", "login", "logout", "whoami", "batch", "shell")
+
+MODEL_COMMANDS = {
+    "file": _add_file_commands,
+    "dataprovider": _add_dataprovider_commands,
+    "project": _add_project_commands,
+    "tool": _add_tool_commands,
+    "tool-config": _add_tool_config_commands,
+    "tag": _add_tag_commands,
+    "background": _add_background_commands,
+    "task": _add_task_commands,
+    "remote-resource": _add_remote_resource_commands,
+    "cache": _add_cache_commands,
+    "daemon": _add_daemon_commands,
+}
+
+# Model commands that only work on local files and need no session.
+LOCAL_COMMANDS = ("cache", "daemon")
+
+
+def build_parser(command=None):
+    """
+    Build and return the CBRAIN CLI argument parser and command subparsers.
+
+    Parameters
+    ----------
+    command : str, optional
+        Command about to be run. Only its subparsers are built (none for
+        session commands); by default every command is.
+
+    Returns
+    -------
+    tuple
+        (parser, command_parsers) where command_parsers maps command names
+        to their top-level subparsers for help display.
+    """
+    parser = argparse.ArgumentParser(description="CBRAIN CLI")
+    parser.add_argument("-j", "--json", action="store_true", help="Output in JSON format")
+    parser.add_argument(
+        "-jl",
+        "--jsonl",
+        action="store_true",
+        help="Output in JSONL format (one JSON object per line)",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Print request timings and CLI phase timings to stderr",
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="FILE",
+        help="Append request and phase timings to FILE as JSONL",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        metavar="N",
+        help="Retries of read requests on 429/502/503/504 or a dropped connection "
+        "(default: 3, or CBRAIN_RETRIES)",
+    )
+    parser.add_argument(
+        "--retry-max-delay",
+        type=int,
+        metavar="SECONDS",
+        help="Longest wait between retries (default: 30, or CBRAIN_RETRY_MAX_DELAY)",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+
+    # Version command
+    version_parser = subparsers.add_parser("version", help="Show CLI version")
+    version_parser.set_defaults(func=handle_errors(version_info))
+
+    # MARK: Session commands (top-level)
+    # Create new session.
+    login_parser = subparsers.add_parser("login", help="Login to CBRAIN")
+    login_parser.set_defaults(func=handle_errors(create_session))
+
+    # Logout session.
+    logout_parser = subparsers.add_parser("logout", help="Logout from CBRAIN")
+    logout_parser.set_defaults(func=handle_errors(logout_session))
+
+    # Show current session.
+    whoami_parser = subparsers.add_parser("whoami", help="Show current session")
+    whoami_parser.add_argument("-v", "--version", action="store_true", help="Show version")
+    whoami_parser.set_defaults(func=handle_errors(whoami_user))
+
+    # Run many command lines in this process.
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run the command lines of a file (or - for stdin) in one process"
+    )
+    batch_parser.add_argument(
+        "file", help="File with one command per line, e.g. 'file list --per-page 5', or -"
+    )
+    batch_parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of independent commands run at once (1-8, default: 1)",
+    )
+    batch_parser.add_argument(
+        "--stop-on-error",
+        action="store_true",
+        help="Start no further command once one has failed",
+    )
+    batch_parser.set_defaults(func=handle_errors(handle_batch))
+
+    # Interactive shell running commands in this process.
+    shell_parser = subparsers.add_parser(
+        "shell", help="Interactive shell keeping the session and connections warm"
+    )
+    shell_parser.set_defaults(func=handle_errors(handle_shell))
+
+    # MARK: Model-based commands
     command_parsers = {
-        "file": file_parser,
-        "dataprovider": dataprovider_parser,
-        "project": project_parser,
-        "tool": tool_parser,
-        "tool-config": tool_configs_parser,
-        "tag": tag_parser,
-        "background": background_parser,
-        "task": task_parser,
-        "remote-resource": remote_resource_parser,
+        name: add_commands(subparsers)
+        for name, add_commands in MODEL_COMMANDS.items()
+        if command in (None, name)
     }
     return parser, command_parsers
 
 
+def requested_command(argv):
+    """
+    Return the command named in ``argv``, or None when it is missing or unknown.
+
+    None is also returned when help is requested before the command, so the
+    full command list is shown.
+    """
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-h", "--help"):
+            return None
+        if arg in GLOBAL_OPTIONS_WITH_VALUE:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg if arg in SESSION_COMMANDS or arg in MODEL_COMMANDS else None
+    return None
+
+
 def main(argv=None):
     """
     The function that controls the CBRAIN CLI.
@@ -433,9 +904,65 @@ def main(argv=None):
     int or None
         Exit code when applicable.
     """
-    parser, command_parsers = build_parser()
-    args = parser.parse_args(argv)
+    if argv is None:
+        argv = sys.argv[1:]
+    exit_code = daemon.forward(argv, requested_command(argv))
+    if exit_code is not None:
+        return exit_code
+    return execute(argv)
+
+
+def execute(argv):
+    """
+    Parse and run one command line in this process.
+
+    Parameters
+    ----------
+    argv : list of str
+        Command-line arguments excluding the program name.
+
+    Returns
+    -------
+    int or None
+        Exit code when applicable.
+    """
+    with tracing.phase("parse_args"):
+        parser, command_parsers = build_parser(requested_command(argv))
+        args = parser.parse_args(argv)
+
+    if args.trace or args.trace_file:
+        tracing.enable(args.trace_file)
+    try:
+        configure_retries(args.retries, args.retry_max_delay)
+    except CliValidationError as e:
+        print(f"Error: {e}")
+        return 1
+    try:
+        return run_command(args, parser, command_parsers)
+    finally:
+        if tracing.is_enabled():
+            command = " ".join(filter(None, (args.command, getattr(args, "action", None))))
+            tracing.report(command=command or None)
 
+
+def run_command(args, parser, command_parsers):
+    """
+    Dispatch parsed arguments to their command.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments
+    parser : argparse.ArgumentParser
+        Top-level parser, for help output
+    command_parsers : dict
+        Model command subparsers, for help output
+
+    Returns
+    -------
+    int or None
+        Exit code when applicable.
+    """
     if not args.command:
         parser.print_help()
         return
@@ -447,7 +974,8 @@ def main(argv=None):
             print(f"Error: {e}")
             return 1
 
-    # Handle session commands (no authentication needed for login, logout, version, and whoami).
+    # Handle session commands (no authentication needed for login, logout, version, whoami,
+    # batch and shell).
     if args.command == "login":
         return handle_errors(create_session)(args)
     elif args.command == "logout":
@@ -456,23 +984,16 @@ def main(argv=None):
         return handle_errors(version_info)(args)
     elif args.command == "whoami":
         return handle_errors(whoami_user)(args)
+    elif args.command in ("batch", "shell"):
+        # Each command line checks its own session.
+        return args.func(args)
 
-    # All other commands require authentication.
-    if not is_authenticated():
+    # All other commands require authentication, except those working on local files.
+    if args.command not in LOCAL_COMMANDS and not is_authenticated():
         return 1
 
     # Handle authenticated commands.
-    if args.command in [
-        "file",
-        "dataprovider",
-        "project",
-        "tool",
-        "tool-config",
-        "tag",
-        "background",
-        "task",
-        "remote-resource",
-    ]:
+    if args.command in MODEL_COMMANDS:
         if not hasattr(args, "action") or not args.action:
             # Show help for the specific model command.
             command_parsers[args.command].print_help()
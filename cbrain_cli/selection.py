@@ -0,0 +1,201 @@
+"""
+Client-side selection of listed records (``--where`` and ``--fields``).
+
+Predicates and projections are applied lazily, one record at a time, between
+fetching a listing and formatting it: a streamed ``--all`` listing stays a
+stream, and records that are filtered out or fields that are not selected
+are dropped before they reach the formatter.
+
+A ``--where`` expression is ``FIELD OP VALUE`` with one of these operators:
+
+- ``=`` / ``==``, ``!=``: equality; ``FIELD=LOW..HIGH`` is an inclusive range
+  and either bound may be left out (``size=1M..``)
+- ``<``, ``<=``, ``>``, ``>=``: numeric comparison when both sides are numbers,
+  text comparison otherwise
+- ``~``, ``!~``: shell-style glob match (``name~*.nii.gz``)
+
+Numbers may carry a binary size suffix (``K``, ``M``, ``G``, ``T``, optionally
+followed by ``B`` or ``iB``). Several ``--where`` options must all match.
+"""
+
+import fnmatch
+import operator
+import re
+
+from cbrain_cli.cli_utils import CliValidationError, RecordStream
+
+EXPRESSION = re.compile(r"^\s*([A-Za-z_][\w.]*)\s*(==|!=|<=|>=|!~|=|<|>|~)\s*([^=<>~].*?)?\s*$")
+NUMBER = re.compile(r"^([-+]?\d+(?:\.\d+)?)\s*(?:([KMGT])(?:i?B)?)?$", re.IGNORECASE)
+SIZE_SUFFIXES = {"k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+BOOLEANS = {"true": True, "yes": True, "false": False, "no": False}
+
+COMPARISONS = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def parse_number(text):
+    """
+    Parse ``text`` as a number with an optional size suffix; None if it is not one.
+
+    Examples
+    --------
+    >>> parse_number("1.5K")
+    1536.0
+    >>> parse_number("10MiB")
+    10485760
+    """
+    match = NUMBER.match(text.strip())
+    if not match:
+        return None
+    number = float(match.group(1)) if "." in match.group(1) else int(match.group(1))
+    if match.group(2):
+        number *= SIZE_SUFFIXES[match.group(2).lower()]
+    return number
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        return parse_number(value)
+    return None
+
+
+def _compare(op, value, literal):
+    """
+    Apply a comparison between a record value and the literal of an expression.
+    """
+    if isinstance(value, bool) and literal.lower() in BOOLEANS:
+        return op(value, BOOLEANS[literal.lower()])
+    number, literal_number = _as_number(value), parse_number(literal)
+    if number is not None and literal_number is not None:
+        return op(number, literal_number)
+    return op(str(value), literal)
+
+
+def parse_where(expression):
+    """
+    Compile one ``--where`` expression into a predicate over records.
+
+    Parameters
+    ----------
+    expression : str
+        ``FIELD OP VALUE`` expression, see the module documentation
+
+    Returns
+    -------
+    callable
+        Function taking a record (dict) and returning whether it matches.
+        A record without the field only matches ``!=`` and ``!~``.
+    """
+    match = EXPRESSION.match(expression)
+    if not match or not match.group(3):
+        raise CliValidationError(
+            f"Invalid expression: {expression!r} (expected FIELD OP VALUE, e.g. size>=1G)",
+            field="--where",
+        )
+    field, op, literal = match.groups()
+    negated = op in ("!=", "!~")
+
+    if op in ("~", "!~"):
+
+        def test(value):
+            return fnmatch.fnmatchcase(str(value), literal)
+
+    elif op in ("=", "==") and ".." in literal:
+        low, high = (bound.strip() for bound in literal.split("..", 1))
+        if not (low or high):
+            raise CliValidationError(f"Invalid range: {expression!r}", field="--where")
+
+        def test(value):
+            return (not low or _compare(operator.ge, value, low)) and (
+                not high or _compare(operator.le, value, high)
+            )
+
+    else:
+        # != is the negation of ==, like !~ is that of ~.
+        compare = COMPARISONS["==" if op in ("=", "!=") else op]
+
+        def test(value):
+            try:
+                return _compare(compare, value, literal)
+            except TypeError:
+                return False
+
+    def predicate(record):
+        value = record.get(field)
+        if value is None:
+            return negated
+        return test(value) != negated
+
+    return predicate
+
+
+def parse_fields(text):
+    """
+    Parse a ``--fields`` list: comma-separated field names, kept in order.
+    """
+    fields = [field.strip() for field in text.split(",")]
+    if not all(fields):
+        raise CliValidationError(f"Invalid field list: {text!r}", field="--fields")
+    return list(dict.fromkeys(fields))
+
+
+class Selection:
+    """
+    Predicates and projection requested with ``--where`` and ``--fields``.
+
+    Parameters
+    ----------
+    where : list of str, optional
+        ``--where`` expressions, all of which must match
+    fields : str, optional
+        ``--fields`` list; records are reduced to these keys, in this order
+
+    Attributes
+    ----------
+    fields : list of str or None
+        Selected fields, or None to keep whole records
+    """
+
+    def __init__(self, where=None, fields=None):
+        self.predicates = [parse_where(expression) for expression in where or []]
+        self.fields = parse_fields(fields) if fields else None
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(getattr(args, "where", None), getattr(args, "fields", None))
+
+    def __bool__(self):
+        return bool(self.predicates or self.fields)
+
+    def matches(self, record):
+        return all(predicate(record) for predicate in self.predicates)
+
+    def project(self, record):
+        if self.fields is None:
+            return record
+        return {field: record[field] for field in self.fields if field in record}
+
+    def apply(self, records):
+        """
+        Filter and project records as they are consumed.
+
+        Returns
+        -------
+        list or RecordStream
+            A list for a list, a lazy stream for a stream
+        """
+        if not self:
+            return records
+        selected = (self.project(record) for record in records if self.matches(record))
+        if isinstance(records, RecordStream):
+            return RecordStream([selected])
+        return list(selected)
@@ -8,6 +8,7 @@ from cbrain_cli.cli_utils import (
     api_send,
     api_token,
     cbrain_url,
+    user_id,
 )
 from cbrain_cli.config import CREDENTIALS_FILE, DEFAULT_BASE_URL, load_credentials, save_credentials
 
@@ -72,7 +73,7 @@ def create_session(args):
 # MARK: Logout
 def logout_session(args):
     """
-    Logout from CBRAIN by deleting the session file.
+    Logout from CBRAIN by deleting the session file and its cached responses.
 
     Parameters
     ----------
@@ -116,6 +117,10 @@ def logout_session(args):
     except urllib.error.URLError as e:
         print(f"Network error during logout: {e}")
 
+    from cbrain_cli import http_cache
+
+    http_cache.clear(owner=user_id)
+
     if CREDENTIALS_FILE.exists():
         CREDENTIALS_FILE.unlink()
         print(f"Local session removed from {CREDENTIALS_FILE}")
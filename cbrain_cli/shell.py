@@ -0,0 +1,303 @@
+"""
+Interactive CBRAIN CLI shell (``cbrain shell``).
+
+Every line typed at the ``cbrain>`` prompt is a command as typed after
+``cbrain`` (``task show 12``), parsed by the regular parser and run by the
+regular handlers in this process, so the credentials, the connection pool and
+the in-memory caches stay warm from one command to the next.
+
+Tab completes commands, actions and options, and the IDs of records of the
+command's kind seen in recent results (``task show <Tab>`` offers the task
+IDs listed before). ``timing on`` shows how long each command took. History is
+kept in ``~/.config/cbrain/shell_history`` when the ``readline`` module is
+available.
+"""
+
+import argparse
+import cmd
+import collections
+import os
+import shlex
+import sys
+import threading
+import time
+import urllib.parse
+
+from cbrain_cli.config import SHELL_HISTORY_FILE, SHELL_HISTORY_LENGTH
+
+# Commands that cannot run in the shell: they prompt, change the session, or nest.
+EXCLUDED_COMMANDS = ("login", "logout", "shell", "daemon")
+
+# Command -> collection whose record IDs it takes.
+COMMAND_COLLECTIONS = {
+    "background": "background_activities",
+    "dataprovider": "data_providers",
+    "file": "userfiles",
+    "project": "groups",
+    "remote-resource": "bourreaux",
+    "tag": "tags",
+    "task": "tasks",
+    "tool": "tools",
+    "tool-config": "tool_configs",
+}
+
+# Record IDs remembered per collection for completion.
+RECENT_IDS = 500
+
+
+class RecentIds:
+    """
+    IDs of the records returned by recent GET requests, per collection.
+
+    Register :meth:`observe` in ``cli_utils.response_observers``; the
+    collection is the first segment of the request path (``tasks``).
+    """
+
+    def __init__(self, limit=RECENT_IDS):
+        self.limit = limit
+        self._ids = collections.defaultdict(collections.OrderedDict)
+        self._lock = threading.Lock()
+
+    def observe(self, url, data):
+        collection = urllib.parse.urlsplit(url).path.strip("/").split("/", 1)[0]
+        records = data if isinstance(data, list) else [data]
+        with self._lock:
+            ids = self._ids[collection]
+            for record in records:
+                if isinstance(record, dict) and record.get("id") is not None:
+                    key = str(record["id"])
+                    ids.pop(key, None)
+                    ids[key] = None
+            while len(ids) > self.limit:
+                ids.popitem(last=False)
+
+    def ids(self, collection):
+        """
+        Return the remembered IDs of ``collection``, most recent first.
+        """
+        with self._lock:
+            return list(reversed(self._ids.get(collection, ())))
+
+
+def _subcommands(parser):
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            return action.choices
+    return {}
+
+
+def _options(parser):
+    return [option for action in parser._actions for option in action.option_strings]
+
+
+class Shell(cmd.Cmd):
+    """
+    Read-eval-print loop running CBRAIN CLI commands in this process.
+
+    Parameters
+    ----------
+    stdin, stdout : file, optional
+        Streams to read commands from and write prompts to; the standard
+        streams by default. Without a terminal no prompt is shown, so
+        ``cbrain shell < commands.txt`` runs a script.
+    """
+
+    intro = "CBRAIN shell. Type help for the commands, exit or Ctrl-D to quit."
+    doc_header = "Shell commands (type help <command> for any cbrain command):"
+
+    def __init__(self, stdin=None, stdout=None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        # input() only reads the real standard input.
+        self.use_rawinput = stdin is None
+        interactive = (stdin or sys.stdin).isatty()
+        self.prompt = "cbrain> " if interactive else ""
+        if not interactive:
+            self.intro = None
+        self.timing = False
+        self.exit_code = 0
+        self.recent = RecentIds()
+        self._parsers = {}
+
+    # MARK: Loop
+    def run(self):
+        """
+        Run commands until ``exit`` or end of input; return the exit code of the last one.
+        """
+        from cbrain_cli import cli_utils
+
+        readline = self._load_history()
+        cli_utils.response_observers.append(self.recent.observe)
+        try:
+            while True:
+                try:
+                    self.cmdloop()
+                    break
+                except KeyboardInterrupt:
+                    # Ctrl-C at the prompt discards the line being typed.
+                    self.stdout.write("^C\n")
+                    self.intro = None
+        finally:
+            cli_utils.response_observers.remove(self.recent.observe)
+            if readline is not None:
+                self._save_history(readline)
+        return self.exit_code or None
+
+    def _load_history(self):
+        if not self.prompt:
+            return None
+        try:
+            import readline
+        except ImportError:
+            return None
+        # Complete whole words: commands and options contain dashes.
+        readline.set_completer_delims(" \t\n")
+        if "libedit" in (readline.__doc__ or ""):
+            # macOS ships libedit, which cmd.Cmd does not configure.
+            readline.parse_and_bind("bind ^I rl_complete")
+        try:
+            readline.read_history_file(SHELL_HISTORY_FILE)
+        except OSError:
+            pass
+        readline.set_history_length(SHELL_HISTORY_LENGTH)
+        return readline
+
+    def _save_history(self, readline):
+        try:
+            SHELL_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+            readline.write_history_file(SHELL_HISTORY_FILE)
+            os.chmod(SHELL_HISTORY_FILE, 0o600)
+        except OSError:
+            pass
+
+    def emptyline(self):
+        # Unlike cmd.Cmd, an empty line does not repeat the previous command.
+        return False
+
+    def default(self, line):
+        """
+        Run a cbrain command line.
+        """
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as e:
+            print(f"Error: {e}")
+            self.exit_code = 1
+            return False
+        if argv[:1] == ["cbrain"]:
+            argv = argv[1:]
+        if argv:
+            self.exit_code = self.execute(argv)
+        return False
+
+    def execute(self, argv):
+        """
+        Run one command line in this process and return its exit code.
+        """
+        from cbrain_cli import cli_utils, tracing
+        from cbrain_cli.main import execute, requested_command
+
+        command = requested_command(argv)
+        if command in EXCLUDED_COMMANDS:
+            print(f"Error: '{command}' cannot run in the shell")
+            return 1
+
+        # Each command gets its own trace and retry settings.
+        tracing.reset()
+        cli_utils.retry_policy = cli_utils.default_retry_policy()
+        started = time.monotonic()
+        try:
+            code = execute(argv)
+        except SystemExit as e:
+            # argparse exits after printing usage or help.
+            code = e.code if isinstance(e.code, int) or e.code is None else 1
+        except KeyboardInterrupt:
+            print("\nOperation cancelled")
+            code = 1
+        if self.timing:
+            print(f"Time: {1000 * (time.monotonic() - started):.1f} ms")
+        return code or 0
+
+    # MARK: Shell commands
+    def get_names(self):
+        # Keep EOF out of the help listing.
+        return [name for name in super().get_names() if name != "do_EOF"]
+
+    def do_exit(self, arg):
+        """Leave the shell."""
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg):
+        """Leave the shell (Ctrl-D)."""
+        if self.prompt:
+            self.stdout.write("\n")
+        return True
+
+    def do_timing(self, arg):
+        """timing [on|off]: show how long each command takes."""
+        if arg.strip() in ("on", "off"):
+            self.timing = arg.strip() == "on"
+        elif arg.strip():
+            print("Usage: timing [on|off]")
+            return False
+        print(f"Timing is {'on' if self.timing else 'off'}.")
+        return False
+
+    def do_help(self, arg):
+        """help [command [action]]: show the help of the shell or of a cbrain command."""
+        if not arg:
+            self.execute(["--help"])
+            super().do_help(arg)
+        elif hasattr(self, f"do_{arg}"):
+            super().do_help(arg)
+        else:
+            self.execute([*arg.split(), "--help"])
+        return False
+
+    # MARK: Completion
+    def _command_parsers(self, command):
+        if command not in self._parsers:
+            from cbrain_cli.main import build_parser
+
+            parser, command_parsers = build_parser(command)
+            self._parsers[command] = parser, command_parsers.get(command)
+        return self._parsers[command]
+
+    def completenames(self, text, *ignored):
+        parser, _command_parser = self._command_parsers(None)
+        if text.startswith("-"):
+            names = _options(parser)
+        else:
+            names = [*_subcommands(parser), "exit", "quit", "timing", "help"]
+        return [name for name in names if name.startswith(text)]
+
+    def completedefault(self, text, line, begidx, endidx):
+        from cbrain_cli.main import requested_command
+
+        try:
+            words = shlex.split(line[:begidx])
+        except ValueError:
+            return []
+        if words[:1] == ["cbrain"]:
+            words = words[1:]
+        command = requested_command(words)
+        if command is None:
+            # Only global options so far: more of them, or the command.
+            return self.completenames(text)
+        _parser, command_parser = self._command_parsers(command)
+        if command_parser is None or command in EXCLUDED_COMMANDS:
+            return []
+
+        actions = _subcommands(command_parser)
+        action = next((word for word in words[words.index(command) + 1 :] if word in actions), None)
+        if action is None:
+            candidates = list(actions)
+        elif text.startswith("-"):
+            candidates = _options(actions[action])
+        else:
+            candidates = self.recent.ids(COMMAND_COLLECTIONS.get(command))
+        return [candidate for candidate in candidates if candidate.startswith(text)]
+
+    def complete_help(self, text, line, begidx, endidx):
+        return self.completedefault(text, line[len("help") :], begidx - 4, endidx - 4)
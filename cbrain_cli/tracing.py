@@ -0,0 +1,378 @@
+"""
+Request and phase timing for the CBRAIN CLI (``--trace``).
+
+CLI-side phases (argument parsing, credential loading, JSON decoding,
+formatting) are always timed, which costs two clock reads each; until tracing
+is enabled only a running total per phase is kept, so a long-lived process
+does not accumulate events. HTTP requests and retries are only recorded once
+tracing is enabled, with ``--trace``,
+``--trace-file`` or the ``CBRAIN_TRACE`` / ``CBRAIN_TRACE_FILE`` environment
+variables. Only methods, paths, sizes and timings are recorded: headers and
+bodies never are, and token-like query parameters are redacted.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+
+from cbrain_cli.config import TRACE_ENV_VAR, TRACE_FILE_ENV_VAR
+
+# Query parameters whose values never appear in a trace.
+SENSITIVE_PARAM = re.compile(r"token|password|secret|key|session", re.IGNORECASE)
+REDACTED = "REDACTED"
+
+# Request timings, in the order they happen on the wire.
+REQUEST_TIMINGS = ("dns_ms", "connect_ms", "ttfb_ms", "transfer_ms")
+
+# (field, header) of the request table in the stderr summary.
+REQUEST_COLUMNS = (
+    ("method", "Method"),
+    ("path", "Path"),
+    ("status", "Status"),
+    ("bytes_out", "Out"),
+    ("bytes_in", "In"),
+    ("bytes_decoded", "Decoded"),
+    ("dns_ms", "DNS"),
+    ("connect_ms", "Connect"),
+    ("ttfb_ms", "TTFB"),
+    ("transfer_ms", "Transfer"),
+    ("total_ms", "Total"),
+)
+
+
+class Tracer:
+    """
+    Collects trace events for one CLI process.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether HTTP requests are instrumented and a report is produced
+    trace_file : str or None
+        JSONL file the report is appended to; None reports to stderr
+    events : list of dict
+        Phase and request events, in the order they started
+    phase_totals : dict
+        Phase name -> [count, total ms, start ms of the first], for phases
+        timed while tracing was disabled
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self.events = []
+        self.phase_totals = {}
+        self.origin = time.perf_counter()
+        self._active = threading.local()
+
+
+def _ms(start, end=None):
+    """Milliseconds from ``start`` to ``end`` (default: now), both perf_counter values."""
+    return round(((time.perf_counter() if end is None else end) - start) * 1000, 3)
+
+
+tracer = Tracer()
+
+# Tracer of the command running in the current context, when it has one of its
+# own (every command of ``cbrain batch``); the process-wide ``tracer`` otherwise.
+_command_tracer = contextvars.ContextVar("command_tracer", default=None)
+
+
+def current():
+    """
+    Return the tracer of the running command.
+    """
+    return _command_tracer.get() or tracer
+
+
+def use_tracer(own):
+    """
+    Give the command running in the current context its own tracer.
+
+    Run the command in a copied context (``contextvars.copy_context().run``)
+    so that commands running side by side never share a trace.
+    """
+    _command_tracer.set(own)
+
+
+def enable(trace_file=None):
+    """
+    Turn on request tracing and choose where the report goes.
+
+    Parameters
+    ----------
+    trace_file : str, optional
+        JSONL file to append events to; by default a summary goes to stderr
+    """
+    tracer = current()
+    tracer.enabled = True
+    tracer.trace_file = trace_file or tracer.trace_file
+    # Phases timed before tracing was enabled (argument parsing) are reported too.
+    for name, (count, ms, start_ms) in tracer.phase_totals.items():
+        tracer.events.append(
+            {
+                "type": "phase",
+                "name": name,
+                "start_ms": start_ms,
+                "ms": round(ms, 3),
+                "count": count,
+            }
+        )
+    tracer.phase_totals = {}
+
+
+def is_enabled():
+    return current().enabled
+
+
+def reset():
+    """
+    Forget the settings and events of the previous command.
+
+    ``cbrain daemon`` runs many commands in one process; each starts from the
+    environment it was invoked with and reports only its own events.
+    """
+    tracer = current()
+    tracer.enabled = False
+    tracer.trace_file = None
+    tracer.events = []
+    tracer.phase_totals = {}
+    tracer.origin = time.perf_counter()
+    enable_from_environment()
+
+
+def enable_from_environment():
+    """
+    Enable tracing when ``CBRAIN_TRACE`` or ``CBRAIN_TRACE_FILE`` is set.
+    """
+    trace_file = os.environ.get(TRACE_FILE_ENV_VAR)
+    if trace_file or os.environ.get(TRACE_ENV_VAR, "").lower() not in ("", "0", "false", "no"):
+        enable(trace_file)
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Time a CLI-side phase.
+
+    Nested phases with the same name on the same thread are folded into the
+    outermost one, so a formatter calling another formatter is counted once.
+    Time spent in :func:`paused` blocks is left out.
+    """
+    tracer = current()
+    state = tracer._active.__dict__
+    active = state.setdefault("names", set())
+    if name in active:
+        yield
+        return
+    active.add(name)
+    started = time.perf_counter()
+    paused_before = state.get("paused", 0.0)
+    try:
+        yield
+    finally:
+        active.discard(name)
+        elapsed = time.perf_counter() - started - (state.get("paused", 0.0) - paused_before)
+        if tracer.enabled:
+            tracer.events.append(
+                {
+                    "type": "phase",
+                    "name": name,
+                    "start_ms": _ms(tracer.origin, started),
+                    "ms": round(elapsed * 1000, 3),
+                }
+            )
+        else:
+            totals = tracer.phase_totals.setdefault(name, [0, 0.0, _ms(tracer.origin, started)])
+            totals[0] += 1
+            totals[1] += elapsed * 1000
+
+
+@contextlib.contextmanager
+def paused():
+    """
+    Leave the time spent in the block out of the phases running on this thread.
+
+    A formatter printing a lazy listing (``--all``) fetches its pages as it
+    goes; that is request time, not formatting time.
+    """
+    state = current()._active.__dict__
+    if not state.get("names") or state.get("pausing"):
+        yield
+        return
+    state["pausing"] = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        state["pausing"] = False
+        state["paused"] = state.get("paused", 0.0) + time.perf_counter() - started
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as phase ``name``.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def redact_url(url):
+    """
+    Return ``url`` with the values of token-like query parameters replaced.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if not parts.query:
+        return url
+    query = [
+        (key, REDACTED if SENSITIVE_PARAM.search(key) else value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def start_request(method, host, path, bytes_out, started):
+    """
+    Record the start of an HTTP request and return its event.
+
+    The transport fills in the timing fields of the returned dict as the
+    request progresses.
+    """
+    tracer = current()
+    event = {
+        "type": "request",
+        "method": method,
+        "host": host,
+        "path": redact_url(path),
+        "status": None,
+        "reused": False,
+        "bytes_out": bytes_out,
+        "bytes_in": None,
+        "bytes_decoded": None,
+        "encoding": None,
+        "start_ms": _ms(tracer.origin, started),
+        **dict.fromkeys(REQUEST_TIMINGS, 0.0),
+        "total_ms": None,
+    }
+    tracer.events.append(event)
+    return event
+
+
+def finish_request(event, started, error=None):
+    """
+    Complete a request event once its body was read or the request failed.
+    """
+    event["total_ms"] = _ms(started)
+    if error is not None:
+        event["error"] = type(error).__name__
+
+
+def record_retry(method, path, attempt, error, delay):
+    """
+    Record that a request is about to be retried after ``delay`` seconds.
+    """
+    tracer = current()
+    if not tracer.enabled:
+        return
+    tracer.events.append(
+        {
+            "type": "retry",
+            "method": method,
+            "path": redact_url(path),
+            "attempt": attempt,
+            "reason": str(getattr(error, "code", None) or type(error.reason).__name__),
+            "delay_ms": round(delay * 1000, 3),
+            "start_ms": _ms(tracer.origin),
+        }
+    )
+
+
+def _cell(event, column):
+    value = event.get("error") or event["status"] if column == "status" else event[column]
+    if value is None:
+        return "-"
+    return f"{value:.1f}" if column.endswith("_ms") else value
+
+
+def _summary_rows():
+    tracer = current()
+    requests = [e for e in tracer.events if e["type"] == "request"]
+    phases = {}
+    for event in tracer.events:
+        if event["type"] == "phase":
+            count, total = phases.get(event["name"], (0, 0.0))
+            phases[event["name"]] = (count + event.get("count", 1), total + event["ms"])
+    phase_rows = [
+        {"name": name, "count": count, "ms": f"{total:.1f}"}
+        for name, (count, total) in phases.items()
+    ]
+    return requests, phase_rows
+
+
+def report(command=None):
+    """
+    Write the collected events to the trace file, or a summary to stderr.
+
+    Parameters
+    ----------
+    command : str, optional
+        Command that was run, recorded in the JSONL ``run`` event
+    """
+    tracer = current()
+    total_ms = _ms(tracer.origin)
+    if tracer.trace_file:
+        run = {"type": "run", "command": command, "pid": os.getpid(), "total_ms": total_ms}
+        with open(tracer.trace_file, "a") as f:
+            for event in [run, *tracer.events]:
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        return
+
+    from cbrain_cli.cli_utils import dynamic_table_print
+
+    requests, phase_rows = _summary_rows()
+    with contextlib.redirect_stdout(sys.stderr):
+        print("Trace: HTTP requests")
+        if requests:
+            rows = [
+                {column: _cell(event, column) for column, _ in REQUEST_COLUMNS}
+                for event in requests
+            ]
+            dynamic_table_print(
+                rows,
+                [column for column, _header in REQUEST_COLUMNS],
+                [header for _column, header in REQUEST_COLUMNS],
+                max_column_widths={"path": 60},
+            )
+        else:
+            print("No requests.")
+        print()
+        print("Trace: CLI phases (ms)")
+        dynamic_table_print(phase_rows, ["name", "count", "ms"], ["Phase", "Count", "Total"])
+        network_ms = sum(event["total_ms"] or 0 for event in requests)
+        received = sum(event["bytes_in"] or 0 for event in requests)
+        decoded = sum(event["bytes_decoded"] or 0 for event in requests)
+        print(f"\nTotal {total_ms:.1f} ms, {len(requests)} request(s) taking {network_ms:.1f} ms")
+        print(f"Received {received} bytes, {decoded} after decompression")
+        retries = [event for event in tracer.events if event["type"] == "retry"]
+        if retries:
+            waited = sum(event["delay_ms"] for event in retries)
+            reasons = ", ".join(sorted({event["reason"] for event in retries}))
+            print(f"Retried {len(retries)} time(s) ({reasons}), waiting {waited:.1f} ms")
+
+
+enable_from_environment()
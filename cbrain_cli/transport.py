@@ -0,0 +1,404 @@
+"""
+Persistent HTTP transport for the CBRAIN CLI.
+
+``urllib.request`` opens a new TCP (and TLS) connection for every request and
+forces ``Connection: close``. The handlers in this module replace the default
+HTTP/HTTPS handlers of the global opener with ones that keep idle
+``http.client`` connections in a per-host pool, so every ``urlopen()`` call in
+the process reuses an already established connection when one is available.
+Importing the module installs that opener.
+"""
+
+import http.client
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+
+from cbrain_cli import tracing
+from cbrain_cli.config import DEFAULT_POOL_SIZE, POOL_SIZE_ENV_VAR, env_int
+
+# Errors raised when a pooled connection was closed by the server while idle.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of idle keep-alive connections, grouped by host.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of idle connections kept per host. Connections returned
+        beyond this limit are closed.
+    """
+
+    def __init__(self, maxsize=DEFAULT_POOL_SIZE):
+        self.maxsize = maxsize
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        """
+        Take an idle connection for ``key`` or create one with ``factory``.
+
+        Returns
+        -------
+        tuple
+            (connection, reused) where reused is True for a pooled connection
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return factory(), False
+
+    def release(self, key, conn, reusable=True):
+        """
+        Return a connection to the pool, or close it if it cannot be reused.
+        """
+        if reusable and conn.sock is not None:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.maxsize:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def clear(self):
+        """
+        Close and forget every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def idle_count(self, key=None):
+        """
+        Number of idle connections, for one host key or in total.
+        """
+        with self._lock:
+            if key is not None:
+                return len(self._idle.get(key, []))
+            return sum(len(conns) for conns in self._idle.values())
+
+
+# Content codings advertised in Accept-Encoding and decoded transparently.
+ACCEPT_ENCODING = "gzip, deflate"
+
+# Compressed bytes pulled from the socket per decompression step.
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class ContentDecoder:
+    """
+    Incremental decoder for a gzip or deflate response body.
+
+    ``deflate`` is meant to be zlib-wrapped, but some servers send raw
+    deflate data; that is detected from the first block.
+
+    Parameters
+    ----------
+    encoding : str
+        Content-Encoding of the response (``gzip``, ``x-gzip`` or ``deflate``)
+    """
+
+    def __init__(self, encoding):
+        # 32 + MAX_WBITS accepts both gzip and zlib headers.
+        self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        self._raw_fallback = encoding == "deflate"
+
+    def decompress(self, data):
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            if not self._raw_fallback:
+                raise
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(data)
+        finally:
+            self._raw_fallback = False
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class PooledHTTPResponse(http.client.HTTPResponse):
+    """
+    HTTP response that hands its connection back to the pool once the body
+    has been fully consumed (or discards it when closed early).
+    """
+
+    _release = None
+    _unread = False
+    # (event, request start, headers received) perf_counter values while tracing.
+    _trace = None
+    # ContentDecoder for a compressed body, and decoded bytes not yet returned.
+    _decoder = None
+    _decoded = b""
+
+    def read(self, amt=None):
+        # Reading the last block releases the connection (and ends the trace)
+        # before returning, so hold on to the event first.
+        trace = self._trace
+        if self._decoder is None:
+            data = super().read(amt)
+            received = len(data)
+        else:
+            data, received = self._read_decoded(amt)
+        if trace is not None:
+            trace[0]["bytes_in"] += received
+            trace[0]["bytes_decoded"] += len(data)
+        return data
+
+    def _read_decoded(self, amt):
+        """
+        Decompress the body block by block until ``amt`` bytes (or all) are ready.
+
+        Returns
+        -------
+        tuple
+            (decoded data, compressed bytes read from the socket)
+        """
+        chunks = [self._decoded]
+        ready = len(self._decoded)
+        received = 0
+        while amt is None or ready < amt:
+            block = super().read(DECODE_CHUNK_SIZE)
+            if not block:
+                chunks.append(self._decoder.flush())
+                break
+            received += len(block)
+            chunks.append(self._decoder.decompress(block))
+            ready += len(chunks[-1])
+        data = b"".join(chunks)
+        if amt is not None:
+            data, self._decoded = data[:amt], data[amt:]
+        else:
+            self._decoded = b""
+        return data, received
+
+    def close(self):
+        if self.fp is not None and (self.chunked or self.length != 0):
+            # Closed before the body was fully read; the connection still has
+            # pending data and cannot carry another request. Bodiless
+            # responses (304, 204) leave it reusable.
+            self._unread = True
+        super().close()
+
+    def _close_conn(self):
+        super()._close_conn()
+        trace, self._trace = self._trace, None
+        if trace is not None:
+            event, started, body_started = trace
+            event["transfer_ms"] = round((time.perf_counter() - body_started) * 1000, 3)
+            tracing.finish_request(event, started)
+        release, self._release = self._release, None
+        if release is not None:
+            release(reusable=not (self.will_close or self._unread))
+
+
+class PooledHandlerMixin:
+    """
+    Replacement for ``AbstractHTTPHandler.do_open`` that reuses connections.
+    """
+
+    def __init__(self, pool, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+
+    def do_open(self, http_class, req, **http_conn_args):
+        # CONNECT tunnels through a proxy keep urllib's one-shot behaviour.
+        if req._tunnel_host:
+            return super().do_open(http_class, req, **http_conn_args)
+
+        host = req.host
+        if not host:
+            raise urllib.error.URLError("no host given")
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers = {name.title(): val for name, val in headers.items()}
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+
+        key = (http_class.__name__, host)
+
+        def new_connection():
+            conn = http_class(host, timeout=req.timeout, **http_conn_args)
+            conn.set_debuglevel(self._debuglevel)
+            conn.response_class = PooledHTTPResponse
+            return conn
+
+        trace = None
+        if tracing.is_enabled():
+            started = time.perf_counter()
+            trace = tracing.start_request(
+                req.get_method(), host, req.selector, _content_length(req, headers), started
+            )
+
+        conn, reused = self.pool.acquire(key, new_connection)
+        try:
+            try:
+                response = self._send(conn, req, headers, trace)
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped the idle connection; retry once on a fresh one.
+                conn = new_connection()
+                response = self._send(conn, req, headers, trace)
+        except BaseException as err:
+            conn.close()
+            if trace is not None:
+                tracing.finish_request(trace, started, error=err)
+            if isinstance(err, STALE_CONNECTION_ERRORS):
+                # Dropped by the server on a fresh connection: retryable like any URLError.
+                raise urllib.error.URLError(err) from err
+            raise
+
+        encoding = (response.getheader("Content-Encoding") or "").strip().lower()
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            response._decoder = ContentDecoder(encoding)
+        if trace is not None:
+            trace["encoding"] = encoding or None
+            response._trace = (trace, started, time.perf_counter())
+        response._release = lambda reusable: self.pool.release(key, conn, reusable)
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        return response
+
+    @staticmethod
+    def _send(conn, req, headers, trace=None):
+        timeout = req.timeout
+        if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+            timeout = socket.getdefaulttimeout()
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            if trace is not None:
+                trace["reused"] = conn.sock is not None
+                if conn.sock is None:
+                    _traced_connect(conn, trace)
+                sent = time.perf_counter()
+            conn.request(
+                req.get_method(),
+                req.selector,
+                req.data,
+                headers,
+                encode_chunked=req.has_header("Transfer-encoding"),
+            )
+            response = conn.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            raise
+        except (OSError, http.client.HTTPException) as err:
+            # Timeouts and malformed answers surface as URLError, like connection failures.
+            raise urllib.error.URLError(err) from err
+        if trace is not None:
+            trace["ttfb_ms"] = round((time.perf_counter() - sent) * 1000, 3)
+            trace["status"] = response.status
+            trace["bytes_in"] = trace["bytes_decoded"] = 0
+        return response
+
+
+def _content_length(req, headers):
+    """Size of the request body, from its Content-Length or the data itself."""
+    if "Content-Length" in headers:
+        return int(headers["Content-Length"])
+    return len(req.data) if isinstance(req.data, bytes) else 0
+
+
+def _traced_connect(conn, trace):
+    """
+    Open ``conn`` while timing name resolution and connection setup separately.
+
+    Connection setup includes the TLS handshake for HTTPS.
+    """
+    create_connection = conn._create_connection
+
+    def resolve_then_connect(address, *args):
+        host, port = address
+        resolving = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        trace["dns_ms"] = round((time.perf_counter() - resolving) * 1000, 3)
+        error = OSError(f"getaddrinfo returned no addresses for {host}")
+        for *_, sockaddr in addresses:
+            try:
+                return create_connection(sockaddr[:2], *args)
+            except OSError as err:
+                error = err
+        raise error
+
+    conn._create_connection = resolve_then_connect
+    connecting = time.perf_counter()
+    try:
+        conn.connect()
+    finally:
+        conn._create_connection = create_connection
+    connect_ms = (time.perf_counter() - connecting) * 1000
+    trace["connect_ms"] = round(connect_ms - trace["dns_ms"], 3)
+
+
+class PooledHTTPHandler(PooledHandlerMixin, urllib.request.HTTPHandler):
+    """HTTP handler backed by a :class:`ConnectionPool`."""
+
+
+class PooledHTTPSHandler(PooledHandlerMixin, urllib.request.HTTPSHandler):
+    """HTTPS handler backed by a :class:`ConnectionPool`."""
+
+
+pool = ConnectionPool(env_int(POOL_SIZE_ENV_VAR, DEFAULT_POOL_SIZE))
+
+
+def build_opener(connection_pool=None):
+    """
+    Build a ``urllib`` opener whose HTTP(S) handlers share a connection pool.
+
+    Parameters
+    ----------
+    connection_pool : ConnectionPool, optional
+        Pool to draw connections from; defaults to the process-wide pool.
+
+    Returns
+    -------
+    urllib.request.OpenerDirector
+        Opener with the pooled handlers in place of the default ones
+    """
+    connection_pool = connection_pool or pool
+    return urllib.request.build_opener(
+        PooledHTTPHandler(connection_pool),
+        PooledHTTPSHandler(connection_pool),
+    )
+
+
+def install():
+    """
+    Install the pooled opener as the global ``urllib.request.urlopen`` opener.
+    """
+    urllib.request.install_opener(build_opener())
+
+
+def set_pool_size(size):
+    """
+    Change how many idle connections are kept per host.
+    """
+    pool.maxsize = max(1, int(size))
+
+
+def ensure_pool_size(size):
+    """
+    Grow the per-host idle limit to at least ``size`` connections.
+    """
+    pool.maxsize = max(pool.maxsize, int(size))
+
+
+# Route every urlopen() call through the shared keep-alive connection pool.
+install()
@@ -1,15 +1,13 @@
-import json
 import urllib.error
-import urllib.request
 
 from cbrain_cli.cli_utils import (
+    api_get,
     api_token,
     cbrain_url,
     handle_connection_error,
     json_printer,
     user_id,
 )
-from cbrain_cli.config import auth_headers
 
 
 def user_details(user_id):
@@ -26,16 +24,8 @@ def user_details(user_id):
     dict or None
         User data dictionary, or None if the request fails.
     """
-    user_endpoint = f"{cbrain_url}/users/{user_id}"
-
-    user_request = urllib.request.Request(
-        user_endpoint, headers=auth_headers(api_token), method="GET"
-    )
-
     try:
-        with urllib.request.urlopen(user_request) as response:
-            user_data = json.loads(response.read().decode("utf-8"))
-            return user_data
+        return api_get(f"{cbrain_url}/users/{user_id}", api_token)
 
     except (urllib.error.URLError, urllib.error.HTTPError) as e:
         handle_connection_error(e)
@@ -88,25 +78,18 @@ def whoami_user(args):
 
     if version:
         # Verify token by making a session request.
-        session_endpoint = f"{cbrain_url}/session"
-
-        session_request = urllib.request.Request(
-            session_endpoint, headers=auth_headers(api_token), method="GET"
-        )
-
         try:
-            with urllib.request.urlopen(session_request) as response:
-                session_data = json.loads(response.read().decode("utf-8"))
+            session_data = api_get(f"{cbrain_url}/session", api_token)
 
-                # Verify local credentials match server response.
-                remote_user_id = session_data.get("user_id")
-                remote_token = session_data.get("cbrain_api_token")
+            # Verify local credentials match server response.
+            remote_user_id = session_data.get("user_id")
+            remote_token = session_data.get("cbrain_api_token")
 
-                if str(remote_user_id) != str(user_id):
-                    print(f"WARNING: User ID mismatch - Local: {user_id}, Remote: {remote_user_id}")
+            if str(remote_user_id) != str(user_id):
+                print(f"WARNING: User ID mismatch - Local: {user_id}, Remote: {remote_user_id}")
 
-                if remote_token != api_token:
-                    print("WARNING: Token mismatch - tokens don't match")
+            if remote_token != api_token:
+                print("WARNING: Token mismatch - tokens don't match")
 
         except (urllib.error.URLError, urllib.error.HTTPError) as e:
             handle_connection_error(e)
@@ -1,10 +1,15 @@
 import argparse
+import http.server
 import json
 import sys
+import threading
+import urllib.request
 from unittest.mock import MagicMock
 
 import pytest
 
+from cbrain_cli import transport
+
 URL = "http://localhost:3000"
 TOKEN = "test-token"
 CREDS_FILE = "creds.json"
@@ -115,6 +120,21 @@ def _reset_globals(monkeypatch):
     monkeypatch.setattr("cbrain_cli.cli_utils.user_id", None)
 
 
+@pytest.fixture(autouse=True)
+def _isolate_caches(tmp_path, monkeypatch):
+    """Keep on-disk caches, the daemon socket and shell history inside the test's tmp_path."""
+    monkeypatch.setattr("cbrain_cli.data.tools.TOOL_INDEX_FILE", tmp_path / "tools_index.json")
+    monkeypatch.setattr("cbrain_cli.data.names.NAME_CACHE_FILE", tmp_path / "names_cache.json")
+    monkeypatch.setattr("cbrain_cli.http_cache.HTTP_CACHE_FILE", tmp_path / "http_cache.sqlite3")
+    monkeypatch.setattr("cbrain_cli.daemon.DAEMON_SOCKET_FILE", tmp_path / "daemon.sock")
+    monkeypatch.setattr("cbrain_cli.shell.SHELL_HISTORY_FILE", tmp_path / "shell_history")
+    yield
+    # Hit/miss counts are saved at exit, when HTTP_CACHE_FILE is no longer patched.
+    from cbrain_cli import http_cache
+
+    http_cache.flush_counts()
+
+
 @pytest.fixture
 def fake_credentials(monkeypatch, _reset_globals):
     """Set known credentials on cbrain_cli.cli_utils globals.
@@ -160,3 +180,54 @@ def mock_urlopen(monkeypatch):
         monkeypatch.setattr("urllib.request.urlopen", MagicMock(return_value=mock_http_response))
 
     return configure_mock_response
+
+
+class _KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    """Echo the request path as JSON over HTTP/1.1 keep-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status=200):
+        self.server.client_ports.append(self.client_address[1])
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Drop the socket without announcing it, like an idle-timeout on the portal.
+        self.close_connection = self.server.drop_connections
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self._reply(201)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    """Local keep-alive HTTP server; yields (server, base_url)."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    server.client_ports = []
+    server.drop_connections = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pooled_opener(monkeypatch):
+    """Route urlopen() through a fresh connection pool for the test."""
+    pool = transport.ConnectionPool(maxsize=2)
+    monkeypatch.setattr(urllib.request, "_opener", transport.build_opener(pool))
+    yield pool
+    pool.clear()
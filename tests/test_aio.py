@@ -0,0 +1,191 @@
+import gzip
+import http.server
+import json
+import threading
+import time
+import urllib.error
+
+import pytest
+
+from cbrain_cli import aio, cli_utils, tracing
+from cbrain_cli.cli_utils import RetryPolicy
+from tests.conftest import TOKEN, run_main
+
+
+class _RecordHandler(http.server.BaseHTTPRequestHandler):
+    """Serve ``/tasks/<id>`` as JSON, gzip-compressed or chunked on request; 404 for ID 0."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.ports.add(self.client_address[1])
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            if server.failures:
+                server.failures -= 1
+                return self._reply(503, b"{}")
+            record_id = self.path.rsplit("/", 1)[-1]
+            if record_id == "0":
+                return self._reply(404, b'{"error": "not found"}')
+            body = json.dumps({"id": int(record_id), "auth": self.headers["Authorization"]})
+            self._reply(200, body.encode())
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.server.compress:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        if self.server.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 7):
+                chunk = body[start : start + 7]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def record_server():
+    """Local HTTP/1.1 record server; yields (server, base_url)."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RecordHandler)
+    server.lock = threading.Lock()
+    server.ports = set()
+    server.active = server.max_active = 0
+    server.delay = 0
+    server.failures = 0
+    server.compress = server.chunked = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def urls(base_url, ids):
+    return [f"{base_url}/tasks/{i}" for i in ids]
+
+
+def test_fetch_json_in_input_order(record_server):
+    _server, base_url = record_server
+    results = list(aio.fetch_json(urls(base_url, [5, 0, 3]), TOKEN, concurrency=3))
+    assert [url.rsplit("/", 1)[1] for url, _data, _error in results] == ["5", "0", "3"]
+    assert results[0][1] == {"id": 5, "auth": f"Bearer {TOKEN}"}
+    assert results[1][1] is None
+    assert isinstance(results[1][2], urllib.error.HTTPError)
+    assert results[1][2].code == 404
+    assert cli_utils.error_message(results[1][2]).startswith("Resource not found")
+
+
+def test_host_connections_bound_concurrency(record_server):
+    server, base_url = record_server
+    server.delay = 0.02
+    results = list(aio.fetch_json(urls(base_url, range(1, 41)), TOKEN, 40, host_connections=4))
+    assert [data["id"] for _url, data, _error in results] == list(range(1, 41))
+    assert server.max_active <= 4
+    # Kept-alive connections are reused rather than opened per request.
+    assert len(server.ports) <= 4
+
+
+@pytest.mark.parametrize("compress, chunked", [(True, False), (False, True), (True, True)])
+def test_compressed_and_chunked_bodies(record_server, compress, chunked):
+    server, base_url = record_server
+    server.compress, server.chunked = compress, chunked
+    results = list(aio.fetch_json(urls(base_url, [1, 2]), TOKEN, concurrency=1))
+    assert [data["id"] for _url, data, _error in results] == [1, 2]
+    assert len(server.ports) == 1
+
+
+def test_retries_overloaded_server(record_server, monkeypatch):
+    server, base_url = record_server
+    monkeypatch.setattr(cli_utils, "retry_policy", RetryPolicy(retries=2, base_delay=0.001))
+    server.failures = 2
+    [(_url, data, error)] = aio.fetch_json(urls(base_url, [7]), TOKEN)
+    assert error is None and data["id"] == 7
+
+    server.failures = 3
+    [(_url, data, error)] = aio.fetch_json(urls(base_url, [7]), TOKEN)
+    assert error.code == 503
+
+
+def test_connection_refused(record_server, monkeypatch):
+    server, base_url = record_server
+    server.shutdown()
+    server.server_close()
+    monkeypatch.setattr(cli_utils, "retry_policy", RetryPolicy(retries=0))
+    [(_url, data, error)] = aio.fetch_json(urls(base_url, [1]), TOKEN)
+    assert data is None
+    assert isinstance(error, urllib.error.URLError)
+    assert cli_utils.error_message(error).startswith("Connection failed")
+
+
+def test_interrupt_cancels_pending_requests(record_server, monkeypatch, caplog):
+    server, base_url = record_server
+    server.delay = 0.01
+    seen = []
+
+    def interrupt(url, data):
+        seen.append(url)
+        if len(seen) == 3:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli_utils, "response_observers", [interrupt])
+    with pytest.raises(KeyboardInterrupt):
+        list(aio.fetch_json(urls(base_url, range(1, 200)), TOKEN, concurrency=8))
+    assert len(seen) < 199
+    assert "destroyed but it is pending" not in caplog.text
+
+
+def test_stopping_early_cancels_the_rest(record_server, caplog):
+    _server, base_url = record_server
+    results = aio.fetch_json(urls(base_url, range(1, 100)), TOKEN, concurrency=4)
+    assert next(results)[1]["id"] == 1
+    results.close()
+    assert "destroyed but it is pending" not in caplog.text
+
+
+def test_requests_are_traced(record_server):
+    _server, base_url = record_server
+    tracing.reset()
+    tracing.enable()
+    try:
+        list(aio.fetch_json(urls(base_url, [1, 2]), TOKEN, concurrency=1))
+        requests = [e for e in tracing.tracer.events if e["type"] == "request"]
+    finally:
+        tracing.reset()
+    assert [(e["path"], e["status"], e["reused"]) for e in requests] == [
+        ("/tasks/1", 200, False),
+        ("/tasks/2", 200, True),
+    ]
+    assert all(e["total_ms"] is not None for e in requests)
+
+
+def test_task_show_fans_out_on_the_engine(record_server, monkeypatch, fake_credentials, capsys):
+    _server, base_url = record_server
+    monkeypatch.setattr(cli_utils, "cbrain_url", base_url)
+    argv = ["cbrain", "--jsonl", "task", "show", "3", "0", "4", "--parallel", "100"]
+    assert run_main(monkeypatch, argv) == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["id"] for line in lines] == [3, 0, 4]
+    assert lines[1]["error"].startswith("Resource not found")
+
+
+def test_show_parallel_limits(monkeypatch, fake_credentials, capsys):
+    assert run_main(monkeypatch, ["cbrain", "task", "show", "1", "2", "--parallel", "1025"]) == 1
+    assert "between 1 and 1024" in capsys.readouterr().out
+    argv = ["cbrain", "dataprovider", "show", "1", "2", "--parallel", "17"]
+    assert run_main(monkeypatch, argv) == 1
+    assert "between 1 and 16" in capsys.readouterr().out
@@ -1,10 +1,14 @@
+import urllib.error
+
 import pytest
 
 from cbrain_cli.cli_utils import CliValidationError
 from cbrain_cli.data.background_activities import (
+    ActivityWatcher,
     list_background_activities,
     show_background_activity,
 )
+from cbrain_cli.handlers import handle_background_watch
 from tests.conftest import make_args as _args
 from tests.conftest import patch_module_locals
 
@@ -36,3 +40,115 @@ def test_show_background_activity_returns_dict(mock_urlopen):
     mock_urlopen({"id": 5, "type": "CleanupJob", "status": "Completed"})
     result = show_background_activity(_args(id=5))
     assert result["id"] == 5
+
+
+@pytest.fixture
+def activity_polls(monkeypatch):
+    """Serve one scripted /background_activities listing per poll on a fake clock.
+
+    Each cycle is {id: (status, successes, failures)} for activities of 10 items;
+    sleeping advances the clock instead of waiting. Showing an activity returns
+    its record from ``script.shown``, or a 404.
+    """
+    clock = [100.0]
+    monkeypatch.setattr("cbrain_cli.data.background_activities.time.monotonic", lambda: clock[0])
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    def script(*cycles):
+        remaining = list(cycles)
+        requests = []
+
+        def fake_api_get(url, token, params=None):
+            requests.append(url)
+            if not url.endswith("/background_activities"):
+                activity_id = int(url.rsplit("/", 1)[1])
+                if activity_id not in script.shown:
+                    raise urllib.error.HTTPError(url, 404, "Not Found", {}, None)
+                return script.shown[activity_id]
+            cycle = remaining.pop(0) if len(remaining) > 1 else remaining[0]
+            return [
+                {
+                    "id": i,
+                    "type": "BackgroundActivity::MoveFile",
+                    "status": status,
+                    "items": list(range(10)),
+                    "num_successes": successes,
+                    "num_failures": failures,
+                }
+                for i, (status, successes, failures) in cycle.items()
+            ]
+
+        monkeypatch.setattr("cbrain_cli.data.background_activities.api_get", fake_api_get)
+        return requests
+
+    script.sleep = sleep
+    script.shown = {}
+    return script
+
+
+def test_activity_watcher_aggregates_progress_rate_and_eta(activity_polls):
+    requests = activity_polls(
+        {1: ("InProgress", 0, 0), 2: ("InProgress", 2, 0), 3: ("Completed", 10, 0)},
+        {1: ("InProgress", 4, 0), 2: ("InProgress", 6, 0)},
+        {1: ("Completed", 10, 0), 2: ("PartiallyCompleted", 9, 1)},
+    )
+    watcher = ActivityWatcher(_args(id=[1, 2], interval=2, max_interval=60))
+    cycles = list(watcher.cycles(sleep=activity_polls.sleep))
+    assert len(requests) == 3
+    first, second, last = (progress for _changes, progress in cycles)
+    assert (first["items"], first["done"], first["percent"], first["rate"]) == (20, 2, 10.0, None)
+    assert (second["done"], second["rate"], second["eta_seconds"]) == (10, 4.0, 2.5)
+    assert last["finished"] == 2 and last["failures"] == 1
+    assert watcher.summary()["failed_ids"] == [2]
+
+
+def test_activity_watcher_reports_missing_activities(activity_polls):
+    activity_polls({1: ("Completed", 10, 0)})
+    watcher = ActivityWatcher(_args(id=[1, 4]))
+    ((changes, _progress),) = watcher.cycles(sleep=pytest.fail)
+    assert {change["id"]: change["status"] for change in changes} == {
+        1: "Completed",
+        4: "Not Found",
+    }
+    assert watcher.summary()["failed_ids"] == [4]
+
+
+def test_activity_watcher_shows_activities_left_out_of_the_listing(activity_polls):
+    requests = activity_polls({1: ("InProgress", 0, 0)}, {1: ("Completed", 10, 0)})
+    activity_polls.shown[5] = {"id": 5, "type": "CleanupJob", "status": "InProgress"}
+    watcher = ActivityWatcher(_args(id=[1, 5]))
+    cycles = watcher.cycles(sleep=activity_polls.sleep)
+    changes, _progress = next(cycles)
+    assert {change["id"]: change["status"] for change in changes} == {
+        1: "InProgress",
+        5: "InProgress",
+    }
+    assert not watcher.finished
+    assert requests[-1].endswith("/background_activities/5")
+    activity_polls.shown[5] = {**activity_polls.shown[5], "status": "Completed"}
+    assert [change["id"] for change in next(cycles)[0]] == [1, 5]
+    assert watcher.summary()["failed_ids"] == []
+
+
+def test_activity_watcher_requires_ids():
+    with pytest.raises(CliValidationError, match="required"):
+        ActivityWatcher(_args(id=[]))
+
+
+def test_handle_background_watch_prints_changed_cycles(activity_polls, monkeypatch, capsys):
+    activity_polls(
+        {7: ("InProgress", 0, 0)},
+        {7: ("InProgress", 0, 0)},
+        {7: ("InProgress", 5, 0)},
+        {7: ("Completed", 10, 0)},
+    )
+    monkeypatch.setattr("cbrain_cli.data.background_activities.time.sleep", activity_polls.sleep)
+    assert handle_background_watch(_args(id=[7])) is None
+    lines = [line.split("  ", 1)[-1] for line in capsys.readouterr().out.splitlines()]
+    assert lines[0] == "Watching 1 background activity(ies): 1 InProgress"
+    assert lines[1] == "0/10 item(s) (0.0%), 0 failed; 0/1 activity(ies) finished"
+    assert lines[2].startswith("5/10 item(s) (50.0%)") and "ETA" in lines[2]
+    assert lines[3] == "Activity 7 (MoveFile): InProgress -> Completed"
+    assert "finished in" in lines[-1] and "10 item(s) succeeded, 0 failed" in lines[-1]
@@ -0,0 +1,233 @@
+import http.server
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+from cbrain_cli import batch
+from cbrain_cli.cli_utils import CliValidationError
+from tests.conftest import run_main
+
+
+def test_parse_lines():
+    lines = [
+        "# runbook",
+        "",
+        "cbrain version",
+        "  --json cache stats   # trailing comment",
+        "tag create --name 'two words' --user-id 1",
+    ]
+    assert batch.parse_lines(lines) == [
+        (3, ["version"]),
+        (4, ["--json", "cache", "stats"]),
+        (5, ["tag", "create", "--name", "two words", "--user-id", "1"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("login", "line 2: 'login' cannot run in a batch"),
+        ("--json batch other.txt", "line 2: 'batch' cannot run in a batch"),
+        ("tag show 'unclosed", "line 2: No closing quotation"),
+    ],
+)
+def test_parse_lines_rejects(line, message):
+    with pytest.raises(CliValidationError, match=message):
+        batch.parse_lines(["version", line])
+
+
+def test_read_commands_missing_file(tmp_path):
+    with pytest.raises(CliValidationError, match="cannot read"):
+        batch.read_commands(str(tmp_path / "missing.txt"))
+
+
+def test_run_commands_captures_output_per_command(capsys):
+    commands = [(1, ["version"]), (2, ["file", "show"]), (4, ["version"])]
+    results = list(batch.run_commands(commands))
+    assert [(r["line"], r["exit_code"]) for r in results] == [(1, 0), (2, 2), (4, 0)]
+    assert results[0]["stdout"] == "cbrain cli client version 1.0\n"
+    assert "required: file" in results[1]["stderr"]
+    assert results[1]["command"] == "file show"
+    # Nothing leaks to the real streams.
+    assert capsys.readouterr() == ("", "")
+    assert not isinstance(sys.stdout, batch._CapturedOutput)
+
+
+def test_run_commands_parallel_keeps_file_order(monkeypatch):
+    release = threading.Event()
+
+    def execute(argv):
+        if argv == ["slow"]:
+            assert release.wait(5)
+        else:
+            release.set()
+        print(argv[0])
+        return 0
+
+    monkeypatch.setattr("cbrain_cli.main.execute", execute)
+    commands = [(1, ["slow"]), (2, ["fast"]), (3, ["fast"])]
+    results = list(batch.run_commands(commands, parallel=3))
+    assert [(r["line"], r["stdout"]) for r in results] == [
+        (1, "slow\n"),
+        (2, "fast\n"),
+        (3, "fast\n"),
+    ]
+
+
+@pytest.mark.parametrize("parallel", [1, 2])
+def test_run_commands_stop_on_error(monkeypatch, parallel):
+    ran = []
+
+    def execute(argv):
+        ran.append(argv[0])
+        return 1 if argv == ["fail"] else None
+
+    monkeypatch.setattr("cbrain_cli.main.execute", execute)
+    commands = [(1, ["fail"])] + [(n, [f"cmd{n}"]) for n in range(2, 20)]
+    results = list(batch.run_commands(commands, parallel=parallel, stop_on_error=True))
+    assert results[0]["exit_code"] == 1
+    # Commands already started when the failure is seen still finish and are reported.
+    assert len(results) == len(ran) < len(commands)
+    if parallel == 1:
+        assert ran == ["fail"]
+
+
+def test_run_commands_rejects_parallel():
+    with pytest.raises(CliValidationError, match="between 1 and 8"):
+        list(batch.run_commands([(1, ["version"])], parallel=9))
+
+
+def test_batch_command(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "runbook.txt"
+    path.write_text("cbrain version\nfile show 1\nversion\n")
+    assert run_main(monkeypatch, ["cbrain", "batch", str(path)]) == 1
+    captured = capsys.readouterr()
+    assert "==> line 1: cbrain version (ok," in captured.out
+    assert "==> line 2: cbrain file show 1 (exit 1," in captured.out
+    assert "Not logged in" in captured.out
+    assert "Ran 3/3 command(s)" in captured.out
+    assert "Failed lines: 2" in captured.out
+
+
+def test_invalid_lines_reported_before_running(monkeypatch, tmp_path, capsys):
+    ran = []
+    monkeypatch.setattr("cbrain_cli.main.execute", lambda argv: ran.append(argv))
+    path = tmp_path / "runbook.txt"
+    path.write_text("version\ntask lsit\nversion --bogus\nfile show\ntask show --help\n")
+    with pytest.raises(CliValidationError) as error:
+        batch.read_commands(str(path))
+    header, *lines = str(error.value).splitlines()
+    assert header == "3 invalid line(s), nothing was run:"
+    assert [line.split(":", 1)[0] for line in lines] == ["  line 2", "  line 3", "  line 4"]
+    assert "invalid choice: 'lsit'" in lines[0]
+    assert "unrecognized arguments: --bogus" in lines[1]
+    assert "required: file" in lines[2]
+    assert ran == []
+    # Usage output of the checks never reaches the terminal.
+    assert capsys.readouterr() == ("", "")
+
+
+def test_each_command_starts_from_default_settings(monkeypatch):
+    from cbrain_cli import cli_utils, tracing
+
+    seen = []
+
+    def execute(argv):
+        seen.append((cli_utils.current_retry_policy().retries, len(tracing.current().events)))
+        cli_utils.configure_retries(retries=0)
+        tracing.enable()
+        tracing.current().events.append({"type": "phase", "name": "x", "ms": 0})
+
+    monkeypatch.setattr("cbrain_cli.main.execute", execute)
+    list(batch.run_commands([(1, ["a"]), (2, ["b"])]))
+    assert seen == [(3, 0), (3, 0)]
+    # Nothing leaks into the process-wide settings either.
+    assert cli_utils.retry_policy.retries == 3
+    assert not tracing.is_enabled() and tracing.tracer.events == []
+
+
+def test_parallel_commands_keep_their_own_settings(monkeypatch):
+    from cbrain_cli import cli_utils, tracing
+
+    both_configured = threading.Barrier(2, timeout=5)
+    seen = {}
+
+    def execute(argv):
+        retries = int(argv[1])
+        cli_utils.configure_retries(retries=retries)
+        if retries:
+            tracing.enable()
+        both_configured.wait()
+
+        # Worker threads of the command see its settings too.
+        def observe():
+            return cli_utils.current_retry_policy().retries, tracing.is_enabled()
+
+        seen[argv[1]] = cli_utils.fetch_many(lambda _id: observe(), [1, 2], parallel=2)
+        seen[argv[1]] = [result for _id, result, _error in seen[argv[1]]]
+
+    monkeypatch.setattr("cbrain_cli.main.execute", execute)
+    list(batch.run_commands([(1, ["retries", "0"]), (2, ["retries", "7"])], parallel=2))
+    assert seen == {"0": [(0, False), (0, False)], "7": [(7, True), (7, True)]}
+
+
+def test_batch_command_json_from_stdin(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO("version\nversion\n"))
+    assert run_main(monkeypatch, ["cbrain", "--json", "batch", "-", "--parallel", "2"]) is None
+    output = json.loads(capsys.readouterr().out)
+    assert [r["line"] for r in output["results"]] == [1, 2]
+    assert output["summary"] == {
+        "commands": 2,
+        "succeeded": 2,
+        "failed": 0,
+        "skipped": 0,
+        "failed_lines": [],
+        "seconds": output["summary"]["seconds"],
+    }
+
+
+def test_batch_command_invalid_file(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "runbook.txt"
+    path.write_text("version\nlogout\n")
+    assert run_main(monkeypatch, ["cbrain", "batch", str(path)]) == 1
+    assert "line 2: 'logout' cannot run in a batch" in capsys.readouterr().out
+
+
+class _OverloadedHandler(http.server.BaseHTTPRequestHandler):
+    """Answer every GET with 503, counting the requests per path."""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+        self.send_response(503)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_parallel_lines_with_different_retries(monkeypatch, fake_credentials):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OverloadedHandler)
+    server.lock = threading.Lock()
+    server.requests = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr("cbrain_cli.cli_utils.cbrain_url", base_url)
+    monkeypatch.setattr("cbrain_cli.data.tasks.cbrain_url", base_url)
+    monkeypatch.setattr("cbrain_cli.data.tasks.api_token", "tok")
+    monkeypatch.setattr("time.sleep", lambda _seconds: None)
+    try:
+        commands = batch.parse_lines(
+            ["--retries 0 task show 1", "--retries 4 task show 2", "task show 3"]
+        )
+        results = list(batch.run_commands(commands, parallel=3))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert [r["exit_code"] for r in results] == [1, 1, 1]
+    assert server.requests == {"/tasks/1": 1, "/tasks/2": 5, "/tasks/3": 4}
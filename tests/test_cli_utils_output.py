@@ -1,12 +1,19 @@
+import io
 import json
+import time
 from unittest.mock import MagicMock
 
 import pytest
 
 from cbrain_cli.cli_utils import (
+    CliValidationError,
+    RecordStream,
     display_key_value_table,
     dynamic_table_print,
+    fetch_many,
+    json_printer,
     jsonl_printer,
+    read_ids,
     version_info,
 )
 
@@ -56,3 +63,101 @@ def test_dynamic_table_print_header_mismatch_raises():
 def test_version_info(capsys):
     version_info(MagicMock())
     assert "cbrain cli client version" in capsys.readouterr().out
+
+
+def test_json_printer_stream_matches_list_output(capsys):
+    records = [{"id": 1, "name": "a"}, {"id": 2, "nested": {"k": [1, 2]}}]
+    json_printer(records)
+    expected = capsys.readouterr().out
+    json_printer(RecordStream([records[:1], records[1:]]))
+    assert capsys.readouterr().out == expected
+
+
+def test_json_printer_empty_stream(capsys):
+    json_printer(RecordStream([]))
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_jsonl_printer_stream(capsys):
+    jsonl_printer(RecordStream([[{"a": 1}], [{"b": 2}]]))
+    assert capsys.readouterr().out.splitlines() == ['{"a":1}', '{"b":2}']
+
+
+def test_dynamic_table_print_stream_matches_list_output(capsys):
+    rows = [{"id": i, "name": "x" * i} for i in range(1, 6)]
+    dynamic_table_print(rows, ["id", "name"], ["ID", "Name"])
+    expected = capsys.readouterr().out
+    dynamic_table_print(iter(rows), ["id", "name"], ["ID", "Name"])
+    assert capsys.readouterr().out == expected
+
+
+def test_dynamic_table_print_stream_truncates_rows_after_sample(monkeypatch, capsys):
+    monkeypatch.setattr("cbrain_cli.cli_utils.STREAM_SAMPLE_ROWS", 1)
+    dynamic_table_print(
+        iter([{"name": "short"}, {"name": "much longer name"}]),
+        ["name"],
+        ["Name"],
+        max_total_width=80,
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1] == "mu..."
+
+
+def test_dynamic_table_print_converts_each_cell_once(capsys):
+    conversions = []
+
+    class Cell:
+        def __init__(self, value):
+            self.value = value
+
+        def __str__(self):
+            conversions.append(self.value)
+            return self.value
+
+    rows = [{"name": Cell("a")}, {"name": Cell("bb")}]
+    dynamic_table_print(rows, ["name"], ["Name"])
+    dynamic_table_print(iter(rows), ["name"], ["Name"])
+    assert conversions == ["a", "bb", "a", "bb"]
+
+
+def test_dynamic_table_print_declared_widths_print_before_stream_ends(capsys):
+    def rows():
+        yield {"id": 1, "name": "first"}
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        dynamic_table_print(rows(), ["id", "name"], ["ID", "Name"], widths={"id": 4, "name": 3})
+    assert capsys.readouterr().out.splitlines() == ["ID   Name", "---- ----", "1    f..."]
+
+
+def test_dynamic_table_print_writes_in_chunks(monkeypatch):
+    monkeypatch.setattr("cbrain_cli.cli_utils.TABLE_WRITE_LINES", 4)
+    monkeypatch.setattr("cbrain_cli.cli_utils.TABLE_FLUSH_SECONDS", 3600)
+    writes = []
+    monkeypatch.setattr("sys.stdout", MagicMock(write=lambda text: writes.append(text)))
+    dynamic_table_print(iter({"id": i} for i in range(10)), ["id"], ["ID"])
+    # Header, two chunks of four rows and the remaining two rows.
+    assert [text.count("\n") for text in writes] == [2, 4, 4, 2]
+    assert "".join(writes).splitlines()[2:4] == ["0", "1"]
+
+
+def test_fetch_many_keeps_input_order_and_errors():
+    def fetch(item_id):
+        # Later IDs finish first.
+        time.sleep(0.01 * (5 - item_id))
+        if item_id == 3:
+            raise ValueError("boom")
+        return item_id * 10
+
+    results = list(fetch_many(fetch, [1, 2, 3, 4], parallel=4))
+    assert [(i, r) for i, r, _error in results] == [(1, 10), (2, 20), (3, None), (4, 40)]
+    assert str(results[2][2]) == "boom"
+
+
+def test_read_ids_expands_stdin():
+    assert read_ids([1, "-", 9], stdin=io.StringIO("2\n3 4")) == [1, 2, 3, 4, 9]
+    assert read_ids(7) == [7]
+    with pytest.raises(CliValidationError, match="Invalid ID"):
+        read_ids(["-"], stdin=io.StringIO("2 x"))
+    with pytest.raises(CliValidationError, match="No IDs"):
+        read_ids(["-"], stdin=io.StringIO(""))
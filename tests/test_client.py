@@ -0,0 +1,197 @@
+import http.server
+import json
+import threading
+import urllib.error
+import urllib.parse
+
+import pytest
+
+import cbrain_cli
+from cbrain_cli import cli_utils, tracing
+from cbrain_cli.cli_utils import CliValidationError, RetryPolicy
+from cbrain_cli.client import CbrainClient
+from tests.conftest import TOKEN, URL, sample_credentials
+
+
+class _ApiHandler(http.server.BaseHTTPRequestHandler):
+    """Serve ``server.records`` as a paginated ``/userfiles`` listing, by ID and as ``/groups``."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't wait for the client's ACK.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get("Authorization")))
+        if server.failures:
+            server.failures -= 1
+            return self._reply(503, {"error": "busy"})
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        segments = parts.path.strip("/").split("/")
+        if segments == ["userfiles"]:
+            records = [r for r in server.records if query.get("type") in (None, r["type"])]
+            page, per_page = int(query["page"]), int(query["per_page"])
+            return self._reply(200, records[(page - 1) * per_page : page * per_page])
+        if segments == ["groups"]:
+            # Not paginated: every page is the full listing.
+            return self._reply(200, server.records)
+        if segments[0] in ("userfiles", "tasks") and len(segments) == 2:
+            found = [r for r in server.records if str(r["id"]) == segments[1]]
+            return self._reply(200, found[0]) if found else self._reply(404, {})
+        self._reply(404, {})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    """Start local API servers; yields a factory returning (server, base_url)."""
+    servers = []
+
+    def start(records):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ApiHandler)
+        server.records = records
+        server.requests = []
+        server.failures = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def userfiles(count, start=1):
+    return [
+        {"id": i, "name": f"file{i}.nii", "type": "NiftiFile" if i % 2 else "TextFile"}
+        for i in range(start, start + count)
+    ]
+
+
+def test_iter_userfiles_streams_pages_lazily(api_server):
+    server, base_url = api_server(userfiles(12))
+    with CbrainClient(base_url, TOKEN) as client:
+        records = client.iter_userfiles(per_page=5)
+        assert server.requests == []
+        assert next(records)["id"] == 1
+        assert len(server.requests) == 1
+        assert [r["id"] for r in records] == list(range(2, 13))
+    assert [path for path, _auth in server.requests] == [
+        "/userfiles?page=1&per_page=5",
+        "/userfiles?page=2&per_page=5",
+        "/userfiles?page=3&per_page=5",
+    ]
+    assert {auth for _path, auth in server.requests} == {f"Bearer {TOKEN}"}
+
+
+def test_filters_become_query_parameters(api_server):
+    server, base_url = api_server(userfiles(6))
+    client = CbrainClient(base_url, TOKEN)
+    names = [r["name"] for r in client.iter_userfiles(type="NiftiFile", group_id=None)]
+    assert names == ["file1.nii", "file3.nii", "file5.nii"]
+    assert server.requests[0][0] == "/userfiles?type=NiftiFile&page=1&per_page=100"
+
+
+def test_unpaginated_listing_is_read_once(api_server):
+    server, base_url = api_server([{"id": 1, "name": "lab"}, {"id": 2, "name": "study"}])
+    with CbrainClient(base_url, TOKEN) as client:
+        assert [r["id"] for r in client.iter_projects(per_page=2)] == [1, 2]
+    assert len(server.requests) == 2
+
+
+def test_get_many_keeps_order_and_errors(api_server):
+    _server, base_url = api_server(userfiles(5))
+    client = CbrainClient(base_url, TOKEN)
+    results = list(client.get_many([3, 99, 1], parallel=3))
+    assert [(i, record and record["id"]) for i, record, _error in results] == [
+        (3, 3),
+        (99, None),
+        (1, 1),
+    ]
+    assert isinstance(results[1][2], urllib.error.HTTPError)
+    assert client.get_task(2)["name"] == "file2.nii"
+
+
+def test_clients_of_different_servers_are_independent(api_server):
+    first, first_url = api_server(userfiles(3))
+    second, second_url = api_server(userfiles(3, start=100))
+    clients = [CbrainClient(first_url, "token-a"), CbrainClient(second_url, "token-b")]
+    results = {}
+
+    def consume(client):
+        results[client.base_url] = [r["id"] for r in client.iter_userfiles(per_page=2)]
+
+    threads = [threading.Thread(target=consume, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {first_url: [1, 2, 3], second_url: [100, 101, 102]}
+    assert {auth for _path, auth in first.requests} == {"Bearer token-a"}
+    assert {auth for _path, auth in second.requests} == {"Bearer token-b"}
+    # The CLI session is left alone.
+    assert cli_utils.api_token is None and cli_utils.cbrain_url is None
+
+
+def test_connections_are_reused(api_server):
+    _server, base_url = api_server(userfiles(30))
+    client = CbrainClient(base_url, TOKEN)
+    assert len(list(client.iter_userfiles(per_page=5))) == 30
+    assert client.pool.idle_count() == 1
+    client.close()
+    assert client.pool.idle_count() == 0
+
+
+def test_get_is_retried(api_server, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda _seconds: None)
+    server, base_url = api_server(userfiles(1))
+    server.failures = 2
+    assert CbrainClient(base_url, TOKEN).get_userfile(1)["id"] == 1
+
+    server.failures = 1
+    client = CbrainClient(base_url, TOKEN, retry_policy=RetryPolicy(retries=0))
+    with pytest.raises(urllib.error.HTTPError):
+        client.get_userfile(1)
+
+
+def test_untraced_requests_leave_no_events(api_server, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda _seconds: None)
+    fresh = tracing.Tracer()
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    server, base_url = api_server(userfiles(1))
+    server.failures = 1
+    with CbrainClient(base_url, TOKEN) as client:
+        for _ in range(200):
+            client.get_userfile(1)
+    assert fresh.events == [] and fresh.phase_totals == {}
+
+
+def test_from_session(creds_file):
+    creds_file.write_text(json.dumps(sample_credentials()))
+    client = cbrain_cli.CbrainClient.from_session(timeout=5)
+    assert (client.base_url, client.api_token, client.user_id) == (URL, TOKEN, 42)
+    assert client.timeout == 5
+    assert client.url("tasks", {"bourreau_id": 2, "status": None}) == f"{URL}/tasks?bourreau_id=2"
+
+
+def test_from_session_without_login(creds_file):
+    with pytest.raises(CliValidationError, match="Not logged in"):
+        CbrainClient.from_session()
+
+
+def test_invalid_per_page(api_server):
+    _server, base_url = api_server([])
+    with pytest.raises(CliValidationError, match="per_page"):
+        list(CbrainClient(base_url, TOKEN).iter_tasks(per_page=0))
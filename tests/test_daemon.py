@@ -0,0 +1,209 @@
+import contextlib
+import http.server
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from cbrain_cli import daemon
+from tests.conftest import run_main
+
+
+@pytest.fixture
+def home(monkeypatch):
+    """Short temporary HOME (Unix socket paths are limited to ~100 characters)."""
+    path = Path(tempfile.mkdtemp(prefix="cbd"))
+    monkeypatch.setenv("HOME", str(path))
+    monkeypatch.delenv(daemon.DAEMON_ENV_VAR, raising=False)
+    config_dir = path / ".config" / "cbrain"
+    monkeypatch.setattr("cbrain_cli.daemon.DAEMON_SOCKET_FILE", config_dir / "daemon.sock")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def running(home):
+    """Daemon started in the background with the temporary HOME; yields its status."""
+    status, started = daemon.start(idle_timeout=60)
+    assert started and status is not None
+    yield status
+    daemon.stop()
+
+
+class _HangingHandler(http.server.BaseHTTPRequestHandler):
+    """Answer GETs only once ``server.release`` is set."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.release.wait(10)
+        body = b'{"id": 1}'
+        # The daemon may have hung up on an interrupted command.
+        with contextlib.suppress(OSError):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def slow_session(home):
+    """Session of a server that holds every request; yields the server."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _HangingHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.release = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config_dir = home / ".config" / "cbrain"
+    config_dir.mkdir(parents=True)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    credentials = {"cbrain_url": url, "api_token": "tok", "user_id": 1}
+    (config_dir / "credentials.json").write_text(json.dumps(credentials))
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return True
+        daemon.time.sleep(0.05)
+    return False
+
+
+def test_busy_daemon_lets_commands_run_in_process(slow_session, running, capsys):
+    forwarded = []
+    thread = threading.Thread(
+        target=lambda: forwarded.append(daemon.forward(["task", "show", "1"], "task"))
+    )
+    thread.start()
+    assert _wait_for(lambda: slow_session.requests)
+    assert daemon.status()["busy"]
+    assert daemon.forward(["cache", "stats"], "cache") is None
+
+    slow_session.release.set()
+    thread.join(10)
+    assert forwarded == [0]
+    assert not daemon.status()["busy"]
+    assert daemon.forward(["cache", "stats"], "cache") == 0
+
+
+def test_disconnected_client_interrupts_its_command(slow_session, running):
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(str(daemon.DAEMON_SOCKET_FILE))
+    conn.sendall(json.dumps({"argv": ["task", "show", "1"], "cwd": "/", "env": {}}).encode())
+    conn.sendall(b"\n")
+    assert _wait_for(lambda: slow_session.requests)
+    conn.close()
+    # The command is cancelled without the server ever answering.
+    assert _wait_for(lambda: not daemon.status()["busy"])
+    assert not slow_session.release.is_set()
+    assert daemon.status()["commands"] == 1
+
+
+def test_no_daemon(home):
+    assert daemon.status() is None
+    assert daemon.stop() is None
+    assert daemon.forward(["cache", "stats"], "cache") is None
+
+
+def test_forward_relays_output_and_exit_code(running, home, capsys):
+    assert daemon.forward(["--json", "cache", "stats"], "cache") == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["path"] == str(home / ".config" / "cbrain" / "http_cache.sqlite3")
+
+    assert daemon.forward(["file", "show"], "file") == 2
+    captured = capsys.readouterr()
+    assert captured.err.startswith("usage: ")
+    assert "daemon" not in captured.err.splitlines()[0]
+    assert daemon.status()["commands"] == 2
+
+
+def test_main_returns_forwarded_exit_code(running, monkeypatch, capsys):
+    assert run_main(monkeypatch, ["cbrain", "--json", "cache", "stats"]) == 0
+    assert json.loads(capsys.readouterr().out)["entries"] == 0
+    assert daemon.status()["commands"] == 1
+
+
+def test_forward_sends_client_terminal_size(running, monkeypatch):
+    monkeypatch.setenv("COLUMNS", "57")
+    monkeypatch.setenv("LINES", "13")
+    sent = []
+    send = daemon._send
+
+    def recording_send(stream, message):
+        sent.append(message)
+        send(stream, message)
+
+    monkeypatch.setattr(daemon, "_send", recording_send)
+    assert daemon.forward(["cache", "stats"], "cache") == 0
+    assert {"COLUMNS": "57", "LINES": "13"}.items() <= sent[0]["env"].items()
+
+
+def test_command_context_uses_client_terminal_size(monkeypatch, tmp_path):
+    monkeypatch.setenv("COLUMNS", "200")
+    monkeypatch.delenv("LINES", raising=False)
+    request = {"argv": [], "cwd": str(tmp_path), "env": {"COLUMNS": "57", "LINES": "13"}}
+    with daemon._command_context(request):
+        assert tuple(shutil.get_terminal_size()) == (57, 13)
+    # A client without a terminal gets the fallback, not the daemon's size.
+    with daemon._command_context({"argv": [], "cwd": str(tmp_path), "env": {}}):
+        assert "COLUMNS" not in daemon.os.environ
+    assert daemon.os.environ["COLUMNS"] == "200" and "LINES" not in daemon.os.environ
+
+
+@pytest.mark.parametrize(
+    "argv, command",
+    [
+        (["login"], "login"),
+        (["daemon", "status"], "daemon"),
+        (["file", "delete", "-"], "file"),
+    ],
+)
+def test_local_commands_are_not_forwarded(running, argv, command):
+    assert daemon.forward(argv, command) is None
+    assert daemon.status()["commands"] == 0
+
+
+def test_forwarding_can_be_disabled(running, monkeypatch):
+    monkeypatch.setenv(daemon.DAEMON_ENV_VAR, "0")
+    assert daemon.forward(["cache", "stats"], "cache") is None
+
+
+def test_session_change_stops_the_daemon(running, home):
+    (home / ".config" / "cbrain" / "credentials.json").write_text("{}")
+    assert daemon.forward(["cache", "stats"], "cache") is None
+    assert daemon.status() is None
+
+
+def test_start_stop_status(running, capsys):
+    status, started = daemon.start()
+    assert not started and status["pid"] == running["pid"]
+    assert status["idle_timeout"] == 60
+
+    assert daemon.stop()["pid"] == running["pid"]
+    assert daemon.status() is None
+
+
+def test_idle_timeout(home):
+    status, _started = daemon.start(idle_timeout=0.2)
+    assert status is not None
+    for _ in range(100):
+        if not daemon.DAEMON_SOCKET_FILE.exists():
+            break
+        daemon.time.sleep(0.05)
+    assert daemon.status() is None
+    assert not daemon.DAEMON_SOCKET_FILE.exists()
+
+
+def test_status_command(home, monkeypatch, capsys):
+    assert run_main(monkeypatch, ["cbrain", "daemon", "status"]) == 1
+    assert "No daemon is running" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from cbrain_cli.cli_utils import CliValidationError, RecordStream
+from cbrain_cli.data import file_index
+from cbrain_cli.data.files import list_files
+from tests.conftest import make_args, patch_module_locals, run_main
+
+
+def _file(file_id, updated_at="2025-01-01", **fields):
+    record = {"id": file_id, "name": f"f{file_id}", "type": "SingleFile", "updated_at": updated_at}
+    record.update(fields)
+    return record
+
+
+@pytest.fixture(autouse=True)
+def index_file(tmp_path, monkeypatch):
+    path = tmp_path / "index.sqlite3"
+    monkeypatch.setattr("cbrain_cli.data.file_index.FILE_INDEX_FILE", path)
+    patch_module_locals(monkeypatch, "cbrain_cli.data.file_index", user_id=1)
+    return path
+
+
+@pytest.fixture
+def serve_userfiles(monkeypatch):
+    """Answer every /userfiles page request from the given list of records."""
+    calls = []
+
+    def configure(records):
+        def fake_api_get(url, token, params):
+            calls.append(params)
+            page, per_page = int(params["page"]), int(params["per_page"])
+            return records[(page - 1) * per_page : page * per_page]
+
+        monkeypatch.setattr("cbrain_cli.cli_utils.api_get", fake_api_get)
+
+    return configure, calls
+
+
+def test_sync_then_incremental_sync(serve_userfiles):
+    configure, _calls = serve_userfiles
+    configure([_file(1), _file(2), _file(3)])
+    result = file_index.sync_file_index(make_args())
+    assert (result["added"], result["total"]) == (3, 3)
+
+    configure([_file(1), _file(2, updated_at="2025-02-01")])
+    result = file_index.sync_file_index(make_args())
+    assert result["unchanged"] == 1
+    assert result["updated"] == 1
+    assert result["removed"] == 1
+    assert result["total"] == 2
+
+
+def test_cached_list_filters_without_network(serve_userfiles, monkeypatch):
+    configure, _calls = serve_userfiles
+    configure([_file(1, group_id=5), _file(2, group_id=6), _file(3, group_id=5, type="Other")])
+    file_index.sync_file_index(make_args())
+    monkeypatch.setattr("urllib.request.urlopen", MagicMock(side_effect=AssertionError))
+
+    args = make_args(cached=True, group_id=5, dp_id=None, user_id=None, parent_id=None)
+    assert [f["id"] for f in list_files(args)] == [1, 3]
+
+    args = make_args(cached=True, group_id=5, file_type="Other")
+    assert list_files(args) == [_file(3, group_id=5, type="Other")]
+
+
+def test_cached_list_pagination_and_all(serve_userfiles):
+    configure, _calls = serve_userfiles
+    configure([_file(i) for i in range(1, 8)])
+    file_index.sync_file_index(make_args())
+
+    page = file_index.list_indexed_files(make_args(page=2, per_page=5), {})
+    assert [f["id"] for f in page] == [6, 7]
+
+    stream = file_index.list_indexed_files(make_args(all=True, per_page=5), {})
+    assert isinstance(stream, RecordStream)
+    assert [f["id"] for f in stream] == list(range(1, 8))
+
+
+def test_cached_list_without_index_raises():
+    with pytest.raises(CliValidationError, match="file index sync"):
+        file_index.list_indexed_files(make_args(), {})
+
+
+def test_cached_list_rejects_index_of_other_user(serve_userfiles, monkeypatch):
+    configure, _calls = serve_userfiles
+    configure([_file(1)])
+    file_index.sync_file_index(make_args())
+    monkeypatch.setattr("cbrain_cli.data.file_index.user_id", 2)
+    with pytest.raises(CliValidationError, match="another session"):
+        file_index.list_indexed_files(make_args(), {})
+
+
+def test_status_reports_total(serve_userfiles):
+    configure, _calls = serve_userfiles
+    configure([_file(1), _file(2)])
+    file_index.sync_file_index(make_args())
+    status = file_index.file_index_status(make_args())
+    assert status["total"] == 2
+    assert status["synced_at"]
+
+
+def test_sync_uses_max_page_size(serve_userfiles):
+    configure, calls = serve_userfiles
+    configure([])
+    file_index.sync_file_index(make_args())
+    assert calls[0]["per_page"] == "1000"
+
+
+def test_main_file_index_sync_json(monkeypatch, fake_credentials, serve_userfiles, capsys):
+    configure, _calls = serve_userfiles
+    configure([_file(1)])
+    assert run_main(monkeypatch, ["cbrain", "--json", "file", "index", "sync"]) is None
+    assert json.loads(capsys.readouterr().out)["added"] == 1
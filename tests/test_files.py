@@ -1,13 +1,33 @@
+import http.server
+import io
+import json
+import os
+import threading
+import tracemalloc
+import urllib.error
+
 import pytest
 
 from cbrain_cli.cli_utils import CliValidationError
 from cbrain_cli.data.files import (
+    MultipartFileBody,
     copy_file,
+    copy_files,
     delete_file,
+    delete_files,
+    expand_upload_paths,
     list_files,
     move_file,
+    move_files,
     show_file,
     upload_file,
+    upload_files,
+)
+from cbrain_cli.handlers import (
+    handle_file_copy,
+    handle_file_delete,
+    handle_file_move,
+    handle_file_upload,
 )
 from tests.conftest import make_args as _args
 from tests.conftest import patch_module_locals
@@ -129,3 +149,273 @@ def test_upload_file_success(monkeypatch, tmp_path):
     assert result[0]["id"] == 99
     assert result[2] == "sample.bin"
     assert "multipart/form-data" in captured["content_type"]
+
+
+def test_multipart_body_matches_buffered_encoding(tmp_path):
+    upload_path = tmp_path / "scan.nii"
+    upload_path.write_bytes(b"x" * 10)
+    body = MultipartFileBody(
+        {"data_provider_id": 1, "userfile[group_id]": 2},
+        "upload_file",
+        str(upload_path),
+        "application/octet-stream",
+        chunk_size=3,
+    )
+    encoded = b"".join(body)
+    assert len(body) == len(encoded)
+    assert encoded.startswith(
+        b'------formdata-cbrain-cli\r\nContent-Disposition: form-data; name="'
+    )
+    assert b'filename="scan.nii"\r\nContent-Type: application/octet-stream\r\n\r\nxxxxxxxxxx' in (
+        encoded
+    )
+    assert encoded.endswith(b"xxxxxxxxxx\r\n------formdata-cbrain-cli--\r\n")
+    # Re-iterable, so a retried request sends the same bytes.
+    assert b"".join(body) == encoded
+
+
+class _DiscardUploadHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        remaining = int(self.headers["Content-Length"])
+        received = 0
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            received += len(chunk)
+            remaining -= len(chunk)
+        body = json.dumps({"received": received}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_upload_large_sparse_file_streams_with_constant_memory(monkeypatch, tmp_path):
+    size = 128 * 1024 * 1024
+    upload_path = tmp_path / "large.mnc"
+    with open(upload_path, "wb") as f:
+        f.truncate(size)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _DiscardUploadHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        "cbrain_cli.data.files.cbrain_url", f"http://127.0.0.1:{server.server_port}"
+    )
+    try:
+        tracemalloc.start()
+        result = upload_file(_args(file_path=str(upload_path), data_provider=1, group_id=2))
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        server.shutdown()
+        server.server_close()
+
+    assert result[1] == 201
+    assert result[3] == size
+    assert result[0]["received"] > size
+    assert peak < 8 * 1024 * 1024
+
+
+def test_expand_upload_paths_handles_dirs_globs_and_duplicates(tmp_path):
+    (tmp_path / "a.nii").write_bytes(b"a")
+    (tmp_path / "b.mnc").write_bytes(b"b")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.nii").write_bytes(b"c")
+
+    flat = expand_upload_paths([str(tmp_path)])
+    assert [os.path.basename(p) for p in flat] == ["a.nii", "b.mnc"]
+
+    deep = expand_upload_paths([str(tmp_path)], recursive=True)
+    assert [os.path.basename(p) for p in deep] == ["a.nii", "b.mnc", "c.nii"]
+
+    globbed = expand_upload_paths([str(tmp_path / "*.nii"), str(tmp_path / "a.nii")])
+    assert globbed == [str(tmp_path / "a.nii")]
+
+
+def test_expand_upload_paths_missing_raises(tmp_path):
+    with pytest.raises(CliValidationError, match="not found"):
+        expand_upload_paths([str(tmp_path / "*.none")])
+
+
+class _PickyUploadHandler(http.server.BaseHTTPRequestHandler):
+    """Accept uploads except files whose name starts with 'bad'."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers["Content-Length"]))
+        status = 422 if b'filename="bad' in payload else 201
+        body = json.dumps({"id": len(payload)}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def picky_server(monkeypatch):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _PickyUploadHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        "cbrain_cli.data.files.cbrain_url", f"http://127.0.0.1:{server.server_port}"
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_upload_files_reports_each_file(picky_server, tmp_path):
+    for name in ("one.txt", "two.txt", "bad.txt"):
+        (tmp_path / name).write_bytes(b"data")
+    records = list(
+        upload_files(_args(file_path=[str(tmp_path)], data_provider=1, group_id=2, parallel=2))
+    )
+    by_name = {r["file_name"]: r for r in records}
+    assert by_name["one.txt"]["status"] == "uploaded"
+    assert by_name["two.txt"]["userfile_id"]
+    assert by_name["bad.txt"]["status"] == "failed"
+    assert by_name["bad.txt"]["http_status"] == 422
+
+
+def test_upload_files_invalid_parallel_raises(tmp_path):
+    with pytest.raises(CliValidationError) as exc_info:
+        upload_files(_args(file_path=[str(tmp_path)], data_provider=1, group_id=2, parallel=0))
+    assert exc_info.value.field == "--parallel"
+
+
+def test_handle_file_upload_many_jsonl_and_exit_code(picky_server, tmp_path, capsys):
+    (tmp_path / "good.txt").write_bytes(b"data")
+    (tmp_path / "bad.txt").write_bytes(b"data")
+    args = _args(
+        file_path=[str(tmp_path / "good.txt"), str(tmp_path / "bad.txt")],
+        data_provider=1,
+        group_id=2,
+        parallel=2,
+        jsonl=True,
+    )
+    assert handle_file_upload(args) == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(r["status"] for r in lines) == ["failed", "uploaded"]
+
+
+@pytest.fixture
+def delete_requests(monkeypatch):
+    """Record delete_files payloads; a batch containing ID 13 fails with a 500."""
+    batches = []
+
+    def fake_api_send(url, token, method="POST", payload=None, idempotent=False):
+        assert url.endswith("/userfiles/delete_files") and method == "DELETE"
+        file_ids = [int(i) for i in payload["file_ids"]]
+        batches.append(file_ids)
+        if 13 in file_ids:
+            raise urllib.error.HTTPError(url, 500, "Internal Server Error", {}, None)
+        return {"message": "ok", "background_activity_id": 100 + len(batches)}, 200
+
+    monkeypatch.setattr("cbrain_cli.data.files.api_send", fake_api_send)
+    return batches
+
+
+def test_delete_files_streams_ids_into_batches(delete_requests, monkeypatch, tmp_path):
+    id_file = tmp_path / "ids.txt"
+    id_file.write_text("20 21\n22\n")
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(str(i) for i in range(1, 8))))
+    args = _args(file_id=[30, "-"], from_file=str(id_file), batch_size=4, parallel=1)
+    records = list(delete_files(args))
+    assert delete_requests == [[30, 1, 2, 3], [4, 5, 6, 7], [20, 21, 22]]
+    assert [r["background_activity_id"] for r in records] == [101, 102, 103]
+    assert records[2]["first_id"] == 20 and records[2]["last_id"] == 22
+
+
+def test_delete_files_parallel_batches_report_failures(delete_requests):
+    args = _args(file_id=list(range(1, 21)), batch_size=5, parallel=3)
+    records = sorted(delete_files(args), key=lambda r: r["batch"])
+    assert sorted(len(batch) for batch in delete_requests) == [5, 5, 5, 5]
+    assert [r["status"] for r in records] == ["submitted", "submitted", "failed", "submitted"]
+    assert records[2]["http_status"] == 500
+
+
+@pytest.mark.parametrize(
+    "kwargs,match",
+    [({"file_id": []}, "required"), ({"file_id": [1, 2], "batch_size": 0}, "batch size")],
+)
+def test_delete_files_validation(kwargs, match):
+    with pytest.raises(CliValidationError, match=match):
+        delete_files(_args(**kwargs))
+
+
+def test_handle_file_delete_many_summary_and_exit_code(delete_requests, capsys):
+    args = _args(file_id=list(range(10, 16)), batch_size=2, parallel=1, json=True)
+    assert handle_file_delete(args) == 1
+    output = json.loads(capsys.readouterr().out)
+    summary = output["summary"]
+    assert (summary["files"], summary["submitted"], summary["failed"]) == (6, 4, 2)
+    assert summary["background_activity_ids"] == [101, 103]
+    assert [batch["batch"] for batch in output["batches"]] == [1, 2, 3]
+
+
+@pytest.fixture
+def change_provider_requests(monkeypatch):
+    """Record change_provider payloads; a batch containing ID 13 fails with a 500."""
+    payloads = []
+
+    def fake_api_send(url, token, method="POST", payload=None, idempotent=False):
+        assert url.endswith("/userfiles/change_provider") and method == "POST"
+        payloads.append(payload)
+        if "13" in payload["file_ids"]:
+            raise urllib.error.HTTPError(url, 500, "Internal Server Error", {}, None)
+        return {"message": "ok", "background_activity_id": 200 + len(payloads)}, 200
+
+    monkeypatch.setattr("cbrain_cli.data.files.api_send", fake_api_send)
+    return payloads
+
+
+def test_copy_files_streams_stdin_into_change_provider_batches(
+    change_provider_requests, monkeypatch
+):
+    monkeypatch.setattr("sys.stdin", io.StringIO("1 2 3\n4 5\n"))
+    records = list(copy_files(_args(file_id=["-"], dp_id=7, batch_size=2, parallel=2)))
+    assert sorted(p["file_ids"] for p in change_provider_requests) == [
+        ["1", "2"],
+        ["3", "4"],
+        ["5"],
+    ]
+    assert all(
+        p["data_provider_id_for_mv_cp"] == 7 and "copy" in p for p in change_provider_requests
+    )
+    assert sorted(r["files"] for r in records) == [1, 2, 2]
+
+
+def test_move_files_requires_destination_before_reading_ids(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("not-an-id"))
+    with pytest.raises(CliValidationError, match="Destination"):
+        move_files(_args(file_id=["-"], dp_id=None))
+
+
+def test_handle_file_move_batches_ids_from_file(change_provider_requests, tmp_path, capsys):
+    id_file = tmp_path / "ids.txt"
+    id_file.write_text("10 11\n12 13\n14\n")
+    args = _args(file_id=[], from_file=str(id_file), dp_id=3, batch_size=2, parallel=1)
+    assert handle_file_move(args) == 1
+    out = capsys.readouterr().out
+    assert "FAIL  batch 2: 2 file(s), IDs 12..13" in out
+    assert "Submitted 3/5 file(s) for moving in 3 batch(es)" in out
+    assert "Background activity IDs: 201 203" in out
+
+
+def test_handle_file_copy_few_ids_keep_single_request(change_provider_requests, capsys):
+    assert handle_file_copy(_args(file_id=[1, 2, 3], dp_id=3, batch_size=500)) is None
+    assert [p["file_ids"] for p in change_provider_requests] == [[1, 2, 3]]
+    assert "Background activity ID: 201" in capsys.readouterr().out
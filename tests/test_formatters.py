@@ -1,3 +1,4 @@
+from cbrain_cli.cli_utils import RecordStream
 from cbrain_cli.formatter import projects_fmt, tags_fmt, tasks_fmt
 from tests.conftest import make_args, parse_json_output
 
@@ -288,3 +289,11 @@ def test_print_task_details_normal(capsys):
     out = capsys.readouterr().out
     assert "Ready" in out
     assert "PARAMETERS" in out
+
+
+def test_print_task_data_stream_counts_streamed_rows(capsys):
+    pages = [[{"id": 1, "type": "A", "status": "New"}], [{"id": 2, "type": "B", "status": "Done"}]]
+    tasks_fmt.print_task_data(RecordStream(pages), make_args())
+    out = capsys.readouterr().out
+    assert "Done" in out
+    assert "Total: 2 task(s)" in out
@@ -1,6 +1,11 @@
+import io
+import json
+import urllib.error
+
 import pytest
 
 import cbrain_cli.handlers as handlers
+from cbrain_cli.cli_utils import CliValidationError
 from tests.conftest import make_args
 
 SHOW_HANDLER_CASES = [
@@ -196,3 +201,64 @@ def test_show_handler_none_returns_1(
     monkeypatch.setattr(fmt_fn, lambda *_: fmt_called.append(True))
     assert getattr(handlers, handler_name)(make_args(**arg_kwargs)) == 1
     assert fmt_called == []
+
+
+def _fake_show(sample, arg_kwargs, failing_id):
+    """Data function answering every ID with ``sample`` except ``failing_id``."""
+    (field,) = arg_kwargs
+
+    def show(args):
+        item_id = getattr(args, field)
+        if item_id == failing_id:
+            raise urllib.error.HTTPError("url", 404, "Not Found", {}, None)
+        return {**sample, "id": item_id}
+
+    return field, show
+
+
+@pytest.mark.parametrize(
+    "handler_name,data_fn,fmt_fn,sample,arg_kwargs",
+    [case for case in SHOW_HANDLER_CASES if case[0] != "handle_tool_show"],
+)
+def test_show_handler_many_ids_in_input_order(
+    monkeypatch, capsys, handler_name, data_fn, fmt_fn, sample, arg_kwargs
+):
+    field, show = _fake_show(sample, arg_kwargs, failing_id=20)
+    monkeypatch.setattr(data_fn, show)
+    args = make_args(**{field: [30, 20, 10]}, json=True, parallel=3)
+    assert getattr(handlers, handler_name)(args) == 1
+    output = json.loads(capsys.readouterr().out)
+    assert [item["id"] for item in output] == [30, 20, 10]
+    assert output[1] == {"id": 20, "error": "Resource not found (404): Not Found"}
+
+
+def test_show_many_reads_ids_from_stdin(monkeypatch, capsys):
+    _field, show = _fake_show({"status": "Done"}, {"task": None}, failing_id=None)
+    monkeypatch.setattr("cbrain_cli.handlers.tasks.show_task", show)
+    monkeypatch.setattr("sys.stdin", io.StringIO("4\n5 6\n"))
+    assert handlers.handle_task_show(make_args(task=["-"], jsonl=True)) is None
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [4, 5, 6]
+
+
+def test_show_many_table_reports_failures(monkeypatch, capsys):
+    _field, show = _fake_show({"name": "tag"}, {"id": None}, failing_id=2)
+    monkeypatch.setattr("cbrain_cli.handlers.tags.show_tag", show)
+    assert handlers.handle_tag_show(make_args(id=[1, 2, 3])) == 1
+    out = capsys.readouterr().out
+    assert out.count("TAG DETAILS") == 2
+    assert "Error: ID 2: Resource not found (404)" in out
+
+
+def test_show_many_rejects_invalid_parallel():
+    with pytest.raises(CliValidationError, match="parallel"):
+        handlers.handle_tag_show(make_args(id=[1, 2], parallel=0))
+
+
+def test_tool_show_many_uses_catalogue(monkeypatch, capsys):
+    monkeypatch.setattr(
+        "cbrain_cli.handlers.tools.show_tools",
+        lambda ids, refresh: [(i, {"id": i, "name": "t"}, None) for i in ids],
+    )
+    assert handlers.handle_tool_show(make_args(id=[2, 1], json=True)) is None
+    assert [tool["id"] for tool in json.loads(capsys.readouterr().out)] == [2, 1]
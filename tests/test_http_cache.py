@@ -0,0 +1,162 @@
+import hashlib
+import http.server
+import json
+import threading
+
+import pytest
+
+from cbrain_cli import http_cache
+from cbrain_cli.cli_utils import api_get, api_send
+from tests.conftest import run_main
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    """Serve ``server.resources`` with ETags, answering 304 to a matching If-None-Match."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.conditional.append(self.headers.get("If-None-Match"))
+        body = json.dumps(self.server.resources.get(self.path.split("?")[0], [])).encode()
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def etag_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+    server.resources = {"/tags": [{"id": 5, "name": "t"}], "/groups": [{"id": 1}]}
+    server.conditional = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_response_served_from_cache(etag_server, pooled_opener):
+    server, base_url = etag_server
+    assert api_get(f"{base_url}/tags", "tok", cache=True) == [{"id": 5, "name": "t"}]
+    assert api_get(f"{base_url}/tags", "tok", cache=True) == [{"id": 5, "name": "t"}]
+    assert server.conditional[0] is None
+    assert server.conditional[1].startswith('W/"')
+    # The 304 left its connection reusable.
+    assert pooled_opener.idle_count() == 1
+    stats = http_cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_changed_response_replaces_cached_body(etag_server, pooled_opener):
+    server, base_url = etag_server
+    api_get(f"{base_url}/tags", "tok", cache=True)
+    server.resources["/tags"] = []
+    assert api_get(f"{base_url}/tags", "tok", cache=True) == []
+    assert http_cache.stats()["hits"] == 0
+
+
+def test_mutation_invalidates_its_collection(etag_server, pooled_opener):
+    server, base_url = etag_server
+    api_get(f"{base_url}/tags", "tok", {"page": "1"}, cache=True)
+    api_get(f"{base_url}/groups", "tok", cache=True)
+    api_send(f"{base_url}/tags/5", "tok", method="PUT", payload={"tag": {}})
+    api_get(f"{base_url}/tags", "tok", {"page": "1"}, cache=True)
+    api_get(f"{base_url}/groups", "tok", cache=True)
+    assert server.conditional[2] is None
+    assert server.conditional[3] is not None
+
+
+def test_uncached_requests_bypass_the_cache(etag_server, pooled_opener):
+    server, base_url = etag_server
+    api_get(f"{base_url}/tags", "tok")
+    api_get(f"{base_url}/tags", "tok", {"page": "1", "per_page": "2"})
+    api_get(f"{base_url}/tags", "tok")
+    assert server.conditional == [None, None, None]
+    assert not http_cache.HTTP_CACHE_FILE.exists()
+
+
+def test_counts_saved_with_next_write(monkeypatch):
+    http_cache.store(1, "http://h/a", {}, b"[]")
+    # A response without validators is counted without touching the database.
+    assert not http_cache.HTTP_CACHE_FILE.exists()
+    assert http_cache.stats()["misses"] == 1
+    http_cache.store(1, "http://h/b", {"ETag": '"x"'}, b"[]")
+    http_cache.revalidated(1, "http://h/b")
+    assert http_cache._pending_counts == {}
+    stats = http_cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_reference_commands_use_the_cache(
+    etag_server, pooled_opener, fake_credentials, monkeypatch, capsys
+):
+    server, base_url = etag_server
+    monkeypatch.setattr("cbrain_cli.data.projects.cbrain_url", base_url)
+    monkeypatch.setattr("cbrain_cli.data.projects.api_token", "tok")
+    monkeypatch.setattr("cbrain_cli.data.tags.cbrain_url", base_url)
+    monkeypatch.setattr("cbrain_cli.data.tags.api_token", "tok")
+    for _ in range(2):
+        assert run_main(monkeypatch, ["cbrain", "--json", "project", "list"]) is None
+        assert run_main(monkeypatch, ["cbrain", "--json", "tag", "list"]) is None
+    capsys.readouterr()
+    # groups are revalidated; the tag listing is never cached.
+    assert server.conditional[0] is None and server.conditional[2].startswith('W/"')
+    assert server.conditional[1] is None and server.conditional[3] is None
+
+
+def test_cache_disabled_with_zero_size(etag_server, pooled_opener, monkeypatch):
+    server, base_url = etag_server
+    monkeypatch.setenv("CBRAIN_HTTP_CACHE_MB", "0")
+    api_get(f"{base_url}/tags", "tok", cache=True)
+    api_get(f"{base_url}/tags", "tok", cache=True)
+    assert server.conditional == [None, None]
+
+
+def test_least_recently_used_entries_evicted(monkeypatch):
+    monkeypatch.setattr("cbrain_cli.http_cache.max_bytes", lambda: 25)
+    headers = {"ETag": '"x"'}
+    http_cache.store(1, "http://h/a", headers, b"a" * 10)
+    http_cache.store(1, "http://h/b", headers, b"b" * 10)
+    http_cache.revalidated(1, "http://h/a")
+    http_cache.store(1, "http://h/c", headers, b"c" * 10)
+    assert http_cache.lookup(1, "http://h/a") is not None
+    assert http_cache.lookup(1, "http://h/b") is None
+    assert http_cache.lookup(1, "http://h/c") is not None
+    # Responses are kept per user.
+    assert http_cache.lookup(2, "http://h/a") is None
+    # Bodies larger than the whole cache are not stored.
+    http_cache.store(1, "http://h/big", headers, b"x" * 30)
+    assert http_cache.lookup(1, "http://h/big") is None
+
+
+def test_collection_url():
+    assert http_cache.collection_url("http://h:3000/tags/5?x=1") == "http://h:3000/tags"
+    assert http_cache.collection_url("http://h/groups/switch") == "http://h/groups"
+
+
+def test_cache_commands_work_without_session(monkeypatch, capsys):
+    http_cache.store(1, "http://h/a", {"ETag": '"x"'}, b"[]")
+    assert run_main(monkeypatch, ["cbrain", "--json", "cache", "stats"]) is None
+    assert json.loads(capsys.readouterr().out)["entries"] == 1
+    assert run_main(monkeypatch, ["cbrain", "cache", "clear"]) is None
+    assert "Removed 1 cached response(s)" in capsys.readouterr().out
+    assert http_cache.stats()["entries"] == 0
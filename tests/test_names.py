@@ -0,0 +1,91 @@
+import json
+import urllib.error
+import urllib.parse
+from unittest.mock import MagicMock
+
+import pytest
+
+from cbrain_cli.cli_utils import RecordStream
+from cbrain_cli.data.names import resolve_names
+from cbrain_cli.formatter.tasks_fmt import print_task_data
+from tests.conftest import make_args, patch_module_locals
+
+DIMENSIONS = {
+    "/bourreaux": [{"id": 3, "name": "cluster"}],
+    "/groups": [{"id": 5, "name": "lab"}, {"id": 6, "name": "course"}],
+    "/tools": [{"id": 8, "name": "FSL"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def _patch_names_locals(monkeypatch):
+    patch_module_locals(monkeypatch, "cbrain_cli.data.names", "cbrain_cli.data.tools")
+
+
+@pytest.fixture
+def serve_dimensions(monkeypatch):
+    """Serve DIMENSIONS (403 for anything else) and record the requested paths."""
+    calls = []
+
+    def fake_urlopen(request):
+        path = urllib.parse.urlsplit(request.full_url).path
+        calls.append(path)
+        if path not in DIMENSIONS:
+            raise urllib.error.HTTPError(request.full_url, 403, "Forbidden", {}, None)
+        response = MagicMock()
+        response.__enter__.return_value.read.return_value = json.dumps(DIMENSIONS[path]).encode()
+        return response
+
+    monkeypatch.setattr("urllib.request.urlopen", fake_urlopen)
+    return calls
+
+
+def _task(task_id, group_id=5, bourreau_id=3):
+    return {"id": task_id, "bourreau_id": bourreau_id, "group_id": group_id, "user_id": 1}
+
+
+def test_each_dimension_fetched_once(serve_dimensions):
+    tasks = [_task(i, group_id=5 + i % 2) for i in range(50)]
+    named = resolve_names(tasks, ("bourreau_id", "group_id", "user_id"))
+    assert named[0]["bourreau_name"] == "cluster"
+    assert [t["group_name"] for t in named[:2]] == ["lab", "course"]
+    # /users is refused to non-administrators: IDs stay unresolved.
+    assert "user_name" not in named[0]
+    assert sorted(serve_dimensions) == ["/bourreaux", "/groups", "/users"]
+    assert "group_name" not in tasks[0]
+
+
+def test_names_cached_between_runs(serve_dimensions):
+    resolve_names([_task(1)], ("group_id",))
+    assert serve_dimensions == ["/groups"]
+    assert resolve_names([_task(2)], ("group_id",))[0]["group_name"] == "lab"
+    assert serve_dimensions == ["/groups"]
+
+    # An ID missing from the cache refetches the dimension once.
+    named = resolve_names([_task(3, group_id=99), _task(4, group_id=98)], ("group_id",))
+    assert "group_name" not in named[0]
+    assert serve_dimensions == ["/groups", "/groups"]
+
+
+def test_expired_cache_is_refetched(serve_dimensions, monkeypatch):
+    resolve_names([_task(1)], ("group_id",))
+    monkeypatch.setenv("CBRAIN_NAME_CACHE_TTL", "0")
+    monkeypatch.setattr("cbrain_cli.data.names.time.time", lambda: 4e9)
+    resolve_names([_task(1)], ("group_id",))
+    assert serve_dimensions == ["/groups", "/groups"]
+
+
+def test_tool_names_come_from_tool_catalogue(serve_dimensions):
+    configs = [{"id": 1, "tool_id": 8}, {"id": 2, "tool_id": 8}]
+    assert [c["tool_name"] for c in resolve_names(configs, ("tool_id",))] == ["FSL", "FSL"]
+    assert serve_dimensions == ["/tools"]
+
+
+def test_streams_stay_lazy_and_table_shows_names(serve_dimensions, capsys):
+    stream = resolve_names(RecordStream([[_task(1)], [_task(2)]]), ("bourreau_id",))
+    assert isinstance(stream, RecordStream)
+    assert serve_dimensions == []
+    print_task_data(stream, make_args())
+    out = capsys.readouterr().out
+    assert "cluster (3)" in out
+    assert "Total: 2 task(s)" in out
@@ -1,7 +1,19 @@
+import json
+import time
+import urllib.parse
+from unittest.mock import MagicMock
+
 import pytest
 
-from cbrain_cli.cli_utils import CliValidationError, pagination
-from tests.conftest import make_args
+from cbrain_cli.cli_utils import (
+    CliValidationError,
+    RecordStream,
+    api_get_list,
+    paginate,
+    pagination,
+    record_count,
+)
+from tests.conftest import TOKEN, URL, make_args, patch_module_locals, run_main
 
 
 @pytest.mark.parametrize(
@@ -44,3 +56,128 @@ def test_pagination_returns_query_params():
     params = {}
     result = pagination(make_args(), params)
     assert result is params
+
+
+def _page_responses(*pages):
+    responses = []
+    for page in pages:
+        http_response = MagicMock()
+        http_response.__enter__.return_value.read.return_value = json.dumps(page).encode()
+        http_response.__exit__.return_value = False
+        responses.append(http_response)
+    return responses
+
+
+def test_paginate_stops_on_short_page(monkeypatch):
+    urlopen = MagicMock(
+        side_effect=_page_responses([{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}])
+    )
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    pages = list(paginate(f"{URL}/tasks", TOKEN, {"page": "1", "per_page": "2"}))
+    assert pages == [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+    assert urlopen.call_count == 3
+    assert "page=3" in urlopen.call_args.args[0].full_url
+
+
+def test_paginate_stops_on_empty_page(monkeypatch):
+    urlopen = MagicMock(side_effect=_page_responses([{"id": 1}, {"id": 2}], []))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert list(paginate(f"{URL}/tasks", TOKEN, {"page": "1", "per_page": "2"})) == [
+        [{"id": 1}, {"id": 2}]
+    ]
+
+
+def test_paginate_stops_when_page_is_ignored(monkeypatch):
+    """An unpaginated endpoint answering every page with the full listing."""
+    groups = [{"id": 1}, {"id": 2}]
+    urlopen = MagicMock(side_effect=_page_responses(groups, groups, groups))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert list(paginate(f"{URL}/groups", TOKEN, {"page": "1", "per_page": "2"})) == [groups]
+    assert urlopen.call_count == 2
+
+
+def test_record_stream_is_lazy_and_counts(monkeypatch):
+    urlopen = MagicMock(side_effect=_page_responses([{"id": 1}, {"id": 2}], [{"id": 3}]))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    stream = api_get_list(f"{URL}/tasks", TOKEN, {"page": "1", "per_page": "2"}, fetch_all=True)
+    assert urlopen.call_count == 0
+    assert stream
+    assert urlopen.call_count == 1
+    assert [record["id"] for record in stream] == [1, 2, 3]
+    assert record_count(stream) == 3
+
+
+def test_empty_record_stream_is_falsey(monkeypatch):
+    monkeypatch.setattr("urllib.request.urlopen", MagicMock(side_effect=_page_responses([])))
+    assert not RecordStream(paginate(f"{URL}/tags", TOKEN, {"per_page": "25"}))
+
+
+def test_main_all_flag_streams_every_page(monkeypatch, fake_credentials, capsys):
+    patch_module_locals(monkeypatch, "cbrain_cli.data.files")
+    first_page = [{"id": i, "type": "SingleFile", "name": f"f{i}"} for i in range(5)]
+    urlopen = MagicMock(side_effect=_page_responses(first_page, [{"id": 5, "name": "last"}]))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    result = run_main(
+        monkeypatch, ["cbrain", "--jsonl", "file", "list", "--all", "--per-page", "5"]
+    )
+    assert result is None
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(6))
+    assert urlopen.call_count == 2
+
+
+@pytest.mark.parametrize("prefetch,valid", [(0, False), (1, True), (16, True), (17, False)])
+def test_prefetch_boundary(prefetch, valid):
+    args = make_args(prefetch=prefetch)
+    if valid:
+        pagination(args, {})
+    else:
+        with pytest.raises(CliValidationError) as exc_info:
+            pagination(args, {})
+        assert exc_info.value.field == "--prefetch"
+
+
+def test_prefetch_yields_pages_in_order(monkeypatch):
+    """Pages finishing out of order are still yielded in page order."""
+    pages = {1: [{"id": 1}, {"id": 2}], 2: [{"id": 3}, {"id": 4}], 3: [{"id": 5}]}
+    requested = []
+
+    def fake_urlopen(request):
+        page = int(urllib.parse.parse_qs(urllib.parse.urlsplit(request.full_url).query)["page"][0])
+        requested.append(page)
+        # Earlier pages answer last.
+        time.sleep(0.05 * max(0, 3 - page))
+        http_response = MagicMock()
+        http_response.__enter__.return_value.read.return_value = json.dumps(
+            pages.get(page, [])
+        ).encode()
+        http_response.__exit__.return_value = False
+        return http_response
+
+    monkeypatch.setattr("urllib.request.urlopen", fake_urlopen)
+    result = list(paginate(f"{URL}/userfiles", TOKEN, {"page": "1", "per_page": "2"}, prefetch=3))
+    assert result == [pages[1], pages[2], pages[3]]
+    # Window of 3 plus at most one refill after page 1; page 4 may be cancelled.
+    assert sorted(requested)[:3] == [1, 2, 3]
+    assert max(requested) <= 4
+
+
+def test_list_files_all_with_prefetch(monkeypatch):
+    from cbrain_cli.data.files import list_files
+
+    patch_module_locals(monkeypatch, "cbrain_cli.data.files")
+    monkeypatch.setattr(
+        "cbrain_cli.cli_utils.api_get",
+        lambda _url, _token, params: [{"id": int(params["page"])}] if params["page"] == "1" else [],
+    )
+    stream = list_files(make_args(all=True, prefetch=4, per_page=5))
+    assert list(stream) == [{"id": 1}]
+
+
+def test_prefetch_stops_when_page_is_ignored(monkeypatch):
+    groups = [{"id": 1}, {"id": 2}]
+    monkeypatch.setattr(
+        "urllib.request.urlopen", MagicMock(side_effect=lambda _request: _page_responses(groups)[0])
+    )
+    pages = paginate(f"{URL}/groups", TOKEN, {"page": "1", "per_page": "2"}, prefetch=3)
+    assert list(pages) == [groups]
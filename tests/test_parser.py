@@ -1,4 +1,6 @@
-from cbrain_cli.main import build_parser
+import pytest
+
+from cbrain_cli.main import build_parser, requested_command
 
 
 def test_build_parser_has_core_commands():
@@ -74,3 +76,59 @@ def test_command_parsers_include_model_commands():
         "remote-resource",
     ):
         assert command in command_parsers
+
+
+def test_all_flag_on_paginatable_list_commands():
+    parser, _command_parsers = build_parser()
+    for command in ("file", "dataprovider", "tool", "tool-config", "tag", "task"):
+        assert parser.parse_args([command, "list", "--all"]).all is True
+        assert parser.parse_args([command, "list"]).all is False
+
+
+def test_prefetch_flag_on_file_and_task_list():
+    parser, _command_parsers = build_parser()
+    assert parser.parse_args(["file", "list", "--all", "--prefetch", "4"]).prefetch == 4
+    assert parser.parse_args(["task", "list"]).prefetch == 1
+
+
+def test_build_parser_for_one_command_only_builds_that_command():
+    parser, command_parsers = build_parser("tag")
+    assert list(command_parsers) == ["tag"]
+    assert parser.parse_args(["tag", "list"]).action == "list"
+    assert parser.parse_args(["version"]).command == "version"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["file", "list"])
+
+
+def test_requested_command():
+    assert requested_command(["--json", "file", "list"]) == "file"
+    assert requested_command(["version"]) == "version"
+    assert requested_command(["--help", "file"]) is None
+    assert requested_command(["bogus"]) is None
+    assert requested_command([]) is None
+
+
+def test_show_commands_accept_several_ids_and_stdin():
+    parser, _command_parsers = build_parser()
+    args = parser.parse_args(["task", "show", "3", "1", "-", "--parallel", "8"])
+    assert args.task == [3, 1, "-"]
+    assert args.parallel == 8
+    assert parser.parse_args(["file", "show", "5"]).file == [5]
+    with pytest.raises(SystemExit):
+        parser.parse_args(["tag", "show", "abc"])
+
+
+def test_resolve_names_flag_on_list_commands():
+    parser, _command_parsers = build_parser()
+    for command in ("task", "tool-config", "tag", "remote-resource", "background"):
+        assert parser.parse_args([command, "list", "--resolve-names"]).resolve_names is True
+        assert parser.parse_args([command, "list"]).resolve_names is False
+
+
+def test_file_move_accepts_stdin_ids_and_batch_options():
+    parser, _command_parsers = build_parser()
+    args = parser.parse_args(
+        ["file", "move", "--file-id", "-", "5", "--dp-id", "2", "--batch-size", "100"]
+    )
+    assert args.file_id == ["-", 5]
+    assert (args.batch_size, args.parallel, args.from_file) == (100, 1, None)
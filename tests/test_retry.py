@@ -0,0 +1,182 @@
+import email.utils
+import io
+import json
+import socket
+import threading
+import time
+import urllib.error
+from unittest.mock import MagicMock
+
+import pytest
+
+from cbrain_cli import cli_utils, tracing
+from cbrain_cli.cli_utils import (
+    RetryPolicy,
+    api_get,
+    api_send,
+    configure_retries,
+    parse_retry_after,
+)
+from tests.conftest import TOKEN, URL, run_main
+
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    """Fresh retry policy; sleeps are recorded instead of waited."""
+    fresh = RetryPolicy(retries=3, base_delay=0.5, max_delay=30)
+    monkeypatch.setattr(cli_utils, "retry_policy", fresh)
+    sleeps = []
+    monkeypatch.setattr(cli_utils.time, "sleep", sleeps.append)
+    fresh.sleeps = sleeps
+    return fresh
+
+
+def _http_error(code, headers=None):
+    return urllib.error.HTTPError(URL, code, "Error", headers or {}, io.BytesIO(b"{}"))
+
+
+def _ok(payload):
+    response = MagicMock()
+    response.__enter__.return_value.read.return_value = json.dumps(payload).encode()
+    response.__enter__.return_value.status = 200
+    return response
+
+
+def test_get_retried_until_success(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=[_http_error(503), _http_error(429), _ok({"id": 1})])
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert api_get(f"{URL}/tags/1", TOKEN) == {"id": 1}
+    assert urlopen.call_count == 3
+    assert len(policy.sleeps) == 2
+    assert 0 <= policy.sleeps[0] <= 0.5
+    assert 0 <= policy.sleeps[1] <= 1.0
+
+
+def test_get_gives_up_after_retries(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=_http_error(502))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    with pytest.raises(urllib.error.HTTPError):
+        api_get(f"{URL}/tags", TOKEN)
+    assert urlopen.call_count == 4
+
+
+def test_client_errors_are_not_retried(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=_http_error(404))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    with pytest.raises(urllib.error.HTTPError):
+        api_get(f"{URL}/tags/9", TOKEN)
+    assert urlopen.call_count == 1
+
+
+@pytest.fixture
+def dropping_server():
+    """Socket server closing its first ``server.drops`` connections without answering."""
+    listener = socket.create_server(("127.0.0.1", 0))
+    state = {"drops": 0, "connections": 0}
+
+    def serve():
+        while True:
+            try:
+                conn, _address = listener.accept()
+            except OSError:
+                return
+            with conn:
+                conn.recv(65536)
+                state["connections"] += 1
+                if state["connections"] > state["drops"]:
+                    body = b"[]"
+                    conn.sendall(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+                    )
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield state, f"http://127.0.0.1:{listener.getsockname()[1]}"
+    listener.close()
+
+
+def test_dropped_connection_is_retried(dropping_server, pooled_opener, policy):
+    state, base_url = dropping_server
+    state["drops"] = 2
+    assert api_get(f"{base_url}/tags", TOKEN) == []
+    assert state["connections"] == 3
+    assert len(policy.sleeps) == 2
+
+
+def test_dropped_connection_gives_up_after_retries(dropping_server, pooled_opener, policy):
+    state, base_url = dropping_server
+    state["drops"] = 10
+    with pytest.raises(urllib.error.URLError) as error:
+        api_get(f"{base_url}/tags", TOKEN)
+    assert isinstance(error.value.reason, ConnectionError)
+    assert state["connections"] == 4
+    assert cli_utils.error_message(error.value).startswith("Connection failed")
+
+
+def test_retry_after_is_honored(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=[_http_error(503, {"Retry-After": "7"}), _ok({})])
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    api_get(f"{URL}/tags", TOKEN)
+    assert policy.sleeps == [7.0]
+
+
+def test_retry_after_beyond_max_delay_gives_up(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=_http_error(429, {"Retry-After": "120"}))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    with pytest.raises(urllib.error.HTTPError):
+        api_get(f"{URL}/tags", TOKEN)
+    assert urlopen.call_count == 1
+
+
+def test_send_retried_only_when_idempotent(monkeypatch, policy):
+    urlopen = MagicMock(side_effect=_http_error(503))
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    with pytest.raises(urllib.error.HTTPError):
+        api_send(f"{URL}/tags", TOKEN, payload={"tag": {}})
+    assert urlopen.call_count == 1
+
+    urlopen = MagicMock(side_effect=[_http_error(503), _ok({"id": 2})])
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    data, _status = api_send(f"{URL}/tags/2", TOKEN, method="PUT", payload={}, idempotent=True)
+    assert data == {"id": 2}
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(cli_utils.random, "uniform", lambda _low, high: high)
+    policy = RetryPolicy(retries=10, base_delay=1, max_delay=5)
+    delays = [policy.delay_for(_http_error(503), attempt) for attempt in range(5)]
+    assert delays == [1, 2, 4, 5, 5]
+
+
+def test_parse_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= parse_retry_after(when) <= 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retries_are_traced(monkeypatch, policy):
+    fresh = tracing.Tracer()
+    fresh.enabled = True
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    urlopen = MagicMock(side_effect=[_http_error(503), _ok({})])
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    api_get(f"{URL}/tags?api_token=x", TOKEN)
+    (retry,) = [event for event in fresh.events if event["type"] == "retry"]
+    assert retry["reason"] == "503"
+    assert retry["attempt"] == 1
+    assert "api_token=x" not in retry["path"]
+
+
+def test_configure_retries(policy):
+    configure_retries(retries=0, max_delay=5)
+    assert (policy.retries, policy.max_delay) == (0, 5)
+    with pytest.raises(cli_utils.CliValidationError):
+        configure_retries(retries=-1)
+
+
+def test_main_retries_flag(monkeypatch, policy, capsys):
+    assert run_main(monkeypatch, ["cbrain", "--retries", "-2", "version"]) == 1
+    assert "retries must be 0 or greater" in capsys.readouterr().out
+    run_main(monkeypatch, ["cbrain", "--retries", "5", "--retry-max-delay", "9", "version"])
+    assert (policy.retries, policy.max_delay) == (5, 9)
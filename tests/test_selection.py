@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from cbrain_cli.cli_utils import CliValidationError, RecordStream
+from cbrain_cli.handlers import handle_file_list
+from cbrain_cli.selection import Selection, parse_fields, parse_number, parse_where
+from tests.conftest import make_args
+
+FILES = [
+    {"id": 1, "name": "sub-01_T1w.nii.gz", "type": "NiftiFile", "size": 3 * 1024**2},
+    {"id": 2, "name": "notes.txt", "type": "TextFile", "size": 512, "archived": True},
+    {"id": 3, "name": "sub-02_T1w.nii.gz", "type": "NiftiFile", "size": "2147483648"},
+    {"id": 4, "name": "empty", "type": "SingleFile", "size": None},
+]
+
+
+def matching(*expressions):
+    selection = Selection(where=list(expressions))
+    return [record["id"] for record in selection.apply(FILES)]
+
+
+def test_parse_number_accepts_size_suffixes():
+    assert parse_number("10") == 10
+    assert parse_number("1.5K") == 1536
+    assert parse_number("2MiB") == parse_number("2mb") == 2 * 1024**2
+    assert parse_number("1G") == 1024**3
+    assert parse_number("nii") is None
+
+
+@pytest.mark.parametrize(
+    "expressions,expected",
+    [
+        (["size>=1M"], [1, 3]),
+        (["size<1K"], [2]),
+        (["size=1M..2G"], [1, 3]),
+        (["size=..1M"], [2]),
+        (["name~*.nii.gz", "size>1G"], [3]),
+        (["name!~*.nii.gz"], [2, 4]),
+        (["type=NiftiFile"], [1, 3]),
+        (["type!=NiftiFile"], [2, 4]),
+        (["archived=true"], [2]),
+        (["size!=512"], [1, 3, 4]),
+        (["missing=1"], []),
+    ],
+)
+def test_where_predicates(expressions, expected):
+    assert matching(*expressions) == expected
+
+
+@pytest.mark.parametrize("expression", ["size", "size>=", ">=1G", "size=..", "size >> 1"])
+def test_invalid_where_expressions_raise(expression):
+    with pytest.raises(CliValidationError):
+        parse_where(expression)
+
+
+def test_parse_fields_keeps_order_and_rejects_empty_names():
+    assert parse_fields("name, id,name") == ["name", "id"]
+    with pytest.raises(CliValidationError):
+        parse_fields("id,,name")
+
+
+def test_selection_filters_and_projects_streams_lazily():
+    pulled = []
+
+    def pages():
+        for record in FILES:
+            pulled.append(record["id"])
+            yield [record]
+
+    selected = Selection(where=["size>=1M"], fields="name,id").apply(RecordStream(pages()))
+    assert isinstance(selected, RecordStream) and pulled == []
+    assert next(selected) == {"name": "sub-01_T1w.nii.gz", "id": 1}
+    assert pulled == [1]
+
+
+def test_handle_file_list_prints_selected_fields(monkeypatch, capsys):
+    monkeypatch.setattr("cbrain_cli.handlers.files.list_files", lambda args: FILES)
+    args = make_args(where=["name~sub-*"], fields="id,size")
+    handle_file_list(args)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["id", "size"]
+    assert [line.split() for line in lines[2:4]] == [["1", "3145728"], ["3", "2147483648"]]
+    assert lines[-1] == "Total: 2 record(s)"
+
+    handle_file_list(make_args(where=["size<1K"], fields="name,archived", json=True))
+    assert json.loads(capsys.readouterr().out) == [{"name": "notes.txt", "archived": True}]
+
+
+def test_handle_file_list_rejects_bad_selection_before_fetching(monkeypatch):
+    monkeypatch.setattr("cbrain_cli.handlers.files.list_files", pytest.fail)
+    with pytest.raises(CliValidationError, match="Invalid expression"):
+        handle_file_list(make_args(where=["size"]))
@@ -0,0 +1,107 @@
+import io
+import stat
+
+import pytest
+
+from cbrain_cli import cli_utils, shell
+from tests.conftest import TOKEN, URL
+
+
+def make_shell(commands=""):
+    return shell.Shell(stdin=io.StringIO(commands), stdout=io.StringIO())
+
+
+def test_recent_ids_keep_most_recent_first():
+    recent = shell.RecentIds(limit=3)
+    recent.observe(f"{URL}/tasks?page=1", [{"id": 1}, {"id": 2}, {"id": 3}])
+    recent.observe(f"{URL}/tasks/2", {"id": 2, "status": "Completed"})
+    recent.observe(f"{URL}/tasks?page=2", [{"id": 4}, {"name": "no id"}])
+    recent.observe(f"{URL}/userfiles/7", {"id": 7})
+    assert recent.ids("tasks") == ["4", "2", "3"]
+    assert recent.ids("userfiles") == ["7"]
+    assert recent.ids("tags") == []
+
+
+def test_api_get_notifies_response_observers(monkeypatch, capture_urlopen):
+    configure, _captured = capture_urlopen
+    configure(response_json=[{"id": 12}, {"id": 15}])
+    recent = shell.RecentIds()
+    monkeypatch.setattr(cli_utils, "response_observers", [recent.observe])
+    cli_utils.api_get(f"{URL}/tasks", TOKEN, {"page": "1"})
+    assert recent.ids("tasks") == ["15", "12"]
+
+
+def test_run_commands_from_input(capsys):
+    repl = make_shell("cbrain version\ntiming on\n\nversion\nlogin\nexit\nversion\n")
+    assert repl.run() == 1
+    out = capsys.readouterr().out
+    assert out.count("cbrain cli client version 1.0") == 2
+    assert "Timing is on." in out
+    assert out.count("Time: ") == 1
+    assert "Error: 'login' cannot run in the shell" in out
+
+
+def test_run_returns_last_exit_code(capsys):
+    assert make_shell("file show\nversion\n").run() is None
+    assert make_shell("version\nfile show\n").run() == 2
+    assert "required: file" in capsys.readouterr().err
+
+
+def test_unbalanced_quotes(capsys):
+    assert make_shell("tag show 'oops\n").run() == 1
+    assert "No closing quotation" in capsys.readouterr().out
+
+
+def test_help_of_a_command(capsys):
+    make_shell("help task watch\n").run()
+    assert "usage:" in capsys.readouterr().out
+
+
+def test_help_of_the_shell(capsys):
+    make_shell("help\n").run()
+    out = capsys.readouterr().out
+    assert "Available commands" in out
+    assert "timing" in out
+    assert "EOF" not in out
+
+
+@pytest.mark.parametrize(
+    "line, text, expected",
+    [
+        ("", "ta", ["tag", "task"]),
+        ("cbrain ", "ti", ["timing"]),
+        ("task ", "s", ["show"]),
+        ("--json tool-config ", "sh", ["show"]),
+        ("task list ", "--per", ["--per-page"]),
+        ("task show ", "", ["15", "12"]),
+        ("task show 15 ", "1", ["15", "12"]),
+        ("file show ", "", []),
+        ("help task ", "w", ["watch"]),
+        ("login ", "", []),
+        ("--json ", "ta", ["tag", "task"]),
+        ("", "--tr", ["--trace", "--trace-file"]),
+    ],
+)
+def test_completion(line, text, expected):
+    repl = make_shell()
+    repl.recent.observe(f"{URL}/tasks", [{"id": 12}, {"id": 15}])
+    full = line + text
+    begidx = len(line)
+    if not line.strip():
+        matches = repl.completenames(text, full, begidx, len(full))
+    elif line.startswith("help "):
+        matches = repl.complete_help(text, full, begidx, len(full))
+    else:
+        matches = repl.completedefault(text, full, begidx, len(full))
+    assert matches == expected
+
+
+def test_history_is_private(tmp_path):
+    readline = pytest.importorskip("readline")
+    readline.clear_history()
+    readline.add_history("task list")
+    make_shell()._save_history(readline)
+    readline.clear_history()
+    history = tmp_path / "shell_history"
+    assert "task list" in history.read_text()
+    assert stat.S_IMODE(history.stat().st_mode) == 0o600
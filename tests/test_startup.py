@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from cbrain_cli.cli_utils import lazy_import
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative `python -X importtime` budget for `import cbrain_cli.main`, in ms.
+IMPORT_BUDGET_MS = float(os.environ.get("CBRAIN_IMPORT_BUDGET_MS", "75"))
+
+# Modules only needed once a request is sent or a specific command runs.
+HEAVY_MODULES = ("urllib.request", "http.client", "concurrent.futures", "sqlite3")
+
+LOADED_MODULES = """
+import sys, types
+print(" ".join(sorted(n for n, m in sys.modules.items() if type(m) is types.ModuleType)))
+"""
+
+
+@pytest.fixture
+def run_python(tmp_path):
+    """Run Python code in a fresh interpreter with an empty home and a warm bytecode cache."""
+    env = dict(os.environ, HOME=str(tmp_path), PYTHONPYCACHEPREFIX=str(tmp_path / "pycache"))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    def run(code, *options):
+        return subprocess.run(
+            [sys.executable, *options, "-c", code],
+            cwd=REPO_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    return run
+
+
+def _loaded_after(run_python, argv):
+    code = f"from cbrain_cli.main import main\nmain({argv!r})\n{LOADED_MODULES}"
+    return set(run_python(code).stdout.splitlines()[-1].split())
+
+
+def test_version_skips_http_stack_and_commands(run_python):
+    loaded = _loaded_after(run_python, ["version"])
+    assert not loaded & set(HEAVY_MODULES)
+    assert not any(
+        name.startswith(("cbrain_cli.data.", "cbrain_cli.formatter.")) for name in loaded
+    )
+
+
+def test_command_skips_other_families(run_python):
+    # Invalid pagination is rejected before any request is sent.
+    loaded = _loaded_after(run_python, ["task", "list", "--page", "0"])
+    assert "cbrain_cli.data.files" not in loaded
+    assert "cbrain_cli.formatter.files_fmt" not in loaded
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_import_time_budget(run_python):
+    run_python("import cbrain_cli.main")  # populate the bytecode cache
+    timings = []
+    for _ in range(5):
+        stderr = run_python("import cbrain_cli.main", "-X", "importtime").stderr
+        line = next(line for line in stderr.splitlines() if line.endswith("| cbrain_cli.main"))
+        timings.append(int(line.split("|")[1]) / 1000)
+    assert min(timings) < IMPORT_BUDGET_MS, f"import cbrain_cli.main took {min(timings):.1f} ms"
+
+
+def test_lazy_module_loads_once_across_threads(tmp_path, monkeypatch):
+    (tmp_path / "slow_lazy_module.py").write_text(
+        "import time\nLOADS = []\ntime.sleep(0.2)\nLOADS.append(1)\nVALUE = 42\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "slow_lazy_module", raising=False)
+    module = lazy_import("slow_lazy_module")
+    assert "VALUE" not in vars(module)
+
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append((module.VALUE, len(module.LOADS)))
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == [(42, 1)] * 4
@@ -1,7 +1,8 @@
 import pytest
 
-from cbrain_cli.cli_utils import CliValidationError
-from cbrain_cli.data.tasks import list_tasks, show_task
+from cbrain_cli.cli_utils import CliValidationError, PollInterval
+from cbrain_cli.data.tasks import TaskWatcher, list_tasks, show_task
+from cbrain_cli.handlers import handle_task_watch
 from tests.conftest import make_args, patch_module_locals
 
 
@@ -75,3 +76,83 @@ def test_operation_task_prints_json(monkeypatch, capsys):
 
     operation_task(make_task_args())
     assert '"status": "ok"' in capsys.readouterr().out
+
+
+def test_poll_interval_backs_off_while_idle_and_resets_on_change():
+    interval = PollInterval(2, 5)
+    assert [interval.next(False) for _ in range(4)] == [3.0, 4.5, 5, 5]
+    assert interval.next(True) == 2
+
+
+@pytest.fixture
+def task_polls(monkeypatch):
+    """Serve one scripted listing per poll cycle, as {id: status}; record the params."""
+    polls = []
+
+    def script(*cycles):
+        remaining = list(cycles)
+
+        def fake_paginate(url, token, params):
+            assert url.endswith("/tasks")
+            polls.append(params)
+            statuses = remaining.pop(0) if len(remaining) > 1 else remaining[0]
+            yield [
+                {"id": i, "type": "BoutiquesTask::FslBet", "status": s} for i, s in statuses.items()
+            ]
+
+        monkeypatch.setattr("cbrain_cli.data.tasks.paginate", fake_paginate)
+        return polls
+
+    return script
+
+
+def test_task_watcher_polls_one_listing_per_cycle(task_polls):
+    polls = task_polls(
+        {1: "New", 2: "New", 3: "Completed"},
+        {1: "On CPU", 2: "New"},
+        {1: "On CPU", 2: "New"},
+        {1: "Completed", 2: "Failed On Cluster"},
+    )
+    sleeps = []
+    watcher = TaskWatcher(make_args(task=[1, 2], batch_id=9, interval=2, max_interval=60))
+    cycles = list(watcher.cycles(sleep=sleeps.append))
+    assert len(polls) == 4 and polls[0]["batch_id"] == "9"
+    assert [len(changes) for changes in cycles] == [2, 1, 0, 2]
+    assert cycles[1][0] == {**cycles[1][0], "id": 1, "previous": "New", "status": "On CPU"}
+    assert sleeps == [2, 2, 3.0]
+    summary = watcher.summary()
+    assert (summary["completed"], summary["failed_ids"]) == (1, [2])
+
+
+def test_task_watcher_reports_missing_tasks_as_failed(task_polls):
+    task_polls({1: "Completed"})
+    watcher = TaskWatcher(make_args(task=[1, 5]))
+    (changes,) = watcher.cycles(sleep=pytest.fail)
+    assert {change["id"]: change["status"] for change in changes} == {
+        1: "Completed",
+        5: "Not Found",
+    }
+    assert watcher.summary()["failed_ids"] == [5]
+
+
+def test_task_watcher_requires_a_selection():
+    with pytest.raises(CliValidationError, match="required"):
+        TaskWatcher(make_args(task=[]))
+
+
+def test_handle_task_watch_prints_transitions_and_fails_on_failures(
+    task_polls, monkeypatch, capsys
+):
+    task_polls(
+        {7: "New", 8: "On CPU"}, {7: "On CPU", 8: "On CPU"}, {7: "Terminated", 8: "Completed"}
+    )
+    monkeypatch.setattr("cbrain_cli.data.tasks.time.sleep", lambda seconds: None)
+    assert handle_task_watch(make_args(task=[7, 8], bourreau_id=None)) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "Watching 2 task(s): 1 New, 1 On CPU"
+    assert [line[10:] for line in lines[1:4]] == [
+        "Task 7 (FslBet): New -> On CPU",
+        "Task 7 (FslBet): On CPU -> Terminated",
+        "Task 8 (FslBet): On CPU -> Completed",
+    ]
+    assert "2 task(s) finished" in lines[5] and lines[6] == "Failed: 7 (Terminated)"
@@ -4,7 +4,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from cbrain_cli.cli_utils import CliApiError, CliValidationError
-from cbrain_cli.data.tools import list_tools, show_tool
+from cbrain_cli.data.tools import list_tools, show_tool, show_tools
 from tests.conftest import make_args, patch_module_locals
 
 
@@ -58,7 +58,7 @@ def test_show_tool_empty_first_page_raises_cli_api_error(monkeypatch):
 
 def test_show_tool_stops_on_short_page(monkeypatch):
     """Short page (len < per_page) ends pagination without further requests."""
-    # per_page inside show_tool is hardcoded 20; 1-item page > short-circuit
+    # The catalogue is fetched 1000 per page; a 1-item page short-circuits.
     mock_http_response = MagicMock()
     page_data = json.dumps([{"id": 10, "name": "X"}]).encode()
     mock_http_response.__enter__.return_value.read.return_value = page_data
@@ -71,7 +71,7 @@ def test_show_tool_stops_on_short_page(monkeypatch):
 
 
 def test_show_tool_finds_tool_on_second_page(monkeypatch):
-    first_page_items = [{"id": i, "name": f"T{i}"} for i in range(1, 21)]
+    first_page_items = [{"id": i, "name": f"T{i}"} for i in range(1, 1001)]
     first_page = MagicMock()
     first_page.__enter__.return_value.read.return_value = json.dumps(first_page_items).encode()
     first_page.__exit__.return_value = False
@@ -86,3 +86,65 @@ def test_show_tool_finds_tool_on_second_page(monkeypatch):
     )
     result = show_tool(make_args(id=99))
     assert result["name"] == "Target"
+
+
+def _catalogue_urlopen(monkeypatch, tools):
+    """Serve ``tools`` as a single catalogue page and count requests."""
+
+    def fake_urlopen(request):
+        calls.append(request.full_url)
+        response = MagicMock()
+        response.__enter__.return_value.read.return_value = json.dumps(tools).encode()
+        return response
+
+    calls = []
+    monkeypatch.setattr("urllib.request.urlopen", fake_urlopen)
+    return calls
+
+
+def test_show_tool_uses_cached_index(monkeypatch):
+    calls = _catalogue_urlopen(monkeypatch, [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}])
+    assert show_tool(make_args(id=1))["name"] == "A"
+    assert show_tool(make_args(id=2))["name"] == "B"
+    assert len(calls) == 1
+    assert "per_page=1000" in calls[0]
+
+
+def test_show_tool_refetches_on_miss_refresh_and_expiry(monkeypatch):
+    calls = _catalogue_urlopen(monkeypatch, [{"id": 1, "name": "A"}])
+    show_tool(make_args(id=1))
+    with pytest.raises(CliApiError):
+        show_tool(make_args(id=5))
+    assert len(calls) == 2
+
+    show_tool(make_args(id=1, refresh=True))
+    assert len(calls) == 3
+
+    monkeypatch.setenv("CBRAIN_TOOL_INDEX_TTL", "0")
+    monkeypatch.setattr("cbrain_cli.data.tools.time.time", lambda: 4e9)
+    show_tool(make_args(id=1))
+    assert len(calls) == 4
+
+
+def test_show_tool_ignores_index_of_other_server(monkeypatch):
+    calls = _catalogue_urlopen(monkeypatch, [{"id": 1, "name": "A"}])
+    show_tool(make_args(id=1))
+    monkeypatch.setattr("cbrain_cli.data.tools.cbrain_url", "https://other.example")
+    show_tool(make_args(id=1))
+    assert len(calls) == 2
+
+
+def test_show_tools_fetches_catalogue_once(monkeypatch):
+    calls = _catalogue_urlopen(monkeypatch, [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}])
+    results = show_tools([2, 9, 1])
+    assert [(tool_id, tool and tool["name"]) for tool_id, tool, _ in results] == [
+        (2, "B"),
+        (9, None),
+        (1, "A"),
+    ]
+    assert isinstance(results[1][2], CliApiError)
+    assert len(calls) == 1
+    show_tools([1, 2])
+    assert len(calls) == 1
+    show_tools([1, 2], refresh=True)
+    assert len(calls) == 2
@@ -0,0 +1,136 @@
+import collections
+import json
+import time
+
+import pytest
+
+from cbrain_cli import tracing
+from cbrain_cli.cli_utils import api_get, api_send
+from tests.conftest import patch_module_locals, run_main
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    """Fresh, enabled tracer for the test."""
+    fresh = tracing.Tracer()
+    fresh.enabled = True
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    return fresh
+
+
+def _requests(tracer):
+    return [event for event in tracer.events if event["type"] == "request"]
+
+
+def test_redact_url_hides_token_like_params():
+    url = "/session?api_token=abc&login=me&password=pw&cbrain_api_token=x"
+    redacted = tracing.redact_url(url)
+    assert "abc" not in redacted and "pw" not in redacted and "=x" not in redacted
+    assert "login=me" in redacted
+    assert tracing.redact_url("/tools") == "/tools"
+
+
+def test_nested_phases_with_same_name_count_once(tracer):
+    with tracing.phase("format"):
+        with tracing.phase("format"):
+            pass
+    assert [event["name"] for event in tracer.events] == ["format"]
+
+
+def test_requests_record_timings_and_sizes(local_server, pooled_opener, tracer):
+    _server, base_url = local_server
+    api_get(f"{base_url}/tools", "tok", {"page": "1", "api_token": "secret"})
+    api_send(f"{base_url}/tags", "tok", payload={"tag": {"name": "x"}})
+
+    first, second = _requests(tracer)
+    assert first["method"] == "GET"
+    assert first["status"] == 200
+    assert "secret" not in first["path"]
+    assert first["bytes_in"] == len(json.dumps({"path": "/tools?page=1&api_token=secret"}))
+    assert not first["reused"]
+    assert first["connect_ms"] >= 0 and first["total_ms"] >= first["ttfb_ms"]
+
+    assert second["method"] == "POST"
+    assert second["status"] == 201
+    assert second["reused"]
+    assert second["bytes_out"] == len(json.dumps({"tag": {"name": "x"}}))
+    assert second["dns_ms"] == second["connect_ms"] == 0.0
+    assert {"json_decode"} <= {e["name"] for e in tracer.events if e["type"] == "phase"}
+
+
+def test_disabled_tracer_skips_requests(local_server, pooled_opener, tracer):
+    tracer.enabled = False
+    _server, base_url = local_server
+    api_get(f"{base_url}/tools", "tok")
+    assert _requests(tracer) == []
+
+
+def test_disabled_tracer_keeps_phase_totals(tracer):
+    tracer.enabled = False
+    for _ in range(1000):
+        with tracing.phase("format"):
+            pass
+    tracing.record_retry("GET", "/tools", 1, OSError(), 0.5)
+    assert tracer.events == []
+    assert tracer.phase_totals["format"][0] == 1000
+
+    tracing.enable()
+    (event,) = tracer.events
+    assert (event["name"], event["count"]) == ("format", 1000)
+    assert tracer.phase_totals == {}
+
+
+def test_table_output_is_timed_as_format(tracer, capsys):
+    from cbrain_cli.cli_utils import _TableWriter, dynamic_table_print
+
+    assert isinstance(_TableWriter, type)
+    dynamic_table_print([{"id": 1}], ["id"], ["ID"])
+    assert [event["name"] for event in tracer.events] == ["format"]
+
+
+def test_format_excludes_fetching_lazy_pages(tracer, capsys):
+    from cbrain_cli.cli_utils import RecordStream, json_printer
+
+    def pages():
+        for page in range(3):
+            with tracing.phase("api"):
+                time.sleep(0.05)
+            yield [{"id": page}]
+
+    json_printer(RecordStream(pages()))
+    phases = collections.Counter()
+    for event in tracer.events:
+        phases[event["name"]] += event["ms"]
+    assert phases["api"] >= 150
+    assert phases["format"] < 50
+    assert len(json.loads(capsys.readouterr().out)) == 3
+
+
+def test_main_trace_file_writes_jsonl(
+    monkeypatch, fake_credentials, mock_urlopen, tracer, tmp_path, capsys
+):
+    tracer.enabled = False
+    patch_module_locals(monkeypatch, "cbrain_cli.data.tags")
+    mock_urlopen([{"id": 1, "name": "t", "user_id": 1, "group_id": 2}])
+    trace_file = tmp_path / "trace.jsonl"
+
+    run_main(monkeypatch, ["cbrain", "--trace-file", str(trace_file), "--json", "tag", "list"])
+
+    assert json.loads(capsys.readouterr().out) == [
+        {"id": 1, "name": "t", "user_id": 1, "group_id": 2}
+    ]
+    events = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert events[0]["type"] == "run"
+    assert events[0]["command"] == "tag list"
+    phases = {event["name"] for event in events if event["type"] == "phase"}
+    assert {"parse_args", "json_decode", "format"} <= phases
+    assert "test-token" not in trace_file.read_text()
+
+
+def test_main_trace_prints_summary_to_stderr(monkeypatch, tracer, capsys):
+    tracer.enabled = False
+    run_main(monkeypatch, ["cbrain", "--trace", "version"])
+    captured = capsys.readouterr()
+    assert captured.out == "cbrain cli client version 1.0\n"
+    assert "Trace: HTTP requests" in captured.err
+    assert "parse_args" in captured.err
@@ -0,0 +1,157 @@
+import gzip
+import http.server
+import json
+import threading
+import urllib.request
+import zlib
+
+import pytest
+
+from cbrain_cli import tracing, transport
+from cbrain_cli.cli_utils import api_get, api_send
+
+
+def test_sequential_requests_reuse_one_connection(local_server, pooled_opener):
+    server, base_url = local_server
+    for page in range(1, 4):
+        assert api_get(f"{base_url}/tools", "tok", {"page": str(page)})["path"].startswith(
+            "/tools?page="
+        )
+    data, status = api_send(f"{base_url}/tags", "tok", payload={"tag": {}})
+    assert status == 201
+    assert len(server.client_ports) == 4
+    assert len(set(server.client_ports)) == 1
+    assert pooled_opener.idle_count() == 1
+
+
+def test_stale_pooled_connection_is_replaced(local_server, pooled_opener):
+    server, base_url = local_server
+    server.drop_connections = True
+    api_get(f"{base_url}/tools", "tok")
+    assert pooled_opener.idle_count() == 1
+    assert api_get(f"{base_url}/tools", "tok")["path"] == "/tools"
+    assert len(set(server.client_ports)) == 2
+
+
+def test_release_beyond_maxsize_closes_connection():
+    pool = transport.ConnectionPool(maxsize=1)
+
+    class FakeConn:
+        sock = object()
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    first, second = FakeConn(), FakeConn()
+    pool.release("host", first)
+    pool.release("host", second)
+    assert pool.idle_count("host") == 1
+    assert second.closed
+    assert pool.acquire("host", FakeConn) == (first, True)
+
+
+def test_unreusable_connection_is_closed():
+    pool = transport.ConnectionPool()
+
+    class FakeConn:
+        sock = object()
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    conn = FakeConn()
+    pool.release("host", conn, reusable=False)
+    assert conn.closed
+    assert pool.idle_count() == 0
+
+
+def test_pool_size_from_environment(monkeypatch):
+    monkeypatch.setenv("CBRAIN_POOL_SIZE", "9")
+    from cbrain_cli.config import env_int
+
+    assert env_int("CBRAIN_POOL_SIZE", 4) == 9
+    monkeypatch.setenv("CBRAIN_POOL_SIZE", "zero")
+    assert env_int("CBRAIN_POOL_SIZE", 4) == 4
+
+
+def _compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data)
+    if encoding == "deflate":
+        return zlib.compress(data)
+    # Raw deflate stream, as sent by some servers for "deflate".
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _CompressingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.accept_encodings.append(self.headers.get("Accept-Encoding"))
+        body = json.dumps([{"id": i, "name": f"file{i}.nii"} for i in range(5000)]).encode()
+        encoding = self.server.encoding
+        self.send_response(200)
+        if encoding:
+            body = _compress(body, encoding)
+            self.send_header("Content-Encoding", "deflate" if encoding == "raw" else encoding)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def compressing_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _CompressingHandler)
+    server.accept_encodings = []
+    server.encoding = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/userfiles"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "raw", None])
+def test_compressed_responses_are_decoded(compressing_server, pooled_opener, encoding):
+    server, url = compressing_server
+    server.encoding = encoding
+    records = api_get(url, "tok")
+    assert len(records) == 5000
+    assert records[-1] == {"id": 4999, "name": "file4999.nii"}
+    assert server.accept_encodings == ["gzip, deflate"]
+    # The connection is still reusable after a decoded body.
+    api_get(url, "tok")
+    assert pooled_opener.idle_count() == 1
+
+
+def test_compressed_body_is_decoded_incrementally(compressing_server, pooled_opener):
+    server, url = compressing_server
+    server.encoding = "gzip"
+    expected = json.dumps([{"id": i, "name": f"file{i}.nii"} for i in range(5000)]).encode()
+    with urllib.request.urlopen(urllib.request.Request(url)) as response:
+        parts = iter(lambda: response.read(4096), b"")
+        chunks = list(parts)
+    assert b"".join(chunks) == expected
+    assert max(len(chunk) for chunk in chunks) == 4096
+
+
+def test_trace_counts_compressed_and_decoded_bytes(compressing_server, pooled_opener, monkeypatch):
+    fresh = tracing.Tracer()
+    fresh.enabled = True
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    server, url = compressing_server
+    server.encoding = "gzip"
+    api_get(url, "tok")
+    (event,) = [e for e in fresh.events if e["type"] == "request"]
+    assert event["encoding"] == "gzip"
+    assert event["bytes_in"] < event["bytes_decoded"]
+    assert event["bytes_decoded"] == len(
+        json.dumps([{"id": i, "name": f"file{i}.nii"} for i in range(5000)])
+    )